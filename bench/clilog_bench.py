@@ -0,0 +1,527 @@
+"""
+CLILOG_BENCH.PY
+"""
+
+#!/usr/bin/env python3
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, "src")
+ROUTER = os.path.join(ROOT, "bin", "clilog")
+
+DEFAULT_SIZES = "1k,10k,100k"
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 42
+
+# compare: so e regressao se piorar mais que THRESHOLD e mais que o ruido minimo
+DEFAULT_THRESHOLD = 0.10
+NOISE_FLOOR_MS = 1.0
+NOISE_FLOOR_KB = 256
+
+# Arquivo sintetico: datas fixas para que a mesma seed gere sempre os mesmos bytes
+GEN_START = datetime(2024, 1, 1, 8, 0)
+GEN_SPAN_DAYS = 730
+GEN_DUE_RATIO = 0.35
+GEN_LEGACY_RATIO = 0.005
+
+WORDS = (
+    "review deploy fix update write call email meeting report invoice backup refactor test docs "
+    "release server database client budget design sprint ticket bug feature cleanup migrate "
+    "reunião café relatório orçamento revisão tarefa mercado consulta entrega projeto"
+).split()
+# Poucas tags muito usadas e uma cauda longa, como num notes.log de verdade
+TAGS = ("work", "home", "urgent", "idea", "shopping", "health", "finance", "study", "clilog", "travel",
+        "reading", "family", "music", "garden", "car", "taxes", "gym", "books", "movies", "friends")
+TAG_WEIGHTS = [1 / rank for rank in range(1, len(TAGS) + 1)]
+
+SEARCH_WORD = "invoice"
+SEARCH_TAG = "urgent"
+
+EXPORT_NAMES = ("json", "ndjson", "csv", "md")
+
+# Leituras em paralelo enquanto uma thread escreve: CONCURRENT_READERS threads x CONCURRENT_READS GETs
+CONCURRENT_READERS = 8
+CONCURRENT_READS = 25
+CONCURRENT_URLS = ("/api/stats", "/api/cards?cursor=100&limit=100", f"/api/search?q={SEARCH_WORD}", "/api/due")
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    number = text[:-1] if scale > 1 else text
+    try:
+        size = int(float(number) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r} (e.g. 1k, 100k, 1m)")
+    if size < 1:
+        raise argparse.ArgumentTypeError("size must be at least 1")
+    return size
+
+def size_label(size):
+    for suffix, scale in (("m", 1000000), ("k", 1000)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{suffix}"
+    return str(size)
+
+# --- GERADOR ---
+
+def generate_lines(count, seed=DEFAULT_SEED):
+    """Linhas de um notes.log sintetico, nos formatos que o functions.sh e a web escrevem."""
+    rng = random.Random(seed)
+    span = GEN_SPAN_DAYS * 24 * 60
+    for line_num in range(1, count + 1):
+        created = GEN_START + timedelta(minutes=span * (line_num - 1) // count)
+        timestamp = created.strftime("%Y-%m-%d %H:%M")
+        # Notes antigos tendem a estar concluidos
+        done = rng.random() < 0.15 + 0.7 * (1 - line_num / count)
+        mark = "[X]" if done else "[ ]"
+
+        words = rng.choices(WORDS, k=rng.randint(2, 9))
+        content = " ".join(words)
+        if rng.random() < 0.6:
+            tags = set(rng.choices(TAGS, TAG_WEIGHTS, k=rng.randint(1, 3)))
+            content += " " + " ".join(f"#{tag}" for tag in sorted(tags))
+
+        if rng.random() < GEN_LEGACY_RATIO:
+            # Linha antiga, sem ID nem vencimento
+            yield f"{mark} ({timestamp}) {content}"
+            continue
+        due = "-"
+        if rng.random() < GEN_DUE_RATIO:
+            due = (created + timedelta(days=rng.randint(-2, 30))).strftime("%Y-%m-%d")
+        yield f"{line_num}. {mark} | Due: {due} | ({timestamp}) {content}"
+
+def generate(path, count, seed=DEFAULT_SEED):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for line in generate_lines(count, seed):
+            f.write(line + "\n")
+
+# --- MEDICAO ---
+
+class Results:
+    """Tempos (ms) e pico de memoria (KB) de cada benchmark, por tamanho de arquivo."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.entries = []
+
+    def add(self, size, name, runs, peak_kb):
+        entry = {
+            "size": size,
+            "name": name,
+            "min_ms": round(min(runs), 3),
+            "median_ms": round(statistics.median(runs), 3),
+            "max_ms": round(max(runs), 3),
+            "runs_ms": [round(run, 3) for run in runs],
+            "peak_kb": peak_kb,
+        }
+        self.entries.append(entry)
+        print(f"  {size_label(size):>5}  {name:<40} {entry['median_ms']:>10.2f} ms {peak_kb:>10} KB",
+              file=sys.stderr, flush=True)
+
+    def measure(self, size, name, fn, setup=None):
+        """Pico de memoria numa execucao sob tracemalloc (que tambem serve de aquecimento), depois `repeat` execucoes cronometradas."""
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        runs = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            gc.collect()
+            start = time.perf_counter()
+            fn()
+            runs.append((time.perf_counter() - start) * 1000)
+        self.add(size, name, runs, peak // 1024)
+
+def _note_ids(size):
+    # Ids do meio do arquivo em diante, um diferente a cada execucao
+    return itertools.cycle(range(max(1, size // 2), size + 1))
+
+def _expect(response, *statuses):
+    # Consome o corpo inteiro: rotas com streaming so fazem o trabalho aqui
+    response.get_data()
+    if response.status_code not in statuses:
+        raise RuntimeError(f"{response.request.method} {response.request.path}: HTTP {response.status_code}")
+    return response
+
+# --- PYTHON (clilog_web) ---
+
+def bench_python(results, size, source, storage):
+    import clilog_web as cw
+
+    def load():
+        shutil.copyfile(source, cw.NOTES_FILE)
+        for path in (cw.get_book(cw.DEFAULT_BOOK).index_file, cw.DB_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        if storage == "sqlite":
+            cw.SqliteStorage().import_log(cw.NOTES_FILE)
+        cw.set_storage(storage)
+
+    load()
+    results.measure(size, "get_notes.cold", cw.get_notes, setup=lambda: cw.set_storage(storage))
+    results.measure(size, "get_notes.warm", cw.get_notes)
+    if storage == "log":
+        appended = iter(range(size + 1, size + 1000000))
+
+        def append_line():
+            with open(cw.NOTES_FILE, "a", encoding="utf-8") as f:
+                f.write(f"{next(appended)}. [ ] | Due: - | (2026-01-01 09:00) appended from the shell #bench\n")
+        results.measure(size, "get_notes.append", cw.get_notes, setup=append_line)
+
+    client = cw.app.test_client()
+    reads = (
+        "/",
+        "/api/cards?cursor=100&limit=100",
+        "/api/notes",
+        "/api/notes?limit=100",
+        "/api/notes?format=ndjson",
+        f"/api/notes?status=pending&tag={SEARCH_TAG}",
+        f"/api/search?q={SEARCH_WORD}",
+        "/api/tags",
+        "/api/due",
+        "/api/stats",
+    ) + tuple(f"/export?format={name}" for name in EXPORT_NAMES)
+    for url in reads:
+        results.measure(size, f"route.GET {url}", lambda url=url: _expect(client.get(url), 200))
+
+    # Escritas: cada execucao mexe num note diferente
+    ids = _note_ids(size)
+    results.measure(size, f"route.GET x{CONCURRENT_READERS} during writes", lambda: _concurrent_reads(cw, ids))
+    results.measure(size, "route.POST /api/batch done",
+                    lambda: _expect(client.post("/api/batch", json={"ops": [{"op": "done", "id": next(ids)}]}), 200))
+    results.measure(size, "route.POST /add",
+                    lambda: _expect(client.post("/add", data={"text": "benchmark note #bench"}), 302))
+    results.measure(size, "route.GET /done/<id>", lambda: _expect(client.get(f"/done/{next(ids)}"), 302))
+    results.measure(size, "route.GET /undo/<id>", lambda: _expect(client.get(f"/undo/{next(ids)}"), 302))
+    results.measure(size, "route.POST /edit/<id>",
+                    lambda: _expect(client.post(f"/edit/{next(ids)}", data={"content": "edited by the benchmark #bench"}), 200))
+    results.measure(size, "route.GET /delete/<id>", lambda: _expect(client.get(f"/delete/{next(ids)}"), 302))
+
+    # `clilog export`: lido direto do notes.log, sem passar pelo cache
+    load()
+    for name in EXPORT_NAMES:
+        def export(name=name):
+            for _ in cw.export_stream(cw.iter_log_notes(cw.NOTES_FILE), name, cw.ExportSummary()):
+                pass
+        results.measure(size, f"export.{name}", export)
+
+def _concurrent_reads(cw, ids):
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            cw.set_note_status(next(ids), "completed")
+
+    def reader():
+        client = cw.app.test_client()
+        for url in itertools.islice(itertools.cycle(CONCURRENT_URLS), CONCURRENT_READS):
+            _expect(client.get(url), 200)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        with ThreadPoolExecutor(CONCURRENT_READERS) as pool:
+            for future in [pool.submit(reader) for _ in range(CONCURRENT_READERS)]:
+                future.result()
+    finally:
+        stop.set()
+        thread.join()
+
+# --- SHELL (bin/clilog) ---
+
+def install_tree(root):
+    """Copia bin/ e src/ para `root` como o install.sh faria, apontando para la em vez de /usr/local/lib."""
+    lib_dir = os.path.join(root, "lib")
+    os.makedirs(lib_dir)
+    for name in ("functions.sh", "interactive.sh", "clilog_web.py"):
+        shutil.copy(os.path.join(SRC_DIR, name), lib_dir)
+
+    interactive = os.path.join(lib_dir, "interactive.sh")
+    with open(interactive, encoding="utf-8") as f:
+        text = f.read()
+    with open(interactive, "w", encoding="utf-8") as f:
+        f.write(re.sub(r'source ".*functions\.sh"', f'source "{lib_dir}/functions.sh"', text))
+
+    with open(ROUTER, encoding="utf-8") as f:
+        text, found = re.subn(r'if \[\[ -f "/usr/lib/clilog/functions\.sh" \]\].*?\nfi\n',
+                              lambda m: f'LIB_PATH="{lib_dir}"\n', f.read(), count=1, flags=re.S)
+    if not found:
+        raise SystemExit("error: could not find the LIB_PATH lookup in bin/clilog")
+    router = os.path.join(root, "clilog")
+    with open(router, "w", encoding="utf-8") as f:
+        f.write(text)
+    return router
+
+# Processo intermediario pequeno que cria cada comando: o ru_maxrss de um filho herda o RSS de
+# quem fez o fork (o python do benchmark, com o notes.log parseado), entao o fork sai daqui.
+# O pico medido inclui os ~7 MB desse intermediario, igual em todas as execucoes.
+_LAUNCHER = r"""
+import json, os, sys, time
+for line in sys.stdin:
+    args = json.loads(line)
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        null = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(null, fd)
+        try:
+            os.execvp(args[0], args)
+        finally:
+            os._exit(127)
+    _, status, usage = os.wait4(pid, 0)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps([elapsed, usage.ru_maxrss, os.waitstatus_to_exitcode(status)]), flush=True)
+"""
+
+class Launcher:
+    """Executa `clilog args` e devolve (ms, pico de RSS em KB do bash e dos filhos)."""
+
+    def __init__(self, router, env):
+        self.router = router
+        self.env = env
+        self.proc = subprocess.Popen([sys.executable, "-S", "-c", _LAUNCHER], env=env, text=True,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def run(self, args):
+        self.proc.stdin.write(json.dumps(["bash", self.router, *args]) + "\n")
+        self.proc.stdin.flush()
+        elapsed, rss, status = json.loads(self.proc.stdout.readline())
+        if status != 0:
+            raise RuntimeError(f"clilog {' '.join(args)}: exit status {status}")
+        return elapsed, rss
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def _peak_rss(pid):
+    """VmHWM do processo (KB), ou 0 fora do Linux."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _shell_commands(size):
+    ids = _note_ids(size)
+    return (
+        ("list", lambda: ["list"]),
+        ("list due", lambda: ["list", "due"]),
+        ("search", lambda: ["search", SEARCH_WORD]),
+        ("stats", lambda: ["stats"]),
+        ("add", lambda: ["add", "benchmark", "note", "#bench"]),
+        ("done", lambda: ["done", str(next(ids))]),
+        ("undo", lambda: ["undo", str(next(ids))]),
+        ("del", lambda: ["del", str(next(ids))]),
+    )
+
+def bench_shell(results, size, source, router, env, prefix="shell"):
+    shutil.copyfile(source, os.path.join(env["HOME"], ".config", "clilog", "notes.log"))
+    launcher = Launcher(router, env)
+    try:
+        for name, make_args in _shell_commands(size):
+            runs = []
+            peak = 0
+            for _ in range(results.repeat):
+                elapsed, rss = launcher.run(make_args())
+                runs.append(elapsed)
+                peak = max(peak, rss)
+            results.add(size, f"{prefix}.{name}", runs, peak)
+    finally:
+        launcher.close()
+
+def bench_daemon(results, size, source, router, env):
+    """Os mesmos comandos com o `clilog daemon` no ar; o pico do proprio daemon sai em shell_daemon.startup."""
+    shutil.copyfile(source, os.path.join(env["HOME"], ".config", "clilog", "notes.log"))
+    env = dict(env, CLILOG_SOCKET=os.path.join(env["HOME"], "clilog.sock"))
+    start = time.perf_counter()
+    daemon = subprocess.Popen(["bash", router, "daemon"], env=env, stdin=subprocess.DEVNULL,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(env["CLILOG_SOCKET"]):
+            if daemon.poll() is not None:
+                raise RuntimeError(f"clilog daemon exited with status {daemon.returncode}")
+            time.sleep(0.005)
+        startup = (time.perf_counter() - start) * 1000
+        bench_shell(results, size, source, router, env, prefix="shell_daemon")
+        # O bash faz exec do python, entao o pid e o do daemon
+        peak = _peak_rss(daemon.pid)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    results.add(size, "shell_daemon.startup", [startup], peak)
+
+# --- RUN / COMPARE ---
+
+def _git_revision():
+    try:
+        rev = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", ROOT, "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ("-dirty" if dirty else "")
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="clilog-bench-")
+    try:
+        home = os.path.join(workdir, "home")
+        os.makedirs(os.path.join(home, ".config", "clilog"))
+        # clilog_web le o HOME (e o backend) ao ser importado
+        os.environ["HOME"] = home
+        os.environ.pop("CLILOG_STORAGE", None)
+        # Socket inexistente: um daemon do usuario nao pode responder pelos comandos medidos
+        env = dict(os.environ, CLILOG_SOCKET=os.path.join(workdir, "none.sock"))
+        sys.path.insert(0, SRC_DIR)
+
+        router = None
+        if not args.skip_shell:
+            router = install_tree(os.path.join(workdir, "install"))
+
+        results = Results(args.repeat)
+        for size in args.sizes:
+            source = os.path.join(workdir, f"notes-{size_label(size)}.log")
+            generate(source, size, args.seed)
+            print(f"{size_label(size)} notes ({os.path.getsize(source) // 1024} KB)", file=sys.stderr, flush=True)
+            if not args.skip_python:
+                bench_python(results, size, source, args.storage)
+            if router:
+                bench_shell(results, size, source, router, env)
+                if args.daemon:
+                    bench_daemon(results, size, source, router, env)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "storage": args.storage,
+        },
+        "results": results.entries,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if args.output == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+def _load_results(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report.get("meta", {}), {(entry["size"], entry["name"]): entry for entry in report["results"]}
+
+def _change(old, new):
+    return (new - old) / old if old else 0.0
+
+def compare(args):
+    base_meta, base = _load_results(args.base)
+    new_meta, new = _load_results(args.new)
+    print(f"base: {args.base} ({base_meta.get('revision') or '?'})")
+    print(f"new:  {args.new} ({new_meta.get('revision') or '?'})")
+    if base_meta.get("seed") != new_meta.get("seed"):
+        print("warning: the runs used different seeds, so the notes.log files differ")
+    if base_meta.get("storage") != new_meta.get("storage"):
+        print(f"warning: comparing {base_meta.get('storage')} storage against {new_meta.get('storage')}")
+    print()
+    print(f"{'size':>5}  {'benchmark':<40} {'base ms':>10} {'new ms':>10} {'time':>8} {'mem':>8}")
+
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        old, cur = base[key], new[key]
+        time_change = _change(old["median_ms"], cur["median_ms"])
+        mem_change = _change(old["peak_kb"], cur["peak_kb"])
+        flags = []
+        if time_change > args.threshold and cur["median_ms"] - old["median_ms"] > NOISE_FLOOR_MS:
+            flags.append("SLOWER")
+        if mem_change > args.threshold and cur["peak_kb"] - old["peak_kb"] > NOISE_FLOOR_KB:
+            flags.append("MORE MEMORY")
+        regressions += bool(flags)
+        print(f"{size_label(key[0]):>5}  {key[1]:<40} {old['median_ms']:>10.2f} {cur['median_ms']:>10.2f} "
+              f"{time_change:>+8.1%} {mem_change:>+8.1%}  {' '.join(flags)}")
+
+    for label, keys in (("only in base", base.keys() - new.keys()), ("only in new", new.keys() - base.keys())):
+        for size, name in sorted(keys):
+            print(f"{size_label(size):>5}  {name:<40} ({label})")
+
+    print()
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="clilog_bench", description="Reproducible benchmarks for clilog on synthetic notes.log files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="write a synthetic notes.log")
+    gen.add_argument("size", type=parse_size, help="number of notes (e.g. 1k, 100k, 1m)")
+    gen.add_argument("output", help="file to write")
+    gen.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"random seed (default {DEFAULT_SEED})")
+
+    bench = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    bench.add_argument("--sizes", type=lambda text: [parse_size(part) for part in text.split(",")], default=DEFAULT_SIZES,
+                       help=f"comma-separated note counts (default {DEFAULT_SIZES}; 1m is supported but slow)")
+    bench.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"timed runs per benchmark (default {DEFAULT_REPEAT})")
+    bench.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"random seed for the notes.log files (default {DEFAULT_SEED})")
+    bench.add_argument("--storage", choices=("log", "sqlite"), default="log", help="backend for the web benchmarks (default log)")
+    bench.add_argument("--skip-python", action="store_true", help="skip get_notes, the Flask routes and export")
+    bench.add_argument("--skip-shell", action="store_true", help="skip the bin/clilog commands")
+    bench.add_argument("--daemon", action="store_true", help="also time the shell commands answered by `clilog daemon` (needs perl)")
+    bench.add_argument("-o", "--output", default="-", help="JSON file to write, or - for stdout (default)")
+
+    cmp_parser = commands.add_parser("compare", help="compare two result files and flag regressions")
+    cmp_parser.add_argument("base", help="results of the reference run")
+    cmp_parser.add_argument("new", help="results of the run being checked")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"relative slowdown (or memory growth) that counts as a regression (default {DEFAULT_THRESHOLD})")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(args.output, args.size, args.seed)
+        return 0
+    if args.command == "compare":
+        return compare(args)
+    if isinstance(args.sizes, str):
+        args.sizes = [parse_size(part) for part in args.sizes.split(",")]
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    run(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
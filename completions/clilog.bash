@@ -2,31 +2,75 @@
 
 #!/usr/bin/env bash
 
+# Cadernos existentes, na lista do `clilog books` ("* nome: ..." / "  nome: ...")
+_clilog_books() {
+    clilog books 2>/dev/null | sed -n 's/^[* ] \([A-Za-z0-9_-]*\): .*/\1/p'
+}
+
 _clilog_completions() {
-    local cur prev cmds opts
+    local cur prev cmds opts book cmd_index
     COMPREPLY=()
     cur="${COMP_WORDS[COMP_CWORD]}"
     prev="${COMP_WORDS[COMP_CWORD-1]}"
-    cmds="add list done undo del clear search edit tag export web version help stats interactive"
+    cmds="add list done undo del clear search edit tag export web version help stats interactive db daemon archive books"
+
+    # `--book NOME` vem antes do comando
+    book="${CLILOG_BOOK:-notes}"
+    cmd_index=1
+    if [[ "${COMP_WORDS[1]}" == "--book" ]]; then
+        book="${COMP_WORDS[2]}"
+        cmd_index=3
+    fi
+
+    if [[ "$prev" == "--book" ]]; then
+        COMPREPLY=( $(compgen -W "$(_clilog_books)" -- "$cur") )
+        return
+    fi
+    if (( COMP_CWORD == cmd_index )); then
+        (( cmd_index == 1 )) && cmds="--book $cmds"
+        COMPREPLY=( $(compgen -W "$cmds" -- "$cur") )
+        return
+    fi
+
+    # Opcoes em qualquer posicao depois do comando
+    if [[ "$cur" == -* ]]; then
+        case "${COMP_WORDS[cmd_index]}" in
+            archive)
+                COMPREPLY=( $(compgen -W "--days --compress --list" -- "$cur") )
+                ;;
+            export)
+                COMPREPLY=( $(compgen -W "--archive" -- "$cur") )
+                ;;
+            books)
+                COMPREPLY=( $(compgen -W "--search --limit" -- "$cur") )
+                ;;
+        esac
+        return
+    fi
 
     case "$prev" in
-        clilog)
-            COMPREPLY=( $(compgen -W "$cmds" -- "$cur") )
-            ;;
         tag)
             COMPREPLY=( $(compgen -W "add remove move" -- "$cur") )
             ;;
         export)
-            COMPREPLY=( $(compgen -W "markdown json csv" -- "$cur") )
+            COMPREPLY=( $(compgen -W "markdown json csv ndjson" -- "$cur") )
+            ;;
+        db)
+            COMPREPLY=( $(compgen -W "import export" -- "$cur") )
+            ;;
+        archive)
+            COMPREPLY=( $(compgen -W "--days --compress --list" -- "$cur") )
+            ;;
+        books)
+            COMPREPLY=( $(compgen -W "--search --limit" -- "$cur") )
             ;;
         done|undo|del|edit|tag)
-            # Sugere IDs existentes (lendo do notes.log)
-            if [[ -f "$HOME/.config/clilog/notes.log" ]]; then
-                COMPREPLY=( $(awk -F'. ' '{print $1}' "$HOME/.config/clilog/notes.log") )
+            # Sugere IDs existentes (lendo do log do caderno)
+            if [[ -f "$HOME/.config/clilog/$book.log" ]]; then
+                COMPREPLY=( $(awk -F'. ' '{print $1}' "$HOME/.config/clilog/$book.log") )
             fi
             ;;
     esac
 }
 
 complete -F _clilog_completions clilog
-
@@ -1,6 +1,15 @@
 # === CLILOG.FISH (Completions for fish shell) ===
 
-complete -c clilog -f -a "add list done undo del clear search edit tag export web version help stats interactive"
+complete -c clilog -f -a "add list done undo del clear search edit tag export web version help stats interactive db daemon archive books"
+
+complete -c clilog -l book -x -a "(clilog books 2>/dev/null | string replace -rf '^[* ] ([A-Za-z0-9_-]+): .*' '\$1')" -d "Run the command on another notebook"
 
 complete -c clilog -n "__fish_seen_subcommand_from tag" -a "add remove move"
-complete -c clilog -n "__fish_seen_subcommand_from export" -a "markdown json csv"
+complete -c clilog -n "__fish_seen_subcommand_from export" -a "markdown json csv ndjson"
+complete -c clilog -n "__fish_seen_subcommand_from db" -a "import export"
+complete -c clilog -n "__fish_seen_subcommand_from export" -l archive -d "Also export the archived notes"
+complete -c clilog -n "__fish_seen_subcommand_from archive" -l days -x -d "Archive completed notes created more than N days ago"
+complete -c clilog -n "__fish_seen_subcommand_from archive" -l compress -d "gzip the new segment"
+complete -c clilog -n "__fish_seen_subcommand_from archive" -l list -d "Only list the existing segments"
+complete -c clilog -n "__fish_seen_subcommand_from books" -l search -x -d "Search every notebook"
+complete -c clilog -n "__fish_seen_subcommand_from books" -l limit -x -d "Maximum search results"
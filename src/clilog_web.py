@@ -3,106 +3,1940 @@ CLILOG_WEB.PY
 """
 
 #!/usr/bin/env python3
-from flask import Flask, render_template_string, request, redirect, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, flash, jsonify
+from flask.json.provider import DefaultJSONProvider
+import argparse
+import bisect
+import cProfile
+import csv
+import fcntl
+import gc
+import gzip
+import io
+import itertools
+import json
+import locale
+import marshal
 import os
+import pstats
+import queue
+import random
 import re
-from datetime import datetime
+import select
+import selectors
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from http.server import BaseHTTPRequestHandler
+from werkzeug.wsgi import ClosingIterator, LimitedStream
+from wsgiref import simple_server
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = 'clilog_web_secret_key_2024'
 
-NOTES_FILE = os.path.expanduser("~/.config/clilog/notes.log")
+NOTES_DIR = os.path.expanduser("~/.config/clilog")
 
-def get_notes():
-    if not os.path.exists(NOTES_FILE):
-        return []
+# --- CADERNOS ---
+# Cada <nome>.log em NOTES_DIR e um caderno independente: `clilog --book <nome>` no terminal
+# e /b/<nome>/... na web. O padrao e o notes.log (ou o caderno de $CLILOG_BOOK).
+# Um processo atende todos: cada caderno tem o seu cache, views, lock e thread de escrita,
+# e so e lido no primeiro acesso. As funcoes do modulo sempre usam o caderno de _book().
+DEFAULT_BOOK = os.environ.get("CLILOG_BOOK") or "notes"
+BOOK_NAME_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+NOTES_FILE = os.path.join(NOTES_DIR, f"{DEFAULT_BOOK}.log")
+
+class Notebook:
+    def __init__(self, name):
+        self.name = name
+        self.path = self.file(".log")
+        self.index_file = self.path + ".idx"
+        self.lock_file = self.file(".lock")
+        self.archive_dir = ARCHIVE_DIR if name == "notes" else os.path.join(ARCHIVE_DIR, name)
+        # Versao publicada dos notes parseados, com a versao do arquivo (inode, size, mtime_ns) em 'key'.
+        # Escritas feitas pelo functions.sh mudam a versao e forcam um novo parse.
+        # 'offset' e 'crc' guardam quantos bytes ja foram parseados e o crc32 desse prefixo:
+        # se o arquivo so cresceu (append), apenas o final novo e parseado.
+        # 'dead' lista os tombstones do arquivo como (id, bytes da linha) e 'max_dead' e o maior desses ids.
+        # O dict e as listas dele nunca mudam depois de publicados (ver _publish): quem le pega a
+        # referencia sem lock. O cache_lock so serializa recarregamentos, publicacoes e as views.
+        self.cache_lock = threading.RLock()
+        self.snapshot = None
+        self.reset_cache()
+        self.lock_owner = None  # thread com o flock exclusivo do caderno
+        self.offsets = {'key': None, 'offsets': {}}
+        self.write_queue = queue.Queue()
+        self.writer = {'thread': None}
+        self.compactor = {'thread': None, 'wake': threading.Event()}
+        self.search_results = OrderedDict()
+        self.archive = {'segments': {}, 'search': None}  # segments: caminho -> (versao, notes)
+        self.archive_lock = threading.Lock()
+        self.feed = ChangeFeed(self)
+        self.open_storage(_books['storage'])
+
+    def file(self, suffix):
+        return os.path.join(NOTES_DIR, self.name + suffix)
+
+    def reset_cache(self, loaded=False):
+        # loaded: a versao vazia e a do disco (arquivo inexistente), nao a de antes da primeira leitura
+        self.loaded = loaded
+        self.snapshot = {'key': None, 'notes': [], 'offset': 0, 'crc': 0, 'lines': 0, 'newline': True,
+                         'views': {}, 'dead': [], 'max_dead': 0}
+
+    def open_storage(self, name):
+        backend = STORAGE_BACKENDS[name]
+        with self.cache_lock:
+            self.storage = backend(self.file(backend.suffix))
+            self.reset_cache()
+
+_books = {'storage': os.environ.get('CLILOG_STORAGE', 'log'), 'loaded': {}, 'pool': None, 'pid': None}
+_books_lock = threading.Lock()
+# Caderno da thread: o do request (ver _NotebookApp), o da thread de escrita dele ou o padrao
+_current = threading.local()
+
+def get_book(name):
+    """Caderno `name`, criado (sem ler nada do disco) no primeiro uso."""
+    if not BOOK_NAME_RE.fullmatch(name or ""):
+        raise ValueError(f"invalid notebook name '{name}' (use letters, digits, '-' and '_')")
+    book = _books['loaded'].get(name)
+    if book is None:
+        with _books_lock:
+            book = _books['loaded'].get(name)
+            if book is None:
+                book = _books['loaded'][name] = Notebook(name)
+    return book
+
+def book_exists(name):
+    """O caderno padrao sempre existe; os outros, se tem arquivo no backend ativo."""
+    if not BOOK_NAME_RE.fullmatch(name or ""):
+        return False
+    suffix = STORAGE_BACKENDS[_books['storage']].suffix
+    return name == DEFAULT_BOOK or os.path.exists(os.path.join(NOTES_DIR, name + suffix))
+
+def _book():
+    return getattr(_current, 'book', None) or get_book(DEFAULT_BOOK)
+
+@contextmanager
+def using_book(book):
+    previous = getattr(_current, 'book', None), getattr(_current, 'snapshot', None)
+    _current.book, _current.snapshot = book, None
+    try:
+        yield book
+    finally:
+        _current.book, _current.snapshot = previous
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def _fd_key(f):
+    st = os.fstat(f.fileno())
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+# --- METRICAS ---
+# Contadores e histogramas em memoria, expostos em /metrics no formato texto do Prometheus.
+# Cada registro e um dict + um lock curto; nada e formatado ate alguem fazer o scrape.
+# Com --workers > 1 cada processo tem os seus numeros.
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = []
+_metrics_lock = threading.Lock()
+# Fases (io, parse, render, json, write) do request atendido pela thread atual
+_request_state = threading.local()
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricCounter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values = {}
+        _metrics.append(self)
+
+    def inc(self, *labels, amount=1):
+        with _metrics_lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with _metrics_lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_text(self.labels, labels)} {_number(value)}"
+
+class MetricGauge:
+    """Valor lido na hora do scrape."""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        self.name, self.help, self.read = name, help_text, read
+        _metrics.append(self)
+
+    def samples(self):
+        yield f"{self.name} {_number(self.read())}"
+
+class MetricHistogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=METRICS_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values = {}  # labels -> [contagem por bucket..., +Inf, soma]
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with _metrics_lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+            counts[i] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with _metrics_lock:
+            values = sorted((labels, list(counts)) for labels, counts in self.values.items())
+        for labels, counts in values:
+            total = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                total += count
+                le = bound if isinstance(bound, str) else repr(bound)
+                yield f"{self.name}_bucket{_label_text(self.labels + ('le',), labels + (le,))} {total}"
+            yield f"{self.name}_sum{_label_text(self.labels, labels)} {_number(counts[-1])}"
+            yield f"{self.name}_count{_label_text(self.labels, labels)} {total}"
+
+def render_metrics():
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+@contextmanager
+def _timed(phase):
+    """Soma o tempo do bloco na fase `phase` do request em andamento (se houver)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = getattr(_request_state, 'phases', None)
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+_bytes_read = MetricCounter("clilog_notes_bytes_read_total", "Bytes read from notes.log.")
+_bytes_written = MetricCounter("clilog_notes_bytes_written_total", "Bytes written to notes.log.")
+_cache_lookups = MetricCounter("clilog_cache_lookups_total", "Lookups of the parsed notes cache, by result.", ("result",))
+_reparses = MetricCounter("clilog_reparses_total", "Notes reloaded into the cache: full parse or only the appended tail.", ("kind",))
+_parsed_notes = MetricCounter("clilog_parsed_notes_total", "Notes parsed while (re)loading the cache.")
+_compressed_cache = MetricCounter("clilog_compressed_cache_total", "Lookups of the compressed response cache, by result.", ("result",))
+_commits = MetricCounter("clilog_commits_total", "Write batches committed, by how they reached storage.", ("mode",))
+_mutation_seconds = MetricHistogram("clilog_mutation_seconds", "Latency of a mutation as seen by the caller (queue + commit), by op.", ("op",))
+_write_batch_seconds = MetricHistogram("clilog_write_batch_seconds", "Time to apply and commit one write batch, lock wait included.")
+_write_batch_ops = MetricCounter("clilog_write_batch_ops_total", "Ops applied by the write batches.")
+_compactions = MetricCounter("clilog_compactions_total", "Rewrites of notes.log that dropped the tombstones of deleted notes.")
+_event_streams_rejected = MetricCounter("clilog_event_streams_rejected_total", "/api/events requests refused with 503 at the stream limit.")
+_snapshot_retries = MetricCounter("clilog_snapshot_retries_total", "Reads restarted because a write published a new version mid-request.")
+
+# Formato canonico escrito pelo functions.sh e pela web:
+#   "N. [ ] | Due: YYYY-MM-DD | (YYYY-MM-DD HH:MM) conteudo #tag"
+# Linhas nesse formato sao resolvidas com um unico match; o resto cai no parser antigo.
+_LINE_RE = re.compile(r'(\d+)\.\s+\[[ X]\]\s+\|\s*Due:\s*([^|(]+?)\s*\|\s*\((\d{4}-\d{2}-\d{2} \d{2}:\d{2})\)')
+_ID_RE = re.compile(r'^(\d+)\.\s+')
+_DUE_RE = re.compile(r'\|\s*Due:\s*([^\|]+?)\s*\|')
+_TIMESTAMP_RE = re.compile(r'\((\d{4}-\d{2}-\d{2} \d{2}:\d{2})\)')
+_PREFIX_RE = re.compile(r'^\d+\.\s+\[.\]\s+\|\s*Due:.*?\|\s*')
+_TAG_RE = re.compile(r'#(\w+)')
+# Note apagado: o marcador vira "[D]" no lugar ("N. [D] | Due: ...") e a linha fica no arquivo,
+# entao os IDs dos outros notes nao mudam. Todo leitor pula essas linhas.
+_TOMBSTONE_RE = re.compile(r'(\d+\.\s+)?\[D\]')
+
+class NoteRecord:
+    """Uma linha do notes.log. O conteudo e derivado de `raw`, que nao e duplicado."""
+
+    __slots__ = ('id', 'status', 'due_date', 'timestamp', 'tags', 'raw', '_start')
+
+    def __init__(self, note_id, status, due_date, timestamp, tags, raw, start):
+        self.id = note_id
+        self.status = status
+        self.due_date = due_date
+        self.timestamp = timestamp
+        self.tags = tags
+        self.raw = raw
+        self._start = start
+
+    @property
+    def content(self):
+        body = self.raw[self._start:]
+        if self.tags:
+            body = _TAG_RE.sub('', body)
+        return body.strip()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'due_date': self.due_date,
+            'timestamp': self.timestamp,
+            'content': self.content,
+            'tags': list(self.tags),
+            'raw': self.raw
+        }
+
+def _parse_line(line, line_num, _intern=sys.intern):
+    status = "completed" if "[X]" in line else "pending"
     
+    m = _LINE_RE.match(line)
+    if m:
+        note_id, due_date, timestamp = m.groups()
+        note_id = int(note_id)
+        due_date = _intern(due_date.strip())
+        start = m.end()
+    else:
+        id_match = _ID_RE.match(line)
+        note_id = int(id_match.group(1)) if id_match else line_num
+        
+        due_match = _DUE_RE.search(line)
+        due_date = _intern(due_match.group(1).strip()) if due_match else "-"
+        
+        timestamp_match = _TIMESTAMP_RE.search(line)
+        timestamp = timestamp_match.group(1) if timestamp_match else ""
+        
+        if timestamp_match:
+            start = timestamp_match.end()
+        else:
+            prefix_match = _PREFIX_RE.match(line)
+            start = prefix_match.end() if prefix_match else 0
+    
+    tags = tuple(map(_intern, _TAG_RE.findall(line, start))) if '#' in line else ()
+    
+    return NoteRecord(note_id, status, due_date, timestamp, tags, line, start)
+
+def _parse_lines(text, first_line_num=1, dead=None):
+    """Notes das linhas de `text`; os tombstones vao para `dead` como (id, bytes da linha)."""
     notes = []
-    with open(NOTES_FILE, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
+    append = notes.append
+    # Parse em lote cria muitos objetos de uma vez; o GC ciclico so atrapalha aqui
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for line_num, line in enumerate(text.split('\n'), first_line_num):
             line = line.strip()
             if not line:
                 continue
-            
-            id_match = re.match(r'^(\d+)\.\s+', line)
-            note_id = int(id_match.group(1)) if id_match else line_num
-            
-            status = "completed" if "[X]" in line else "pending"
-            due_match = re.search(r'\|\s*Due:\s*([^\|]+?)\s*\|', line)
-            due_date = due_match.group(1).strip() if due_match else "-"
-            
-            timestamp_match = re.search(r'\((\d{4}-\d{2}-\d{2} \d{2}:\d{2})\)', line)
-            timestamp = timestamp_match.group(1) if timestamp_match else ""
-            
-            content = line
-            if timestamp_match:
-                content = line[timestamp_match.end():].strip()
-            else:
-                content = re.sub(r'^\d+\.\s+\[.\]\s+\|\s*Due:.*?\|\s*', '', line).strip()
-            
-            tags = re.findall(r'#(\w+)', content)
-            content_without_tags = re.sub(r'#\w+', '', content).strip()
-            
-            notes.append({
-                'id': note_id,
-                'status': status,
-                'due_date': due_date,
-                'timestamp': timestamp,
-                'content': content_without_tags,
-                'tags': tags,
-                'raw': line
-            })
-    
+            if '[D]' in line and _TOMBSTONE_RE.match(line):
+                if dead is not None:
+                    id_match = _ID_RE.match(line)
+                    dead.append((int(id_match.group(1)) if id_match else line_num, len(line.encode('utf-8'))))
+                continue
+            append(_parse_line(line, line_num))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
     return notes
 
-def save_notes(notes_data):
-    with open(NOTES_FILE, 'w', encoding='utf-8') as f:
-        for note in notes_data:
-            f.write(note['raw'] + '\n')
+def _decode(data):
+    text = data.decode('utf-8')
+    # Mesmo comportamento do modo texto (universal newlines)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
 
-def update_note_in_file(note_id, new_content, status=None):
-    notes = get_notes()
-    
-    for note in notes:
-        if note['id'] == note_id:
-            status_prefix = "[X]" if status == "completed" else ("[ ]" if status else ("[X]" if note['status'] == "completed" else "[ ]"))
-            due_str = f"| Due: {note['due_date']} |"
-            timestamp_str = f"({note['timestamp']})" if note['timestamp'] else f"({datetime.now().strftime('%Y-%m-%d %H:%M')})"
-            tags_str = " " + " ".join(f"#{tag}" for tag in note['tags']) if note['tags'] else ""
-            
-            new_raw = f"{note_id}. {status_prefix} {due_str} {timestamp_str} {new_content}{tags_str}"
-            note['raw'] = new_raw
-            note['content'] = new_content
-            if status:
-                note['status'] = status
+def _parse_notes_file():
+    with open(_book().path, 'rb') as f:
+        return _parse_lines(_decode(f.read()))
+
+def _prefix_crc(f, size):
+    crc = 0
+    remaining = size
+    while remaining > 0:
+        chunk = f.read(min(remaining, 1 << 20))
+        if not chunk:
             break
+        crc = zlib.crc32(chunk, crc)
+        remaining -= len(chunk)
+    return crc
+
+def _can_parse_tail(key):
+    c = _book().snapshot
+    return (c['key'] is not None and c['key'][0] == key[0] and c['newline']
+            and 0 < c['offset'] <= key[1])
+
+def _refresh_cache(key):
+    """Le o notes.log e publica a versao nova. A leitura e feita com o flock compartilhado:
+    com alguem escrevendo (o shell ou a thread de escrita), fica a versao ja publicada."""
+    book = _book()
+    c = book.snapshot
+    with _notes_read_lock() as locked:
+        if not locked:
+            return
+        with open(book.path, 'rb') as f:
+            # A versao e a do arquivo aberto, lido exatamente ate o tamanho dela
+            key = _fd_key(f)
+            with _timed('io'):
+                # O prefixo ja parseado e relido so para o crc: se bater, basta parsear o final
+                checked = c['offset'] if _can_parse_tail(key) else 0
+                tail = checked > 0 and _prefix_crc(f, checked) == c['crc']
+                if not tail:
+                    f.seek(0)
+                data = f.read(key[1] - f.tell())
+    _bytes_read.inc(amount=checked + len(data))
+    with _timed('parse'):
+        text = _decode(data)
+        dead = []
+        new_notes = _parse_lines(text, c['lines'] + 1 if tail else 1, dead)
+    _parsed_notes.inc(amount=len(new_notes))
+    if tail:
+        _reparses.inc('incremental')
+        _publish(c, [(None, note) for note in new_notes], key=key, notes=c['notes'] + new_notes,
+                 dead=c['dead'] + dead, max_dead=max([c['max_dead']] + [note_id for note_id, _ in dead]),
+                 crc=zlib.crc32(data, c['crc']), offset=c['offset'] + len(data),
+                 lines=c['lines'] + text.count('\n'), newline=data.endswith(b'\n') if data else c['newline'])
+    else:
+        _reparses.inc('full')
+        _publish(c, key=key, notes=new_notes, views={}, dead=dead,
+                 max_dead=max([note_id for note_id, _ in dead], default=0), crc=zlib.crc32(data),
+                 offset=len(data), lines=text.count('\n'), newline=not data or data.endswith(b'\n'))
+
+def _publish(base, changes=None, **fields):
+    """Troca a versao publicada por `base` com `fields` (read-copy-update): quem ja tem a
+    anterior continua com ela. As views andam junto, atualizadas no lugar com `changes`;
+    se outra thread recarregou do disco depois de `base`, elas sao refeitas na proxima consulta."""
+    book = _book()
+    with book.cache_lock:
+        current = book.snapshot
+        if current is not base:
+            if current['key'] is not None and current['key'] == fields.get('key'):
+                return current
+            fields['views'] = {}
+        elif changes:
+            for view in base['views'].values():
+                for old, new in changes:
+                    view.update(old, new)
+        snapshot = book.snapshot = dict(base, **fields)
+        book.loaded = True
+        return snapshot
+
+def _fresh_snapshot():
+    """Versao publicada, recarregada antes se o arquivo mudou. O caminho comum (versao igual
+    a do disco) e um stat e nenhum lock."""
+    book = _book()
+    while True:
+        snapshot = book.snapshot
+        key = book.storage.key()
+        if key == snapshot['key']:
+            _cache_lookups.inc('hit')
+            return snapshot
+        with book.cache_lock:
+            # Outra thread pode ter recarregado enquanto esta esperava o lock
+            snapshot = book.snapshot
+            key = book.storage.key()
+            if key is None:
+                book.reset_cache(loaded=True)
+                return book.snapshot
+            if key == snapshot['key']:
+                _cache_lookups.inc('hit')
+                return snapshot
+            book.storage.refresh(key)
+            if book.snapshot is not snapshot:
+                _cache_lookups.inc('miss')
+                return book.snapshot
+            # Alguem esta escrevendo: a versao publicada continua valendo
+            _cache_lookups.inc('busy')
+            if book.loaded:
+                return snapshot
+        # Nada lido ainda: espera a escrita terminar e tenta de novo. Nunca com o cache_lock,
+        # porque quem escreve pega o flock e depois o cache_lock para publicar
+        with _notes_read_lock(wait=True):
+            pass
+
+def _snapshot():
+    """Versao dos notes que a thread le. Numa request a primeira versao lida fica fixa ate o
+    fim dela (ver _NotebookApp): corpo, ETag e X-Clilog-Version saem todos da mesma.
+    Chame antes de pegar o cache_lock (ver _fresh_snapshot)."""
+    snapshot = getattr(_current, 'snapshot', None)
+    if snapshot is None:
+        snapshot = _fresh_snapshot()
+        if getattr(_current, 'pin', False):
+            _current.snapshot = snapshot
+    return snapshot
+
+def _version_tag(key):
+    return f"{key[0]:x}-{key[1]:x}-{key[2]:x}" if key else "empty"
+
+def get_notes(include_archive=False):
+    # Copia rasa: quem chama pode reordenar/filtrar a lista sem afetar a versao publicada
+    notes = list(_snapshot()['notes'])
+    if include_archive:
+        # Os segmentos guardam notes mais antigos: vem antes, como estavam no notes.log
+        notes[:0] = _archive_snapshot()[1]
+    return notes
+
+def _store_cache(base, notes, key, data, changes=None, dead=(), max_dead=0):
+    _publish(base, changes, key=key, notes=notes, offset=len(data), crc=zlib.crc32(data),
+             lines=len(notes) + len(dead), newline=True, dead=list(dead), max_dead=max_dead,
+             views=base['views'] if changes is not None else {})
+
+# --- INDICES DERIVADOS ---
+# Estruturas montadas a partir dos notes em cache (busca, ...). Sao criadas na primeira
+# consulta, atualizadas a cada mutacao com pares (antigo, novo) e descartadas quando
+# o arquivo muda por fora e precisa de um parse completo.
+# Elas sempre correspondem a versao publicada: uma request fixa numa versao anterior
+# (uma escrita publicou no meio dela) recomeca na nova (ver _versioned) ou monta a sua.
+_VIEW_TYPES = {}
+
+class _StaleSnapshot(Exception):
+    """A versao fixa da request deixou de ser a publicada antes de ela consultar uma view."""
+
+def _register_view(name):
+    def register(cls):
+        _VIEW_TYPES[name] = cls
+        return cls
+    return register
+
+def _view_snapshot():
+    return getattr(_current, 'snapshot', None) or _book().snapshot
+
+def _get_view(name):
+    """Deve ser chamada com o cache_lock do caderno: a view e alterada pela thread de escrita.
+    Nao recarrega nada: usa a versao fixa da request ou a publicada (chame _snapshot() antes)."""
+    book = _book()
+    c = _view_snapshot()
+    if c is not book.snapshot:
+        if getattr(_current, 'retry', False):
+            raise _StaleSnapshot()
+        return _VIEW_TYPES[name](c['notes'])
+    view = c['views'].get(name)
+    if view is None:
+        view = c['views'][name] = _VIEW_TYPES[name](c['notes'])
+    return view
+
+def _build_raw(note, content, status, tags=None):
+    tags = note.tags if tags is None else tags
+    status_prefix = "[X]" if status == "completed" else "[ ]"
+    due_str = f"| Due: {note.due_date} |"
+    timestamp_str = f"({note.timestamp})" if note.timestamp else f"({datetime.now().strftime('%Y-%m-%d %H:%M')})"
+    tags_str = " " + " ".join(f"#{tag}" for tag in tags) if tags else ""
+    return f"{note.id}. {status_prefix} {due_str} {timestamp_str} {content}{tags_str}"
+
+def save_notes(notes_data, changes=None, tombstones=()):
+    """Reescreve o notes.log so com os notes vivos: toda reescrita tambem compacta os tombstones."""
+    # Os IDs nao podem mudar: linhas antigas sem "N. " ganham o id que tinham (o numero da
+    # linha), e o tombstone do maior id fica, senao o proximo add reaproveitaria esse numero
+    notes = []
+    for note in notes_data:
+        if not _ID_RE.match(note.raw):
+            pinned = _parse_line(f"{note.id}. {note.raw}", note.id)
+            if changes is not None:
+                changes = changes + [(note, pinned)]
+            note = pinned
+        notes.append(note)
+    book = _book()
+    base = book.snapshot
+    lines = [note.raw for note in notes]
+    dead = []
+    max_dead = max([base['max_dead']] + [note.id for note in tombstones])
+    if max_dead > max([note.id for note in notes], default=0):
+        lines.append(f"{max_dead}. [D]")
+        dead.append((max_dead, len(lines[-1])))
+    data = ''.join(line + '\n' for line in lines).encode('utf-8')
+    # Reescrita atomica, igual ao "awk > tmp && mv" do functions.sh
+    tmp_file = book.path + ".tmp"
+    with _timed('io'):
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            key = _fd_key(f)
+        os.replace(tmp_file, book.path)
+    _bytes_written.inc(amount=len(data))
+    _store_cache(base, notes, key, data, changes, dead, max_dead)
+    return False
+
+# Indice id -> offset (em bytes) do marcador "[ ]"/"[X]" de cada linha.
+# Fica salvo em notes.log.idx (Notebook.offsets em memoria) e vale enquanto inode e tamanho
+# do arquivo nao mudarem; como "[ ]" e "[X]" tem o mesmo tamanho, done/undo trocam o marcador no lugar.
+_MARKER_RE = re.compile(rb'^[ \t]*(\d+)\.[ \t]+(?=\[[ X]\])', re.M)
+
+def _build_offset_index(key):
+    book = _book()
+    offsets = {}
+    with _timed('io'), open(book.path, 'rb') as f:
+        data = f.read()
+    _bytes_read.inc(amount=len(data))
+    for m in _MARKER_RE.finditer(data):
+        offsets.setdefault(int(m.group(1)), m.end())
     
-    with open(NOTES_FILE, 'w', encoding='utf-8') as f:
-        for note in notes:
-            f.write(note['raw'] + '\n')
+    tmp_file = book.index_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(f"{key[0]} {key[1]}\n")
+        f.writelines(f"{note_id} {offset}\n" for note_id, offset in offsets.items())
+    os.replace(tmp_file, book.index_file)
+    return offsets
+
+def _load_offset_index(key):
+    try:
+        with open(_book().index_file, 'r', encoding='utf-8') as f:
+            if f.readline().split() != [str(key[0]), str(key[1])]:
+                return None
+            return {int(note_id): int(offset) for note_id, offset in map(str.split, f)}
+    except (OSError, ValueError):
+        return None
+
+def _offset_for(note_id, key):
+    index = _book().offsets
+    if index['key'] != key[:2]:
+        offsets = _load_offset_index(key)
+        if offsets is None:
+            offsets = _build_offset_index(key)
+        index['key'], index['offsets'] = key[:2], offsets
+    return index['offsets'].get(note_id)
+
+def _marker_pos(note):
+    id_match = _ID_RE.match(note.raw)
+    if id_match and note.raw[id_match.end():id_match.end() + 3] in ("[ ]", "[X]"):
+        return id_match.end()
+    return None
+
+# --- ESCRITA ---
+# Todas as mutacoes passam por uma unica thread de escrita. O que chega dentro de
+# WRITE_BATCH_WINDOW vira um unico append/patch/reescrita com um unico fsync,
+# feito com flock em notes.lock (o functions.sh usa o mesmo lock). Cada caderno tem a
+# sua fila, a sua thread e o seu <nome>.lock.
+WRITE_BATCH_WINDOW = 0.002
+WRITE_BATCH_MAX = 512
+# Um delete so marca o tombstone; quando eles passam de COMPACT_MIN_TOMBSTONES e de
+# COMPACT_RATIO das linhas do arquivo, a thread de compactacao reescreve o notes.log
+# (o functions.sh usa os mesmos limites)
+COMPACT_MIN_TOMBSTONES = 64
+COMPACT_RATIO = 0.25
+
+_writer_start_lock = threading.Lock()
+
+@contextmanager
+def _notes_file_lock():
+    book = _book()
+    os.makedirs(os.path.dirname(book.lock_file), exist_ok=True)
+    with open(book.lock_file, 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        book.lock_owner = threading.get_ident()
+        try:
+            yield
+        finally:
+            book.lock_owner = None
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def _notes_read_lock(wait=False):
+    """flock compartilhado para ler o arquivo inteiro de uma vez; da False (sem `wait`) se
+    alguem esta escrevendo. A thread que ja tem o flock exclusivo le direto."""
+    book = _book()
+    if book.lock_owner == threading.get_ident():
+        yield True
+        return
+    try:
+        lock = open(book.lock_file, 'a')
+    except FileNotFoundError:
+        yield True  # sem NOTES_DIR ainda: ninguem escreve
+        return
+    with lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_SH if wait else fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
 
-def add_note_to_file(content, tags=None):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    tags_str = " " + " ".join(f"#{tag}" for tag in (tags or [])) if tags else ""
+def _select(notes, selector):
+    """Indices afetados: um id (primeira ocorrencia, como no resto do app) ou ('tag', nome) para todos com a tag."""
+    if isinstance(selector, tuple):
+        tag = selector[1]
+        return [i for i, note in enumerate(notes) if tag in note.tags]
+    for i, note in enumerate(notes):
+        if note.id == selector:
+            return [i]
+    return []
+
+def _apply_ops(notes, ops):
+    """Aplica as mutacoes sobre `notes` e diz como grava-las: append, patch dos marcadores
+    (done/undo e os tombstones dos deletes) ou reescrita."""
+    results = []
+    changes = []
+    appended = []
+    flips = {}
+    tombstones = []
+    rewrite = False
+    original_len = len(notes)
+    max_id = None
+    
+    for op in ops:
+        kind = op[0]
+        op_changes = []
+        if kind == 'add':
+            _, content, tags, due_date = op
+            if max_id is None:
+                # Ids de notes apagados tambem contam: um id nunca e reaproveitado
+                max_id = max([n.id for n in notes] + [n.id for n in tombstones] + [_book().snapshot['max_dead']])
+            max_id += 1
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+            tags_str = " " + " ".join(f"#{tag}" for tag in tags) if tags else ""
+            new_line = f"{max_id}. [ ] | Due: {due_date or '-'} | ({timestamp}) {content}{tags_str}"
+            new_note = _parse_line(new_line, 0)
+            notes.append(new_note)
+            op_changes.append((None, new_note))
+            appended.append(new_line)
+        elif kind == 'status':
+            _, selector, status = op
+            for i in _select(notes, selector):
+                note = notes[i]
+                pos = _marker_pos(note)
+                new_note = None
+                if pos is not None and i < original_len:
+                    marker = "[X]" if status == "completed" else "[ ]"
+                    new_note = _parse_line(note.raw[:pos] + marker + note.raw[pos + 3:], note.id)
+                if new_note is not None and new_note.status == status:
+                    flips.setdefault(i, note)
+                else:
+                    new_note = _parse_line(_build_raw(note, note.content, status), note.id)
+                    rewrite = True
+                notes[i] = new_note
+                op_changes.append((note, new_note))
+        elif kind == 'update':
+            _, selector, new_content, status = op
+            for i in _select(notes, selector):
+                note = notes[i]
+                notes[i] = _parse_line(_build_raw(note, new_content, status or note.status), note.id)
+                op_changes.append((note, notes[i]))
+                rewrite = True
+        elif kind == 'tag':
+            _, selector, add_tags, remove_tags = op
+            for i in _select(notes, selector):
+                note = notes[i]
+                tags = [tag for tag in note.tags if tag not in remove_tags]
+                tags.extend(tag for tag in add_tags if tag not in tags)
+                if tags != list(note.tags):
+                    notes[i] = _parse_line(_build_raw(note, note.content, note.status, tags), note.id)
+                    op_changes.append((note, notes[i]))
+                    rewrite = True
+        elif kind == 'delete':
+            _, selector = op
+            if isinstance(selector, tuple):
+                doomed = _select(notes, selector)
+            else:
+                doomed = [i for i, note in enumerate(notes) if note.id == selector]
+            for i in reversed(doomed):
+                note = notes.pop(i)
+                op_changes.append((note, None))
+                if i < original_len:
+                    # Vira tombstone no disco; o patch confere a linha como ela esta la
+                    disk_note = flips.pop(i, note)
+                    tombstones.append(disk_note)
+                    if _marker_pos(disk_note) is None:
+                        rewrite = True
+                    original_len -= 1
+                elif note.raw in appended:
+                    appended.remove(note.raw)
+                flips = {j - (j > i): old for j, old in flips.items()}
+            op_changes.reverse()
+        else:
+            raise ValueError(f"Unknown mutation: {kind}")
+        changes.extend(op_changes)
+        results.append(op_changes)
     
-    # Calcula o próximo ID
-    notes = get_notes()
-    next_id = max([n['id'] for n in notes], default=0) + 1
+    return results, changes, appended, flips, tombstones, rewrite
+
+def _write_in_place(notes, changes, appended, flips, tombstones, key):
+    """Patch dos marcadores + append numa so passada. Retorna False se o disco nao bate com o cache."""
+    book = _book()
+    c = book.snapshot
+    index = book.offsets
+    if not c['newline'] or c['offset'] != key[1]:
+        return False
     
-    new_line = f"{next_id}. [ ] | Due: - | ({timestamp}) {content}{tags_str}"
+    patches = []
+    for i, old_note in flips.items():
+        new_note = notes[i]
+        if new_note.raw == old_note.raw:
+            continue
+        pos = _marker_pos(old_note)
+        offset = _offset_for(old_note.id, key)
+        if offset is None:
+            return False
+        expected = old_note.raw[:pos + 3].encode('utf-8')
+        patches.append((offset, expected, new_note.raw[pos:pos + 3].encode()))
+    for old_note in tombstones:
+        pos = _marker_pos(old_note)
+        offset = _offset_for(old_note.id, key)
+        if pos is None or offset is None:
+            return False
+        patches.append((offset, old_note.raw[:pos + 3].encode('utf-8'), b"[D]"))
+    if len({offset for offset, _, _ in patches}) != len(patches):
+        return False  # ids repetidos: o indice so conhece a primeira linha de cada id
+    data = ''.join(line + '\n' for line in appended).encode('utf-8')
     
-    with open(NOTES_FILE, 'a', encoding='utf-8') as f:
-        f.write(new_line + '\n')
+    fd = os.open(book.path, os.O_RDWR)
+    try:
+        if os.fstat(fd).st_ino != key[0]:
+            return False
+        # Confere "N. [?]" no disco antes de escrever: o indice pode estar velho
+        for offset, expected, _ in patches:
+            start = offset + 3 - len(expected)
+            if start < 0 or os.pread(fd, len(expected), start) != expected:
+                index['key'] = None
+                return False
+        for offset, _, marker in patches:
+            os.pwrite(fd, marker, offset)
+        if data:
+            os.pwrite(fd, data, key[1])
+        os.fdatasync(fd)
+        _bytes_written.inc(amount=3 * len(patches) + len(data))
+        st = os.fstat(fd)
+        if st.st_mtime_ns <= key[2]:
+            # Patch no mesmo tick do relogio do kernel: sem isso a versao (e o cache
+            # dos outros processos do servidor) nao mudaria
+            os.utime(fd, ns=(st.st_atime_ns, key[2] + 1))
+            st = os.fstat(fd)
+    finally:
+        os.close(fd)
+    
+    new_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+    if index['key'] == key[:2]:
+        base = key[1]
+        for line in appended:
+            note_id = line.split('.', 1)[0]
+            index['offsets'].setdefault(int(note_id), base + len(note_id) + 2)
+            base += len(line.encode('utf-8')) + 1
+        for old_note in tombstones:
+            index['offsets'].pop(old_note.id, None)
+        index['key'] = new_key[:2]
+    
+    # O prefixo mudou com um patch; o crc sera recalculado no proximo parse completo
+    crc = None if patches or c['crc'] is None else zlib.crc32(data, c['crc'])
+    _publish(c, changes, key=new_key, notes=notes, crc=crc, offset=c['offset'] + len(data),
+             lines=c['lines'] + len(appended),
+             dead=c['dead'] + [(note.id, len(note.raw.encode('utf-8'))) for note in tombstones],
+             max_dead=max([c['max_dead']] + [note.id for note in tombstones]))
+    return True
+
+# --- ARMAZENAMENTO ---
+# O cache, as views e a fila de escrita nao sabem onde os notes moram: pedem a versao
+# (key), o recarregamento e o commit ao backend ativo. "log" e o notes.log de sempre;
+# "sqlite" guarda as mesmas linhas num banco indexado, com escritas pontuais.
+# Cada caderno abre o backend em NOTES_DIR/<nome><suffix>.
+DB_FILE = os.path.join(NOTES_DIR, f"{DEFAULT_BOOK}.db")
+
+class LogStorage:
+    """notes.log em texto puro, no formato do functions.sh (backend padrao)."""
+    name = 'log'
+    suffix = '.log'
+
+    def __init__(self, path=NOTES_FILE):
+        self.path = path
+
+    def key(self):
+        return _file_key(self.path)
+
+    def refresh(self, key):
+        _refresh_cache(key)
+
+    def commit(self, notes, changes, appended, flips, tombstones, rewrite):
+        key = _book().snapshot['key']
+        if rewrite or key is None or not _write_in_place(notes, changes, appended, flips, tombstones, key):
+            _commits.inc('rewrite')
+            return save_notes(notes, changes, tombstones)
+        _commits.inc('in_place')
+        return False
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS notes (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    due_date TEXT,
+    timestamp TEXT,
+    content TEXT NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_id ON notes (id);
+CREATE INDEX IF NOT EXISTS notes_status ON notes (status);
+CREATE INDEX IF NOT EXISTS notes_due ON notes (due_date) WHERE due_date IS NOT NULL;
+CREATE TABLE IF NOT EXISTS note_tags (
+    pos INTEGER NOT NULL REFERENCES notes (pos) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags (tag);
+CREATE INDEX IF NOT EXISTS note_tags_pos ON note_tags (pos);
+"""
+
+_SQLITE_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    content, content='notes', content_rowid='pos', tokenize='unicode61 remove_diacritics 0'
+)"""
+
+_SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts (rowid, content) VALUES (new.pos, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.pos, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.pos, old.content);
+        INSERT INTO notes_fts (rowid, content) VALUES (new.pos, new.content);
+    END""",
+]
+
+class SqliteStorage:
+    """Notes num SQLite (WAL) com indices por status, vencimento e tag e FTS5 no conteudo.
+
+    A coluna `raw` guarda a linha do notes.log e `pos` a ordem, entao import/export
+    reproduzem o arquivo. A versao (key) vem da tabela meta, que cada commit incrementa.
+    """
+    name = 'sqlite'
+    suffix = '.db'
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = None
+        self.pid = None
+        self.data_version = None
+        self.meta_key = None
+        self.rowids = {}  # id(note) -> pos, para os notes em cache
+        self.idless = 0   # linhas sem ID (o id delas e o numero da linha)
+
+    def _db(self):
+        # Uma conexao nao pode atravessar fork: cada worker abre a sua
+        if self.conn is None or self.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SQLITE_SCHEMA)
+            try:
+                conn.execute(_SQLITE_FTS_TABLE)
+                for trigger in _SQLITE_FTS_TRIGGERS:
+                    conn.execute(trigger)
+            except sqlite3.OperationalError:
+                pass  # sqlite compilado sem FTS5
+            conn.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                             [('db_id', random.getrandbits(48)), ('version', 0), ('changed_ns', time.time_ns()),
+                              ('max_dead', 0)])
+            self.conn, self.pid = conn, os.getpid()
+            self.data_version = None
+        return self.conn
+
+    @staticmethod
+    def _read_key(db):
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        return (meta['db_id'], meta['version'], meta['changed_ns'])
+
+    def key(self):
+        with self.lock:
+            db = self._db()
+            # data_version so muda com commits de outras conexoes: sem isso, nada a ler
+            data_version = db.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.data_version or self.meta_key is None:
+                self.meta_key = self._read_key(db)
+                self.data_version = data_version
+            return self.meta_key
+
+    def refresh(self, key):
+        # Como no notes.log: durante uma escrita (com o flock) fica a versao ja publicada
+        with _notes_read_lock() as locked, self.lock:
+            if not locked:
+                return
+            db = self._db()
+            with _timed('io'):
+                db.execute("BEGIN")
+                try:
+                    key = self._read_key(db)
+                    max_dead = db.execute("SELECT value FROM meta WHERE key = 'max_dead'").fetchone()[0]
+                    rows = db.execute("SELECT pos, raw FROM notes ORDER BY pos").fetchall()
+                finally:
+                    db.execute("COMMIT")
+            with _timed('parse'):
+                notes = _parse_lines('\n'.join(raw for _, raw in rows))
+            _reparses.inc('full')
+            _parsed_notes.inc(amount=len(notes))
+            self.rowids = {id(note): pos for note, (pos, _) in zip(notes, rows)}
+            self.idless = sum(1 for note in notes if not _ID_RE.match(note.raw))
+            self.meta_key = key
+        _publish(_book().snapshot, key=key, notes=notes, offset=0, crc=0, lines=len(notes), newline=True,
+                 views={}, dead=[], max_dead=max_dead)
+
+    @staticmethod
+    def _row(note):
+        due_date = None if note.due_date == '-' else note.due_date
+        return (note.id, note.status, due_date, note.timestamp, note.content, note.raw)
+
+    def _bump(self, db):
+        db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        db.execute("UPDATE meta SET value = ? WHERE key = 'changed_ns'", (time.time_ns(),))
+        return self._read_key(db)
+
+    def commit(self, notes, changes, appended, flips, tombstones, rewrite):
+        """Cada mudanca vira um INSERT/UPDATE/DELETE pontual, tudo numa transacao."""
+        c = _book().snapshot
+        try:
+            with self.lock:
+                db = self._db()
+                rowids = self.rowids
+                deleted = False
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    for old, new in changes:
+                        if old is not None:
+                            pos = rowids.pop(id(old))
+                            self.idless -= not _ID_RE.match(old.raw)
+                            db.execute("DELETE FROM note_tags WHERE pos = ?", (pos,))
+                            if new is None:
+                                db.execute("DELETE FROM notes WHERE pos = ?", (pos,))
+                                deleted = True
+                                continue
+                            db.execute("UPDATE notes SET id = ?, status = ?, due_date = ?, timestamp = ?, content = ?, raw = ? "
+                                       "WHERE pos = ?", self._row(new) + (pos,))
+                        else:
+                            pos = db.execute("INSERT INTO notes (id, status, due_date, timestamp, content, raw) "
+                                             "VALUES (?, ?, ?, ?, ?, ?)", self._row(new)).lastrowid
+                        rowids[id(new)] = pos
+                        self.idless += not _ID_RE.match(new.raw)
+                        db.executemany("INSERT INTO note_tags (pos, tag) VALUES (?, ?)", [(pos, tag) for tag in set(new.tags)])
+                    if deleted and self.idless > 0:
+                        changes = changes + self._pin_ids(db, notes)
+                    max_dead = max([c['max_dead']] + [note.id for note in tombstones])
+                    if max_dead != c['max_dead']:
+                        db.execute("UPDATE meta SET value = ? WHERE key = 'max_dead'", (max_dead,))
+                    key = self._bump(db)
+                    db.execute("COMMIT")
+                    _commits.inc('sqlite')
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    self.meta_key = None
+                    raise
+                self.meta_key = key
+        except BaseException:
+            # O mapa pos/notes pode ter ficado pela metade: forca um recarregamento
+            _publish(c, key=None, views={})
+            raise
+        # Fora do self.lock: o refresh pega os dois na ordem cache_lock -> self.lock
+        _publish(c, changes, key=key, notes=notes, lines=len(notes), max_dead=max_dead)
+        return False
+
+    def _pin_ids(self, db, notes):
+        """Mesma regra do save_notes: linhas sem ID usam o numero da linha, que um delete mudaria,
+        entao ganham "N. " com o id que ja tinham. Retorna os pares (antigo, novo)."""
+        pinned = []
+        for i, note in enumerate(notes):
+            if not _ID_RE.match(note.raw):
+                new_note = notes[i] = _parse_line(f"{note.id}. {note.raw}", note.id)
+                pos = self.rowids.pop(id(note))
+                self.rowids[id(new_note)] = pos
+                db.execute("UPDATE notes SET id = ?, status = ?, due_date = ?, timestamp = ?, content = ?, raw = ? "
+                           "WHERE pos = ?", self._row(new_note) + (pos,))
+                pinned.append((note, new_note))
+        self.idless = 0
+        return pinned
+
+    def import_log(self, path=NOTES_FILE):
+        """Substitui o conteudo do banco pelas linhas do notes.log, na mesma ordem (sem os tombstones)."""
+        dead = []
+        with open(path, 'rb') as f:
+            notes = _parse_lines(_decode(f.read()), 1, dead)
+        if dead:
+            # Sem os tombstones as linhas sem ID mudariam de numero: fixa o id delas, como a compactacao
+            notes = [note if _ID_RE.match(note.raw) else _parse_line(f"{note.id}. {note.raw}", note.id)
+                     for note in notes]
+        max_dead = max([note_id for note_id, _ in dead], default=0)
+        with self.lock:
+            db = self._db()
+            fts = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Em lote o FTS e reconstruido uma vez no fim, em vez de um trigger por linha
+                if fts:
+                    for trigger in ('insert', 'delete', 'update'):
+                        db.execute(f"DROP TRIGGER IF EXISTS notes_fts_{trigger}")
+                db.execute("DELETE FROM notes")
+                db.executemany("INSERT INTO notes (pos, id, status, due_date, timestamp, content, raw) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               ((pos,) + self._row(note) for pos, note in enumerate(notes, 1)))
+                db.executemany("INSERT INTO note_tags (pos, tag) VALUES (?, ?)",
+                               ((pos, tag) for pos, note in enumerate(notes, 1) for tag in set(note.tags)))
+                if fts:
+                    db.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+                    for trigger in _SQLITE_FTS_TRIGGERS:
+                        db.execute(trigger)
+                db.execute("UPDATE meta SET value = ? WHERE key = 'max_dead'", (max_dead,))
+                self._bump(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self.meta_key = None
+        return len(notes)
+
+    def export_log(self, path=NOTES_FILE):
+        """Escreve as linhas do banco no formato do notes.log (reescrita atomica)."""
+        with self.lock:
+            db = self._db()
+            rows = db.execute("SELECT raw FROM notes ORDER BY pos").fetchall()
+            max_dead = db.execute("SELECT value FROM meta WHERE key = 'max_dead'").fetchone()[0]
+            max_id = db.execute("SELECT MAX(id) FROM notes").fetchone()[0] or 0
+        lines = [raw for raw, in rows]
+        if max_dead > max_id:
+            # Guarda o maior id ja apagado, para o proximo add no notes.log nao reaproveita-lo
+            lines.append(f"{max_dead}. [D]")
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+        return len(rows)
+
+STORAGE_BACKENDS = {'log': LogStorage, 'sqlite': SqliteStorage}
+
+def set_storage(name):
+    """Troca o backend de todos os cadernos (os ja abertos e os que vierem)."""
+    with _books_lock:
+        _books['storage'] = name
+        books = list(_books['loaded'].values())
+    for book in books:
+        book.open_storage(name)
+
+def _commit_batch(ops):
+    """Retorna (mudancas de cada op, renumerado); renumerado indica que linhas sem ID mudaram de id."""
+    book = _book()
+    with _notes_file_lock():
+        # Copia privada da versao atual: os leitores seguem na publicada ate o commit trocar as duas
+        notes = get_notes()
+        results, changes, appended, flips, tombstones, rewrite = _apply_ops(notes, ops)
+        
+        if not appended and not flips and not tombstones and not rewrite:
+            return results, False
+        return results, book.storage.commit(notes, changes, appended, flips, tombstones, rewrite)
+
+def _writer_loop(book):
+    _current.book = book
+    write_queue = book.write_queue
+    while True:
+        batch = [write_queue.get()]
+        deadline = time.monotonic() + WRITE_BATCH_WINDOW
+        while sum(len(ops) for ops, _ in batch) < WRITE_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        batch_ops = [op for ops, _ in batch for op in ops]
+        deletes = any(op[0] == 'delete' for op in batch_ops)
+        start = time.perf_counter()
+        try:
+            results, renumbered = _commit_batch(batch_ops)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for ops, future in batch:
+                future.set_result((results[:len(ops)], renumbered))
+                results = results[len(ops):]
+        finally:
+            _write_batch_seconds.observe(time.perf_counter() - start)
+            _write_batch_ops.inc(amount=len(batch_ops))
+        if deletes and book.storage.name == 'log' and _needs_compaction():
+            _start_thread(book.compactor, _compactor_loop, f"clilog-compactor-{book.name}", book)
+            book.compactor['wake'].set()
+
+def _start_thread(holder, target, name, *args):
+    with _writer_start_lock:
+        if holder['thread'] is None or not holder['thread'].is_alive():
+            holder['thread'] = threading.Thread(target=target, args=args, name=name, daemon=True)
+            holder['thread'].start()
+
+def _needs_compaction():
+    c = _book().snapshot
+    dead = len(c['dead'])
+    return dead >= COMPACT_MIN_TOMBSTONES and dead >= COMPACT_RATIO * c['lines']
+
+def compact_notes(force=False):
+    """Reescreve o notes.log sem os tombstones, se ja passaram do limite (ou sempre, com force).
+    Retorna quantos foram removidos."""
+    book = _book()
+    with _notes_file_lock():
+        c = _fresh_snapshot()
+        if book.storage.name != 'log' or not (c['dead'] if force else _needs_compaction()):
+            return 0
+        save_notes(c['notes'], [])
+        _compactions.inc()
+        return len(c['dead']) - len(book.snapshot['dead'])
+
+def _compactor_loop(book):
+    _current.book = book
+    wake = book.compactor['wake']
+    while True:
+        wake.wait()
+        wake.clear()
+        try:
+            compact_notes()
+        except Exception:
+            traceback.print_exc()
+
+def apply_batch(ops):
+    """Aplica varias mutacoes num unico commit. Retorna (mudancas (antigo, novo) de cada op, renumerado)."""
+    book = _book()
+    _start_thread(book.writer, _writer_loop, f"clilog-writer-{book.name}", book)
+    ops = list(ops)
+    kinds = {op[0] for op in ops}
+    start = time.perf_counter()
+    future = Future()
+    book.write_queue.put((ops, future))
+    try:
+        with _timed('write'):
+            return future.result()
+    finally:
+        # Quem escreveu le em seguida a versao que o commit publicou
+        _current.snapshot = None
+        _mutation_seconds.observe(time.perf_counter() - start, kinds.pop() if len(kinds) == 1 else 'batch')
+
+def set_note_status(note_id, status):
+    apply_batch([('status', note_id, status)])
+
+def update_note_in_file(note_id, new_content, status=None):
+    apply_batch([('update', note_id, new_content, status)])
+
+def add_note_to_file(content, tags=None, due_date=None):
+    results, _ = apply_batch([('add', content, tags, due_date)])
+    return results[0][0][1].id
 
 def delete_note_from_file(note_id):
-    notes = get_notes()
-    notes = [note for note in notes if note['id'] != note_id]
+    apply_batch([('delete', note_id)])
+
+@_register_view('stats')
+class StatsCounter:
+    """Totais da pagina inicial e de /api/stats, mantidos a cada mutacao em vez de recontados por request."""
+
+    def __init__(self, notes):
+        self.total = 0
+        self.completed = 0
+        # Pendentes por data de vencimento: "atrasados" depende do dia, entao so a soma e cacheada
+        self.pending_due = Counter()
+        self.tags = Counter()
+        # Dia de criacao -> [criados, concluidos]
+        self.days = {}
+        self._overdue = (None, 0)
+        for note in notes:
+            self.update(None, note)
+
+    def update(self, old, new):
+        for note, delta in ((old, -1), (new, 1)):
+            if note is None:
+                continue
+            done = note.status == 'completed'
+            self.total += delta
+            self.completed += delta * done
+            if not done and note.due_date != '-':
+                self._count(self.pending_due, note.due_date, delta)
+                day, overdue = self._overdue
+                if day is not None and note.due_date < day:
+                    self._overdue = (day, overdue + delta)
+            for tag in set(note.tags):
+                self._count(self.tags, tag, delta)
+            if note.timestamp:
+                bucket = self.days.setdefault(note.timestamp[:10], [0, 0])
+                bucket[0] += delta
+                bucket[1] += delta * done
+                if not bucket[0]:
+                    del self.days[note.timestamp[:10]]
+
+    @staticmethod
+    def _count(counter, key, delta):
+        value = counter[key] + delta
+        if value:
+            counter[key] = value
+        else:
+            del counter[key]
+
+    def overdue(self, today):
+        """Pendentes vencidos antes de `today`; recontado so na virada do dia."""
+        day, overdue = self._overdue
+        if day != today:
+            overdue = sum(count for due, count in self.pending_due.items() if due < today)
+            self._overdue = (today, overdue)
+        return overdue
+
+def get_stats():
+    today = datetime.now().strftime("%Y-%m-%d")
+    _snapshot()
+    with _book().cache_lock:
+        stats = _get_view('stats')
+        return {'total': stats.total, 'completed': stats.completed, 'pending': stats.total - stats.completed,
+                'overdue': stats.overdue(today)}
+
+# --- TAGS E VENCIMENTOS ---
+@_register_view('tags')
+class TagIndex:
+    """tag -> conjunto de notes com a tag."""
+
+    def __init__(self, notes):
+        self.notes = {}
+        for note in notes:
+            self.update(None, note)
+
+    def update(self, old, new):
+        if old is not None:
+            for tag in set(old.tags):
+                tagged = self.notes.get(tag)
+                if tagged is not None:
+                    tagged.discard(old)
+                    if not tagged:
+                        del self.notes[tag]
+        if new is not None:
+            for tag in new.tags:
+                self.notes.setdefault(tag, set()).add(new)
+
+    def counts(self):
+        return sorted(((tag, len(tagged)) for tag, tagged in self.notes.items()),
+                      key=lambda item: (-item[1], item[0]))
+
+@_register_view('due')
+class DueIndex:
+    """Notes com data de vencimento, ordenados por (data, id) para consultas por intervalo com bisect."""
+
+    def __init__(self, notes):
+        dated = [note for note in notes if note.due_date != '-']
+        self.keys = sorted((note.due_date, note.id, id(note)) for note in dated)
+        self.notes = {id(note): note for note in dated}
+
+    def update(self, old, new):
+        if old is not None and id(old) in self.notes:
+            key = (old.due_date, old.id, id(old))
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+            del self.notes[id(old)]
+        if new is not None and new.due_date != '-':
+            bisect.insort(self.keys, (new.due_date, new.id, id(new)))
+            self.notes[id(new)] = new
+
+    def between(self, after=None, before=None):
+        """Notes com after < vencimento < before (limites opcionais), em ordem de vencimento."""
+        lo = bisect.bisect_right(self.keys, (after, float('inf'))) if after else 0
+        hi = bisect.bisect_left(self.keys, (before,)) if before else len(self.keys)
+        return [self.notes[key[2]] for key in self.keys[lo:hi]]
+
+    def on(self, day):
+        lo = bisect.bisect_left(self.keys, (day,))
+        hi = bisect.bisect_right(self.keys, (day, float('inf')))
+        return [self.notes[key[2]] for key in self.keys[lo:hi]]
+
+def _indexed_notes(args):
+    """Candidatos de /api/notes e /export pelos indices de tag e vencimento (ordem de id), ou None."""
+    tag = args.get('tag', '').lstrip('#')
+    due_before = args.get('due_before')
+    due_after = args.get('due_after')
+    if not (tag or due_before or due_after):
+        return None
     
-    with open(NOTES_FILE, 'w', encoding='utf-8') as f:
+    _snapshot()
+    with _book().cache_lock:
+        candidates = None
+        if tag:
+            candidates = set(_get_view('tags').notes.get(tag, ()))
+        if due_before or due_after:
+            dated = _get_view('due').between(due_after, due_before)
+            candidates = set(dated) if candidates is None else candidates.intersection(dated)
+    return sorted(candidates, key=lambda note: note.id)
+
+# --- BUSCA ---
+# Indice invertido token -> ids, em minusculas com case folding Unicode. Termos soltos
+# casam por prefixo (para a busca enquanto digita) e "entre aspas" vira busca por frase.
+_TOKEN_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+SEARCH_CACHE_SIZE = 128
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.casefold())
+
+def _phrase_pattern(tokens):
+    return re.compile(r'\b' + r'\W+'.join(map(re.escape, tokens)) + r'\b')
+
+def _parse_query(query):
+    prefixes, phrases = [], []
+    for phrase, term in _QUERY_RE.findall(query):
+        if phrase:
+            tokens = _tokens(phrase)
+            if tokens:
+                phrases.append(tokens)
+        else:
+            prefixes.extend(_tokens(term))
+    return prefixes, phrases
+
+@_register_view('search')
+class SearchIndex:
+    def __init__(self, notes):
+        self.postings = {}
+        self.notes = {}
+        self._vocabulary = None
         for note in notes:
-            f.write(note['raw'] + '\n')
+            self.add(note)
+
+    @staticmethod
+    def _note_tokens(note):
+        tokens = set(_tokens(note.content))
+        tokens.update(tag.casefold() for tag in note.tags)
+        return tokens
+
+    def add(self, note):
+        # IDs repetidos: vale o primeiro, como no resto do app
+        if note.id in self.notes:
+            return
+        self.notes[note.id] = note
+        for token in self._note_tokens(note):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = set()
+                self._vocabulary = None
+            postings.add(note.id)
+
+    def remove(self, note):
+        if self.notes.get(note.id) is not note:
+            return
+        del self.notes[note.id]
+        for token in self._note_tokens(note):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.discard(note.id)
+                if not postings:
+                    del self.postings[token]
+                    self._vocabulary = None
+
+    def update(self, old, new):
+        if (old is not None and new is not None and self.notes.get(old.id) is old
+                and old.id == new.id and old.tags == new.tags and old.content == new.content):
+            # So o status mudou: os tokens continuam os mesmos
+            self.notes[new.id] = new
+            return
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def _prefix_ids(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        ids = set()
+        i = bisect.bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            ids |= self.postings[vocabulary[i]]
+            i += 1
+        return ids
+
+    def search(self, query):
+        prefixes, phrases = _parse_query(query)
+        if not prefixes and not phrases:
+            return []
+        
+        sets = [self.postings.get(token, set()) for tokens in phrases for token in tokens]
+        sets.extend(self._prefix_ids(prefix) for prefix in prefixes)
+        sets.sort(key=len)
+        ids = set(sets[0])
+        for other in sets[1:]:
+            if not ids:
+                break
+            ids &= other
+        
+        if phrases:
+            patterns = [_phrase_pattern(tokens) for tokens in phrases]
+            ids = {note_id for note_id in ids
+                   if all(p.search(self.notes[note_id].content.casefold()) for p in patterns)}
+        return sorted(ids)
+
+    @staticmethod
+    def highlights(note, query):
+        """Offsets [inicio, fim) dos trechos encontrados dentro de note.content."""
+        prefixes, phrases = _parse_query(query)
+        patterns = [r'\b' + re.escape(prefix) for prefix in prefixes]
+        patterns.extend(_phrase_pattern(tokens).pattern for tokens in phrases)
+        if not patterns:
+            return []
+        
+        content = note.content
+        folded = content.casefold()
+        if len(folded) == len(content):
+            positions = None
+        else:
+            # O case folding pode mudar o tamanho do texto (ex.: "ß" -> "ss")
+            positions = [i for i, ch in enumerate(content) for _ in ch.casefold()]
+            positions.append(len(content))
+        
+        spans = []
+        for m in re.finditer('|'.join(patterns), folded):
+            start, end = m.span()
+            if positions is not None:
+                start, end = positions[start], positions[end - 1] + 1
+            spans.append([start, end])
+        return spans
+
+def search_notes(query, limit=100, include_archive=False):
+    book = _book()
+    archive = _archive_search_index() if include_archive else None
+    _snapshot()
+    with book.cache_lock:
+        lru_key = (_view_snapshot()['key'], archive and archive[0], query, limit)
+        result = book.search_results.get(lru_key)
+        if result is not None:
+            book.search_results.move_to_end(lru_key)
+            return result
+        
+        index = _get_view('search')
+        ids = index.search(query)
+        if archive:
+            ids = sorted(ids + archive[1].search(query))
+        results = []
+        for note_id in ids[:limit]:
+            note = index.notes.get(note_id) or archive[1].notes[note_id]
+            item = note.to_dict()
+            item['highlights'] = index.highlights(note, query)
+            results.append(item)
+        
+        result = {'query': query, 'total': len(ids), 'ids': ids, 'results': results}
+        book.search_results[lru_key] = result
+        if len(book.search_results) > SEARCH_CACHE_SIZE:
+            book.search_results.popitem(last=False)
+        return result
+
+# --- ARQUIVO ---
+# `clilog archive` tira do notes.log os notes concluidos criados ha mais de N dias e os grava
+# num segmento imutavel em archive/ (texto ou .gz), com uma linha de resumo no topo. O
+# notes.log fica do tamanho do trabalho em aberto; get_notes(), a busca e o export so leem
+# os segmentos quando pedem (include=archive), e cada segmento e parseado uma vez so.
+# Os outros cadernos arquivam em archive/<nome>/.
+ARCHIVE_DIR = os.path.join(NOTES_DIR, "archive")
+ARCHIVE_HEADER = "# clilog-archive "
+ARCHIVE_DEFAULT_DAYS = 90
+
+def _segment_paths():
+    archive_dir = _book().archive_dir
+    try:
+        names = os.listdir(archive_dir)
+    except FileNotFoundError:
+        return []
+    # Os nomes comecam pela data do arquivamento: a ordem alfabetica e a cronologica
+    return [os.path.join(archive_dir, name) for name in sorted(names) if name.endswith(('.log', '.log.gz'))]
+
+def _open_segment(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+def read_segment_header(path):
+    """Resumo gravado na primeira linha do segmento, sem ler o resto."""
+    with _open_segment(path) as f:
+        line = f.readline()
+    if not line.startswith(ARCHIVE_HEADER):
+        raise ValueError(f"{path} is not a clilog archive segment")
+    return json.loads(line[len(ARCHIVE_HEADER):])
+
+def _archive_snapshot():
+    """(versao, notes) de todos os segmentos. So os segmentos novos ou trocados sao lidos."""
+    book = _book()
+    with book.archive_lock:
+        segments = {}
+        for path in _segment_paths():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            version = (st.st_ino, st.st_size, st.st_mtime_ns)
+            cached = book.archive['segments'].get(path)
+            if cached is None or cached[0] != version:
+                with _timed('io'), _open_segment(path) as f:
+                    f.readline()
+                    text = f.read()
+                with _timed('parse'):
+                    cached = (version, _parse_lines(text, 2))
+            segments[path] = cached
+        book.archive['segments'] = segments
+        version = tuple((path, cached[0]) for path, cached in segments.items())
+        return version, [note for _, notes in segments.values() for note in notes]
+
+def _archive_search_index():
+    """(versao, SearchIndex) dos segmentos, refeito so quando algum segmento muda."""
+    version, notes = _archive_snapshot()
+    book = _book()
+    with book.archive_lock:
+        cached = book.archive['search']
+        if cached is None or cached[0] != version:
+            cached = book.archive['search'] = (version, SearchIndex(notes))
+        return cached
+
+def iter_archived_notes():
+    """Notes dos segmentos lidos linha a linha, para o export em memoria constante."""
+    for path in _segment_paths():
+        with _open_segment(path) as f:
+            f.readline()
+            for line_num, line in enumerate(f, 2):
+                line = line.strip()
+                if line:
+                    yield _parse_line(line, line_num)
+
+def archive_notes(days=ARCHIVE_DEFAULT_DAYS, compress=False):
+    """Move os notes concluidos criados ha mais de `days` dias para um segmento novo.
+    Retorna (caminho do segmento ou None, quantos notes)."""
+    book = _book()
+    if book.storage.name != 'log':
+        raise ValueError("archive works on notes.log; run `clilog db export` first")
+    now = datetime.now()
+    cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M")
+    with _notes_file_lock():
+        c = _fresh_snapshot()
+        old = [note for note in c['notes']
+               if note.status == "completed" and note.timestamp and note.timestamp < cutoff]
+        if not old:
+            return None, 0
+        
+        # No segmento toda linha leva o "N. ": fora do notes.log o numero da linha nao e o id
+        lines = [note.raw if _ID_RE.match(note.raw) else f"{note.id}. {note.raw}" for note in old]
+        timestamps = sorted(note.timestamp for note in old)
+        tags = Counter(tag for note in old for tag in note.tags)
+        header = {
+            'version': 1,
+            'archived_at': now.strftime("%Y-%m-%d %H:%M"),
+            'older_than_days': days,
+            'notes': len(old),
+            'ids': [min(note.id for note in old), max(note.id for note in old)],
+            'from': timestamps[0],
+            'to': timestamps[-1],
+            'tags': dict(tags.most_common(EXPORT_TOP_TAGS)),
+        }
+        data = (ARCHIVE_HEADER + json.dumps(header, ensure_ascii=False) + "\n"
+                + "".join(line + "\n" for line in lines)).encode('utf-8')
+        
+        os.makedirs(book.archive_dir, exist_ok=True)
+        name = f"{now:%Y%m%d-%H%M%S}-{header['ids'][0]}-{header['ids'][1]}.log"
+        path = os.path.join(book.archive_dir, name + ".gz" if compress else name)
+        # Primeiro o segmento, depois o notes.log: se cair no meio, o note fica nos dois, nunca em nenhum
+        tmp_file = path + ".tmp"
+        with _timed('io'):
+            with open(tmp_file, 'wb') as f:
+                f.write(gzip.compress(data, mtime=0) if compress else data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, path)
+        
+        doomed = set(map(id, old))
+        keep = [note for note in c['notes'] if id(note) not in doomed]
+        # Os ids arquivados contam como apagados, para nao serem reaproveitados
+        save_notes(keep, [(note, None) for note in old], old)
+        return path, len(old)
+
+# --- VARIOS CADERNOS ---
+# Busca e totais em todos os cadernos de uma vez. Cada caderno roda no seu proprio lock, numa
+# thread de um pool compartilhado: a leitura dos arquivos (e o sqlite) solta o GIL, entao um
+# arranque a frio com muitos cadernos sobrepoe o I/O em vez de ler um arquivo depois do outro.
+BOOKS_POOL_SIZE = min(32, (os.cpu_count() or 1) + 4)
+
+def list_books():
+    """Nomes dos cadernos: os arquivos do backend ativo em NOTES_DIR."""
+    suffix = STORAGE_BACKENDS[_books['storage']].suffix
+    try:
+        names = {name[:-len(suffix)] for name in os.listdir(NOTES_DIR) if name.endswith(suffix)}
+    except FileNotFoundError:
+        names = set()
+    return sorted(name for name in names if BOOK_NAME_RE.fullmatch(name))
+
+def _books_pool():
+    with _books_lock:
+        # Threads nao atravessam fork: cada worker cria o seu pool
+        if _books['pool'] is None or _books['pid'] != os.getpid():
+            _books['pool'] = ThreadPoolExecutor(max_workers=BOOKS_POOL_SIZE, thread_name_prefix="clilog-books")
+            _books['pid'] = os.getpid()
+        return _books['pool']
+
+def map_books(fn, names=None):
+    """[(caderno, fn()), ...] com fn() rodando no caderno de cada um, em paralelo."""
+    books = [get_book(name) for name in (list_books() if names is None else names)]
+
+    def run(book):
+        with using_book(book):
+            return fn()
+
+    if len(books) < 2:
+        return [(book, run(book)) for book in books]
+    return list(zip(books, _books_pool().map(run, books)))
+
+def books_summary():
+    return [{'name': book.name, 'default': book.name == DEFAULT_BOOK, **stats}
+            for book, stats in map_books(get_stats)]
+
+def search_books(query, limit=100):
+    """search_notes() em todos os cadernos; cada resultado leva o nome do caderno, em ordem de caderno e id."""
+    results = []
+    totals = {}
+    for book, result in map_books(lambda: search_notes(query, limit)):
+        totals[book.name] = result['total']
+        results.extend({'book': book.name, **item} for item in result['results'])
+    return {'query': query, 'total': sum(totals.values()), 'books': totals, 'results': results[:limit]}
+
+# --- EXPORTACAO ---
+# Um unico motor para `clilog export` e /export: percorre os notes uma vez, gerando o
+# texto em pedacos, e conta status e tags no mesmo passo. Como nada fica acumulado,
+# o resumo vai no fim do json e do markdown, e o terminal le o notes.log linha a linha.
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'md': 'text/markdown',
+}
+EXPORT_ALIASES = {'markdown': 'md'}
+EXPORT_CHUNK = 1000
+EXPORT_TOP_TAGS = 10
+
+class ExportSummary:
+    """Totais e histograma de tags, preenchidos enquanto a exportacao anda."""
+    
+    __slots__ = ('total', 'completed', 'tags')
+    
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.tags = Counter()
+    
+    @property
+    def pending(self):
+        return self.total - self.completed
+    
+    def add(self, note):
+        self.total += 1
+        if note.status == "completed":
+            self.completed += 1
+        for tag in note.tags:
+            self.tags[tag] += 1
+    
+    def to_dict(self):
+        return {
+            'total_notes': self.total,
+            'completed': self.completed,
+            'pending': self.pending,
+            'tags': [{'tag': tag, 'count': count} for tag, count in self.tags.most_common()]
+        }
+
+def iter_log_notes(path=NOTES_FILE):
+    """Notes do notes.log lidos linha a linha, com o mesmo parse do get_notes()."""
+    # newline=None: universal newlines, como o _decode
+    with open(path, 'r', encoding='utf-8', newline=None) as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not ('[D]' in line and _TOMBSTONE_RE.match(line)):
+                yield _parse_line(line, line_num)
+
+def _chunked(parts):
+    buf = []
+    for part in parts:
+        buf.append(part)
+        if len(buf) >= EXPORT_CHUNK:
+            yield ''.join(buf)
+            buf.clear()
+    if buf:
+        yield ''.join(buf)
+
+def _note_json(note, _str=json.encoder.encode_basestring):
+    """note.to_dict() em JSON (chaves em ordem, como o jsonify), montado direto: o export chama isso por note."""
+    return (f'{{"content":{_str(note.content)},"due_date":{_str(note.due_date)},"id":{note.id},'
+            f'"raw":{_str(note.raw)},"status":{_str(note.status)},"tags":[{",".join(map(_str, note.tags))}],'
+            f'"timestamp":{_str(note.timestamp)}}}')
+
+def _export_json(notes, summary, now):
+    yield '{"export_date":"%s","notes":[' % now.isoformat(timespec='seconds')
+    separator = ''
+    for note in notes:
+        summary.add(note)
+        yield separator + _note_json(note)
+        separator = ','
+    # Os totais entram como as ultimas chaves do mesmo objeto
+    yield '],' + json.dumps(summary.to_dict(), ensure_ascii=False, separators=(',', ':'))[1:]
+
+def _export_ndjson(notes, summary, now):
+    for note in notes:
+        summary.add(note)
+        yield _note_json(note) + '\n'
+
+def _export_csv(notes, summary, now):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    writer.writerow(('id', 'status', 'timestamp', 'content', 'tags', 'due_date'))
+    for count, note in enumerate(notes, 1):
+        summary.add(note)
+        writer.writerow((note.id, note.status, note.timestamp, note.content, ';'.join(note.tags), note.due_date))
+        if count % EXPORT_CHUNK == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def _export_md(notes, summary, now):
+    yield f"# 🧠 Clilog Tasks Export\n\n**Export Date:** {now.strftime('%Y-%m-%d %H:%M')}\n\n## Tasks\n\n"
+    for note in notes:
+        summary.add(note)
+        check = "x" if note.status == "completed" else " "
+        timestamp = f" **{note.timestamp}**" if note.timestamp else ""
+        tags = "".join(f" `#{tag}`" for tag in note.tags)
+        due = f" (due {note.due_date})" if note.due_date != "-" else ""
+        yield f"- [{check}]{timestamp} {note.content}{tags}{due}\n"
+    if not summary.total:
+        yield "No tasks.\n"
+    
+    percent = summary.completed * 100 // summary.total if summary.total else 0
+    yield (f"\n## 📊 Summary\n\n"
+           f"**Total Tasks:** {summary.total}\n"
+           f"**Completed:** {summary.completed} • **Pending:** {summary.pending}\n"
+           f"**Completion:** {percent}%\n\n"
+           f"## 🏷️ Tags Summary\n\n")
+    top = summary.tags.most_common(EXPORT_TOP_TAGS)
+    yield "".join(f"- **#{tag}**: {count} tasks\n" for tag, count in top) if top else "No tags found.\n"
+    yield "\n---\n*Generated by [clilog](https://github.com/simeulinuxkaliaiwr/clilog)*\n"
+
+_EXPORTERS = {'json': _export_json, 'ndjson': _export_ndjson, 'csv': _export_csv, 'md': _export_md}
+
+def export_format(name):
+    """Nome canonico do formato ('markdown' -> 'md'); ValueError se nao existe."""
+    name = EXPORT_ALIASES.get(name, name)
+    if name not in _EXPORTERS:
+        raise ValueError(f"Format '{name}' not supported. Use: {', '.join(sorted(_EXPORTERS))}")
+    return name
+
+def export_stream(notes, fmt, summary=None):
+    """Gera a exportacao de `notes` (qualquer iteravel) em pedacos de texto.
+    `summary`, se passado, termina com os totais do que foi exportado."""
+    exporter = _EXPORTERS[export_format(fmt)]
+    return _chunked(exporter(notes, ExportSummary() if summary is None else summary, datetime.now()))
+
+NOTE_CARD_TEMPLATE = '''
+{% macro note_card(note) %}
+    <div class="task-item note-item card bg-white dark:bg-slate-800 rounded-xl shadow-md hover:shadow-xl transition-all duration-200 p-5" 
+         data-status="{{ note.status }}"
+         data-id="{{ note.id }}">
+        <div class="flex items-start gap-4">
+            <!-- Checkbox -->
+            <button 
+                onclick="toggleStatus({{ note.id }}, '{{ note.status }}')" 
+                class="task-checkbox mt-1 flex-shrink-0"
+            >
+                {% if note.status == 'completed' %}
+                    <i class="fas fa-check-circle text-3xl text-green-500 hover:text-green-600"></i>
+                {% else %}
+                    <i class="far fa-circle text-3xl text-gray-300 hover:text-purple-500"></i>
+                {% endif %}
+            </button>
+
+            <!-- Content -->
+            <div class="flex-1 min-w-0">
+                <div class="flex items-center justify-between mb-2">
+                    <span 
+                        id="content-{{ note.id }}" 
+                        class="text-lg font-medium {{ 'line-through text-gray-400' if note.status == 'completed' else 'text-gray-800 dark:text-white' }}"
+                    >
+                        {{ note.content }}
+                    </span>
+                </div>
+                
+                <!-- Edit Form (hidden) -->
+                <div id="edit-{{ note.id }}" style="display: none;" class="mb-2">
+                    <input 
+                        type="text" 
+                        id="edit-input-{{ note.id }}" 
+                        value="{{ note.content }}" 
+                        class="w-full p-2 border-2 border-purple-300 dark:border-purple-600 dark:bg-slate-700 dark:text-white rounded-lg"
+                        onkeypress="handleKeyPress({{ note.id }}, event)"
+                    >
+                </div>
+
+                <!-- Metadata -->
+                <div class="flex flex-wrap items-center gap-3 text-sm text-gray-500 dark:text-gray-400">
+                    {% if note.timestamp %}
+                        <span class="flex items-center gap-1">
+                            <i class="far fa-clock"></i>
+                            {{ note.timestamp }}
+                        </span>
+                    {% endif %}
+                    
+                    {% if note.due_date and note.due_date != '-' %}
+                        <span class="flex items-center gap-1 bg-orange-100 dark:bg-orange-900 text-orange-800 dark:text-orange-200 px-2 py-1 rounded-md">
+                            <i class="fas fa-calendar-alt"></i>
+                            EXP date: {{ note.due_date }}
+                        </span>
+                    {% endif %}
+                    
+                    {% if note.tags %}
+                        <div class="flex flex-wrap gap-2">
+                            {% for tag in note.tags %}
+                                <span class="bg-purple-100 dark:bg-purple-900 text-purple-800 dark:text-purple-200 px-3 py-1 rounded-full text-xs font-medium">
+                                    #{{ tag }}
+                                </span>
+                            {% endfor %}
+                        </div>
+                    {% endif %}
+                </div>
+            </div>
 
-HTML_TEMPLATE = '''
+            <!-- Actions -->
+            <div class="flex gap-2 flex-shrink-0">
+                <button 
+                    onclick="toggleEdit({{ note.id }})" 
+                    class="text-blue-500 hover:text-blue-700 hover:bg-blue-50 dark:hover:bg-blue-900 p-2 rounded-lg transition-colors" 
+                    title="Editar"
+                >
+                    <i class="fas fa-edit text-lg"></i>
+                </button>
+                <button 
+                    onclick="deleteTask({{ note.id }}, '{{ note.content[:30] }}')" 
+                    class="text-red-500 hover:text-red-700 hover:bg-red-50 dark:hover:bg-red-900 p-2 rounded-lg transition-colors" 
+                    title="Deletar"
+                >
+                    <i class="fas fa-trash text-lg"></i>
+                </button>
+            </div>
+        </div>
+    </div>
+{% endmacro %}
+'''
+
+HTML_TEMPLATE = NOTE_CARD_TEMPLATE + '''
 <!DOCTYPE html>
 <html lang="pt-BR">
 <head>
@@ -127,6 +1961,10 @@ HTML_TEMPLATE = '''
         .task-item {
             animation: slideIn 0.3s ease-out;
         }
+        .note-item {
+            content-visibility: auto;
+            contain-intrinsic-size: auto 110px;
+        }
         .task-removing {
             animation: slideOut 0.3s ease-out;
         }
@@ -178,11 +2016,11 @@ HTML_TEMPLATE = '''
         </header>
 
         <!-- Stats Cards -->
-        <div class="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8">
+        <div class="grid grid-cols-1 md:grid-cols-4 gap-6 mb-8">
             <div class="card bg-white dark:bg-slate-800 rounded-xl shadow-lg p-6 transform hover:scale-105 transition-transform cursor-pointer">
                 <div class="flex items-center justify-between">
                     <div>
-                        <div class="text-3xl font-bold text-purple-600">{{ stats.total }}</div>
+                        <div id="stat-total" class="text-3xl font-bold text-purple-600">{{ stats.total }}</div>
                         <div class="text-gray-600 dark:text-gray-300 mt-1">Total tasks</div>
                     </div>
                     <div class="text-5xl text-purple-200"><i class="fas fa-tasks"></i></div>
@@ -191,7 +2029,7 @@ HTML_TEMPLATE = '''
             <div class="card bg-white dark:bg-slate-800 rounded-xl shadow-lg p-6 transform hover:scale-105 transition-transform cursor-pointer">
                 <div class="flex items-center justify-between">
                     <div>
-                        <div class="text-3xl font-bold text-green-600">{{ stats.completed }}</div>
+                        <div id="stat-completed" class="text-3xl font-bold text-green-600">{{ stats.completed }}</div>
                         <div class="text-gray-600 dark:text-gray-300 mt-1">Completed</div>
                     </div>
                     <div class="text-5xl text-green-200"><i class="fas fa-check-circle"></i></div>
@@ -200,12 +2038,21 @@ HTML_TEMPLATE = '''
             <div class="card bg-white dark:bg-slate-800 rounded-xl shadow-lg p-6 transform hover:scale-105 transition-transform cursor-pointer">
                 <div class="flex items-center justify-between">
                     <div>
-                        <div class="text-3xl font-bold text-orange-600">{{ stats.pending }}</div>
+                        <div id="stat-pending" class="text-3xl font-bold text-orange-600">{{ stats.pending }}</div>
                         <div class="text-gray-600 dark:text-gray-300 mt-1">Pending</div>
                     </div>
                     <div class="text-5xl text-orange-200"><i class="fas fa-clock"></i></div>
                 </div>
             </div>
+            <div class="card bg-white dark:bg-slate-800 rounded-xl shadow-lg p-6 transform hover:scale-105 transition-transform cursor-pointer">
+                <div class="flex items-center justify-between">
+                    <div>
+                        <div id="stat-overdue" class="text-3xl font-bold text-red-600">{{ stats.overdue }}</div>
+                        <div class="text-gray-600 dark:text-gray-300 mt-1">Overdue</div>
+                    </div>
+                    <div class="text-5xl text-red-200"><i class="fas fa-exclamation-circle"></i></div>
+                </div>
+            </div>
         </div>
 
         <!-- Add Task Form -->
@@ -244,6 +2091,9 @@ HTML_TEMPLATE = '''
                     <option value="pending">Pending</option>
                     <option value="completed">Completed</option>
                 </select>
+                <button onclick="completeVisible()" class="p-3 border-2 border-gray-200 dark:border-gray-600 dark:bg-slate-700 dark:text-white rounded-lg hover:border-purple-500 transition-colors" title="Concluir todas as tarefas visíveis">
+                    <i class="fas fa-check-double mr-2"></i>Complete visible
+                </button>
             </div>
         </div>
 
@@ -251,106 +2101,25 @@ HTML_TEMPLATE = '''
         <div id="tasksList" class="space-y-3">
             {% if notes %}
                 {% for note in notes %}
-                <div class="task-item note-item card bg-white dark:bg-slate-800 rounded-xl shadow-md hover:shadow-xl transition-all duration-200 p-5" 
-                     data-status="{{ note.status }}"
-                     data-id="{{ note.id }}">
-                    <div class="flex items-start gap-4">
-                        <!-- Checkbox -->
-                        <button 
-                            onclick="toggleStatus({{ note.id }}, '{{ note.status }}')" 
-                            class="task-checkbox mt-1 flex-shrink-0"
-                        >
-                            {% if note.status == 'completed' %}
-                                <i class="fas fa-check-circle text-3xl text-green-500 hover:text-green-600"></i>
-                            {% else %}
-                                <i class="far fa-circle text-3xl text-gray-300 hover:text-purple-500"></i>
-                            {% endif %}
-                        </button>
-
-                        <!-- Content -->
-                        <div class="flex-1 min-w-0">
-                            <div class="flex items-center justify-between mb-2">
-                                <span 
-                                    id="content-{{ note.id }}" 
-                                    class="text-lg font-medium {{ 'line-through text-gray-400' if note.status == 'completed' else 'text-gray-800 dark:text-white' }}"
-                                >
-                                    {{ note.content }}
-                                </span>
-                            </div>
-                            
-                            <!-- Edit Form (hidden) -->
-                            <div id="edit-{{ note.id }}" style="display: none;" class="mb-2">
-                                <input 
-                                    type="text" 
-                                    id="edit-input-{{ note.id }}" 
-                                    value="{{ note.content }}" 
-                                    class="w-full p-2 border-2 border-purple-300 dark:border-purple-600 dark:bg-slate-700 dark:text-white rounded-lg"
-                                    onkeypress="handleKeyPress({{ note.id }}, event)"
-                                >
-                            </div>
-
-                            <!-- Metadata -->
-                            <div class="flex flex-wrap items-center gap-3 text-sm text-gray-500 dark:text-gray-400">
-                                {% if note.timestamp %}
-                                    <span class="flex items-center gap-1">
-                                        <i class="far fa-clock"></i>
-                                        {{ note.timestamp }}
-                                    </span>
-                                {% endif %}
-                                
-                                {% if note.due_date and note.due_date != '-' %}
-                                    <span class="flex items-center gap-1 bg-orange-100 dark:bg-orange-900 text-orange-800 dark:text-orange-200 px-2 py-1 rounded-md">
-                                        <i class="fas fa-calendar-alt"></i>
-                                        EXP date: {{ note.due_date }}
-                                    </span>
-                                {% endif %}
-                                
-                                {% if note.tags %}
-                                    <div class="flex flex-wrap gap-2">
-                                        {% for tag in note.tags %}
-                                            <span class="bg-purple-100 dark:bg-purple-900 text-purple-800 dark:text-purple-200 px-3 py-1 rounded-full text-xs font-medium">
-                                                #{{ tag }}
-                                            </span>
-                                        {% endfor %}
-                                    </div>
-                                {% endif %}
-                            </div>
-                        </div>
-
-                        <!-- Actions -->
-                        <div class="flex gap-2 flex-shrink-0">
-                            <button 
-                                onclick="toggleEdit({{ note.id }})" 
-                                class="text-blue-500 hover:text-blue-700 hover:bg-blue-50 dark:hover:bg-blue-900 p-2 rounded-lg transition-colors" 
-                                title="Editar"
-                            >
-                                <i class="fas fa-edit text-lg"></i>
-                            </button>
-                            <button 
-                                onclick="deleteTask({{ note.id }}, '{{ note.content[:30] }}')" 
-                                class="text-red-500 hover:text-red-700 hover:bg-red-50 dark:hover:bg-red-900 p-2 rounded-lg transition-colors" 
-                                title="Deletar"
-                            >
-                                <i class="fas fa-trash text-lg"></i>
-                            </button>
-                        </div>
-                    </div>
-                </div>
+                    {{ note_card(note) }}
                 {% endfor %}
             {% else %}
-                <div class="text-center py-16 text-gray-400">
+                <div id="emptyState" class="text-center py-16 text-gray-400">
                     <i class="fas fa-inbox text-6xl mb-4"></i>
                     <p class="text-xl">Nenhuma tarefa ainda</p>
                     <p class="text-sm mt-2">Adicione sua primeira tarefa acima!</p>
                 </div>
             {% endif %}
         </div>
+        <div id="listSentinel" class="py-6 text-center text-gray-400 text-sm"{% if next_cursor is none %} style="display: none;"{% endif %}>
+            <i class="fas fa-spinner fa-spin mr-2"></i>Carregando...
+        </div>
 
         <!-- Footer -->
         <footer class="text-center mt-12 text-gray-600 dark:text-gray-400 text-sm">
             <p>Clilog Web v2.0 | 
-               <a href="/export" class="text-purple-600 hover:text-purple-800 dark:text-purple-400">Export</a> | 
-               <a href="/api/notes" class="text-purple-600 hover:text-purple-800 dark:text-purple-400">API</a>
+               <a href="{{ base }}/export" class="text-purple-600 hover:text-purple-800 dark:text-purple-400">Export</a> | 
+               <a href="{{ base }}/api/notes" class="text-purple-600 hover:text-purple-800 dark:text-purple-400">API</a>
             </p>
         </footer>
     </div>
@@ -375,6 +2144,79 @@ HTML_TEMPLATE = '''
             icon.classList.toggle('fa-sun');
         }
 
+        // Mutacoes vao em lote para /api/batch; a resposta traz so os cards que mudaram
+        async function runBatch(ops) {
+            const response = await fetch('{{ base }}/api/batch', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ ops })
+            });
+            if (!response.ok) return null;
+
+            const delta = await response.json();
+            applyDelta(delta);
+            return delta;
+        }
+
+        function applyDelta(delta) {
+            if (delta.reload) {
+                location.reload();
+                return;
+            }
+            const list = document.getElementById('tasksList');
+
+            delta.deleted.forEach(id => {
+                const card = list.querySelector(`[data-id="${id}"]`);
+                if (!card) return;
+                card.remove();
+                // O card estava antes do cursor: as posicoes seguintes andaram uma para tras
+                if (nextCursor !== null) nextCursor--;
+            });
+
+            delta.changed.forEach(note => {
+                const template = document.createElement('template');
+                template.innerHTML = note.html.trim();
+                const card = template.content.firstElementChild;
+                const current = list.querySelector(`[data-id="${note.id}"]`);
+                if (current) {
+                    current.replaceWith(card);
+                } else if (nextCursor === null && !document.getElementById('searchInput').value.trim()) {
+                    // Notas novas vao para o fim do arquivo; se a lista ainda nao chegou la, chegam com a proxima janela
+                    const empty = document.getElementById('emptyState');
+                    if (empty) empty.remove();
+                    list.appendChild(card);
+                }
+            });
+
+            document.getElementById('stat-total').textContent = delta.stats.total;
+            document.getElementById('stat-completed').textContent = delta.stats.completed;
+            document.getElementById('stat-pending').textContent = delta.stats.pending;
+            document.getElementById('stat-overdue').textContent = delta.stats.overdue;
+            applyFilters();
+        }
+
+        // Mudancas feitas em outras abas ou pelo clilog no terminal chegam por /api/events
+        if (window.EventSource) (function listen() {
+            const events = new EventSource('{{ base }}/api/events');
+            // Com o servidor no limite de streams (503) o navegador desiste: tenta de novo mais tarde
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) setTimeout(listen, 30000);
+            };
+            const editing = id => {
+                const edit = document.getElementById(`edit-${id}`);
+                return edit && edit.style.display !== 'none';
+            };
+            ['add', 'update'].forEach(kind => events.addEventListener(kind, e => {
+                const data = JSON.parse(e.data);
+                if (!editing(data.id)) applyDelta({ changed: [data.note], deleted: [], stats: data.stats });
+            }));
+            events.addEventListener('delete', e => {
+                const data = JSON.parse(e.data);
+                applyDelta({ changed: [], deleted: [data.id], stats: data.stats });
+            });
+            events.addEventListener('reset', () => location.reload());
+        })();
+
         // Add Task (AJAX)
         document.getElementById('addTaskForm').addEventListener('submit', async (e) => {
             e.preventDefault();
@@ -383,30 +2225,35 @@ HTML_TEMPLATE = '''
             
             if (!text) return;
 
-            const response = await fetch('/add', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-                body: `text=${encodeURIComponent(text)}`
-            });
-
-            if (response.ok) {
+            if (await runBatch([{ op: 'add', content: text }])) {
                 input.value = '';
-                location.reload();
                 showToast('Tarefa adicionada!', 'success');
             }
         });
 
         // Toggle Status (AJAX)
         async function toggleStatus(id, currentStatus) {
-            const endpoint = currentStatus === 'completed' ? '/undo' : '/done';
-            const response = await fetch(`${endpoint}/${id}`);
-            
-            if (response.ok) {
-                location.reload();
+            const op = currentStatus === 'completed' ? 'undo' : 'done';
+            if (await runBatch([{ op, id }])) {
                 showToast(currentStatus === 'completed' ? 'Tarefa reaberta!' : 'Tarefa concluída!', 'success');
             }
         }
 
+        // Conclui de uma vez as pendentes que estao visiveis (um unico commit)
+        async function completeVisible() {
+            const ops = [];
+            document.querySelectorAll('.note-item[data-status="pending"]').forEach(note => {
+                if (note.style.display !== 'none') ops.push({ op: 'done', id: Number(note.getAttribute('data-id')) });
+            });
+            if (!ops.length) return;
+
+            // /api/batch aceita ate {{ batch_max_ops }} ops por chamada
+            for (let i = 0; i < ops.length; i += {{ batch_max_ops }}) {
+                if (!await runBatch(ops.slice(i, i + {{ batch_max_ops }}))) return;
+            }
+            showToast(`${ops.length} tarefa(s) concluída(s)!`, 'success');
+        }
+
         // Delete Task
         async function deleteTask(id, content) {
             if (!confirm(`Deletar: "${content}..."?`)) return;
@@ -415,9 +2262,7 @@ HTML_TEMPLATE = '''
             taskElement.classList.add('task-removing');
             
             setTimeout(async () => {
-                const response = await fetch(`/delete/${id}`);
-                if (response.ok) {
-                    taskElement.remove();
+                if (await runBatch([{ op: 'delete', id }])) {
                     showToast('Tarefa deletada!', 'error');
                 }
             }, 300);
@@ -444,14 +2289,7 @@ HTML_TEMPLATE = '''
             
             if (!newContent) return;
 
-            const response = await fetch(`/edit/${id}`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-                body: `content=${encodeURIComponent(newContent)}`
-            });
-
-            if (response.ok) {
-                location.reload();
+            if (await runBatch([{ op: 'edit', id, content: newContent }])) {
                 showToast('Tarefa editada!', 'success');
             }
         }
@@ -464,19 +2302,75 @@ HTML_TEMPLATE = '''
             }
         }
 
-        // Filter
+        // Lista em janelas: o HTML traz a primeira, o resto vem de /api/cards ao rolar.
+        // O cursor e a posicao no notes.log; status e busca sao filtrados no servidor.
+        let nextCursor = {{ 'null' if next_cursor is none else next_cursor }};
+        let listGeneration = 0;
+        let loadingCards = false;
+        let searchTimer = null;
+
+        async function loadMore() {
+            if (loadingCards || nextCursor === null) return;
+            loadingCards = true;
+            const generation = listGeneration;
+            const params = new URLSearchParams({ cursor: nextCursor, limit: {{ page_window }} });
+            const status = document.getElementById('statusFilter').value;
+            const search = document.getElementById('searchInput').value.trim();
+            if (status !== 'all') params.set('status', status);
+            if (search) params.set('search', search);
+
+            try {
+                const response = await fetch(`{{ base }}/api/cards?${params}`);
+                if (!response.ok || generation !== listGeneration) return;
+                const data = await response.json();
+                document.getElementById('tasksList').insertAdjacentHTML('beforeend', data.html);
+                nextCursor = data.next_cursor;
+            } finally {
+                loadingCards = false;
+            }
+            updateSentinel();
+        }
+
+        function updateSentinel() {
+            const sentinel = document.getElementById('listSentinel');
+            sentinel.style.display = nextCursor === null ? 'none' : 'block';
+            // A janela nao encheu a tela: busca a proxima sem esperar rolagem
+            if (nextCursor !== null && sentinel.getBoundingClientRect().top < window.innerHeight + 800) {
+                loadMore();
+            }
+        }
+
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadMore();
+        }, { rootMargin: '800px' }).observe(document.getElementById('listSentinel'));
+
+        function resetList() {
+            listGeneration++;
+            loadingCards = false;
+            document.querySelectorAll('#tasksList .note-item').forEach(note => note.remove());
+            nextCursor = 0;
+            loadMore();
+        }
+
+        let listFilter = 'all|';
+
         function filterNotes() {
+            const filter = `${document.getElementById('statusFilter').value}|${document.getElementById('searchInput').value.trim()}`;
+            clearTimeout(searchTimer);
+            if (filter === listFilter) return;
+            searchTimer = setTimeout(() => {
+                listFilter = filter;
+                resetList();
+            }, 150);
+        }
+
+        // Cards alterados depois de carregados (toggle, eventos) podem sair do filtro de status
+        function applyFilters() {
             const filter = document.getElementById('statusFilter').value;
-            const search = document.getElementById('searchInput').value.toLowerCase();
-            
+
             document.querySelectorAll('.note-item').forEach(note => {
                 const status = note.getAttribute('data-status');
-                const content = note.textContent.toLowerCase();
-                
-                const statusMatch = filter === 'all' || status === filter;
-                const searchMatch = content.includes(search);
-                
-                note.style.display = statusMatch && searchMatch ? 'block' : 'none';
+                note.style.display = filter === 'all' || status === filter ? 'block' : 'none';
             });
         }
 
@@ -508,15 +2402,850 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# --- CACHE HTTP E COMPRESSAO ---
+# ETag derivado da versao do notes.log (inode, tamanho, mtime): uma requisicao
+# condicional para uma versao que nao mudou vira 304 so com um stat, sem parse.
+# Corpos comprimidos ficam guardados por (url, versao, encoding).
+TEMPLATE_VERSION = f"{zlib.crc32(HTML_TEMPLATE.encode('utf-8')):x}"
+# Compilados uma vez: render_template_string recompilaria o template a cada request
+_PAGE_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+_NOTE_CARD_TEMPLATE = app.jinja_env.from_string(NOTE_CARD_TEMPLATE)
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = {'application/json', 'text/html'}
+COMPRESSED_CACHE_SIZE = 32
+SNAPSHOT_RETRIES = 3
+
+_compressed_bodies = OrderedDict()  # LRU; acessado pelas threads do pool, sempre com o lock
+_compressed_lock = threading.Lock()
+
+def _cached_body(cache_key):
+    with _compressed_lock:
+        cached = _compressed_bodies.get(cache_key)
+        if cached is not None:
+            _compressed_bodies.move_to_end(cache_key)
+        return cached
+
+def _store_body(cache_key, cached):
+    with _compressed_lock:
+        _compressed_bodies[cache_key] = cached
+        _compressed_bodies.move_to_end(cache_key)
+        if len(_compressed_bodies) > COMPRESSED_CACHE_SIZE:
+            _compressed_bodies.popitem(last=False)
+
+def _accepted_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body)
+    return gzip.compress(body, 6)
+
+def _versioned(extra=None):
+    """ETag/Last-Modified pela versao dos notes (do backend ativo); `extra` entra na ETag (ex.: versao do template).
+    A view roda na mesma versao da ETag; se uma escrita a trocar antes de a view ler os indices, roda de novo."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, SNAPSHOT_RETRIES + 1):
+                _current.snapshot = None
+                # Na ultima tentativa a view monta os indices da sua versao em vez de recomecar
+                _current.retry = attempt < SNAPSHOT_RETRIES
+                try:
+                    return _versioned_response(view, extra, args, kwargs)
+                except _StaleSnapshot:
+                    _snapshot_retries.inc()
+                finally:
+                    _current.retry = False
+        return wrapper
+    return decorator
+
+def _versioned_response(view, extra, args, kwargs):
+    key = _snapshot()['key']
+    etag = _version_tag(key)
+    if extra:
+        etag = f"{etag}-{extra()}"
+    # O header so tem segundos: sai depois que o segundo do mtime acabou, senao outra escrita
+    # no mesmo segundo teria a mesma data e o If-Modified-Since daria um 304 velho
+    last_modified = None
+    if key and key[2] // 10**9 < time.time_ns() // 10**9:
+        last_modified = datetime.fromtimestamp(key[2] // 10**9, timezone.utc)
+    
+    if request.if_none_match:
+        for candidate in (etag, f"{etag}-gzip", f"{etag}-br"):
+            if request.if_none_match.contains(candidate):
+                return _not_modified(candidate, last_modified)
+    # Com `extra` a versao nao e so a do arquivo (template, dia): ai so a ETag vale
+    elif not extra and last_modified and request.if_modified_since and last_modified <= request.if_modified_since:
+        return _not_modified(etag, last_modified)
+    
+    encoding = _accepted_encoding()
+    cached = _cached_body((request.script_root + request.full_path, etag, encoding))
+    if cached is not None:
+        _compressed_cache.inc('hit')
+        mimetype, body = cached
+        response = Response(body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        etag = f"{etag}-{encoding}"
+    else:
+        response = app.make_response(view(*args, **kwargs))
+    response.set_etag(etag)
+    if last_modified:
+        # None nao apaga o header no werkzeug: vira a hora atual
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def _not_modified(etag, last_modified):
+    response = Response(status=304)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+@app.after_request
+def _version_header(response):
+    # A versao (a mesma da ETag) em que a request leu os notes, se leu algum
+    snapshot = getattr(_current, 'snapshot', None)
+    if snapshot is not None:
+        response.headers['X-Clilog-Version'] = _version_tag(snapshot['key'])
+    return response
+
+@app.after_request
+def _compress_response(response):
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _accepted_encoding()
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    etag, _ = response.get_etag()
+    cache_key = (request.script_root + request.full_path, etag, encoding)
+    cached = _cached_body(cache_key) if etag else None
+    if cached is None:
+        _compressed_cache.inc('miss')
+        with _timed('compress'):
+            cached = (response.mimetype, _compress(body, encoding))
+        if etag:
+            _store_body(cache_key, cached)
+    
+    response.set_data(cached[1])
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+# --- METRICAS HTTP E PROFILING ---
+# O middleware mede cada request ate o fim do corpo (streams inclusos) e soma as fases
+# marcadas com _timed() pela thread que o atende. As fases tambem saem no Server-Timing
+# da resposta; requests acima de --slow-ms vao para o stderr. Com --profile, um GET em
+# /debug/profile/<rota> executa <rota> sob o cProfile e devolve as estatisticas.
+PROFILE_PREFIX = "/debug/profile/"
+PROFILE_TOP = 60
+# Conexoes longas: contadas, mas fora do histograma e do log de lentos
+_UNTIMED_ROUTES = {'/api/events'}
+_PROCESS_START = time.time()
+
+_instrumentation = {
+    'slow_ms': float(os.environ.get('CLILOG_SLOW_MS') or 0),
+    'profile': os.environ.get('CLILOG_PROFILE') == '1'
+}
+_profile_lock = threading.Lock()
+
+_http_requests = MetricCounter("clilog_http_requests_total", "HTTP requests, by method, route and status.", ("method", "route", "status"))
+_http_seconds = MetricHistogram("clilog_http_request_seconds", "Time to answer a request, body included, by route.", ("route",))
+_http_phase_seconds = MetricCounter("clilog_http_phase_seconds_total",
+                                    "Request time spent in file I/O, parsing, rendering, JSON encoding, compression and writes, by route.",
+                                    ("route", "phase"))
+MetricGauge("clilog_notes", "Notes in the cache, all notebooks.",
+            lambda: sum(len(book.snapshot['notes']) for book in list(_books['loaded'].values())))
+MetricGauge("clilog_tombstones", "Deleted notes still in the log files, waiting for compaction.",
+            lambda: sum(len(book.snapshot['dead']) for book in list(_books['loaded'].values())))
+MetricGauge("clilog_write_queue_depth", "Mutations waiting for the writer threads.",
+            lambda: sum(book.write_queue.qsize() for book in list(_books['loaded'].values())))
+MetricGauge("clilog_notebooks_loaded", "Notebooks opened by this process.", lambda: len(_books['loaded']))
+MetricGauge("clilog_event_streams", "Open /api/events streams.", lambda: _event_streams['open'])
+MetricGauge("process_start_time_seconds", "Start time of the process since the Unix epoch.", lambda: _PROCESS_START)
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        with _timed('json'):
+            return super().response(*args, **kwargs)
+
+app.json = _TimedJSONProvider(app)
+
+class _RequestTimer:
+    __slots__ = ('method', 'path', 'route', 'status', 'start', 'phases')
+
+    def __init__(self, environ):
+        self.method = environ.get('REQUEST_METHOD', 'GET')
+        self.path = environ.get('PATH_INFO', '')
+        if environ.get('QUERY_STRING'):
+            self.path += '?' + environ['QUERY_STRING']
+        self.route = 'unmatched'
+        self.status = '500'
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    def server_timing(self):
+        parts = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.phases.items()]
+        parts.append(f"app;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+    def finish(self):
+        if getattr(_request_state, 'phases', None) is self.phases:
+            _request_state.phases = _request_state.timer = None
+        elapsed = time.perf_counter() - self.start
+        _http_requests.inc(self.method, self.route, self.status)
+        if self.route in _UNTIMED_ROUTES:
+            return
+        _http_seconds.observe(elapsed, self.route)
+        for phase, seconds in self.phases.items():
+            _http_phase_seconds.inc(self.route, phase, amount=seconds)
+        slow_ms = _instrumentation['slow_ms']
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            phases = ", ".join(f"{phase} {seconds * 1000:.1f}" for phase, seconds in self.phases.items())
+            print(f"clilog-slow: {self.method} {self.path} {self.status} {elapsed * 1000:.1f} ms"
+                  + (f" ({phases})" if phases else ""), file=sys.stderr, flush=True)
+
+class _TimedBody:
+    """Corpo da resposta que fecha o cronometro do request quando o servidor chama close()."""
+
+    def __init__(self, body, timer):
+        self.body = body
+        self.timer = timer
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.timer.finish()
+
+class _InstrumentedApp:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if _instrumentation['profile'] and environ.get('PATH_INFO', '').startswith(PROFILE_PREFIX):
+            return _profile_request(self.wsgi_app, environ, start_response)
+        timer = _RequestTimer(environ)
+        _request_state.timer = timer
+        _request_state.phases = timer.phases
+
+        def timed_start_response(status, headers, exc_info=None):
+            timer.status = status.split(' ', 1)[0]
+            headers.append(('Server-Timing', timer.server_timing()))
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, timed_start_response)
+        except BaseException:
+            timer.finish()
+            raise
+        return _TimedBody(body, timer)
+
+BOOK_PREFIX = "/b/"
+
+class _NotebookApp:
+    """/b/<nome>/<rota> atende <rota> no caderno <nome>: o prefixo vai para o SCRIPT_NAME
+    (request.script_root, usado nos links da pagina) e as rotas continuam as mesmas."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        book = None
+        if path.startswith(BOOK_PREFIX):
+            name, _, rest = path[len(BOOK_PREFIX):].partition('/')
+            # Uma leitura nao cria caderno (nem o registra): so a primeira escrita
+            if environ.get('REQUEST_METHOD') in ('GET', 'HEAD') and not book_exists(name):
+                return _plain_response(start_response, '404 Not Found', f"notebook '{name}' does not exist\n")
+            try:
+                book = get_book(name)
+            except ValueError as e:
+                return _plain_response(start_response, '404 Not Found', f"{e}\n")
+            environ = dict(environ, SCRIPT_NAME=environ.get('SCRIPT_NAME', '') + BOOK_PREFIX + name,
+                           PATH_INFO='/' + rest)
+        # Toda request define o caderno da thread e comeca sem versao fixa: nada vaza de uma
+        # request para a outra. A primeira versao lida vale ate o fim da request (ver _snapshot)
+        previous = getattr(_current, 'book', None)
+        _current.book, _current.snapshot, _current.pin = book, None, True
+        
+        def release():
+            # Fim do corpo: a thread solta a versao, senao ela ficaria viva ate a proxima request
+            _current.book, _current.snapshot, _current.pin = previous, None, False
+        return ClosingIterator(self.wsgi_app(environ, start_response), release)
+
+app.wsgi_app = _InstrumentedApp(_NotebookApp(app.wsgi_app))
+
+@app.before_request
+def _record_route():
+    timer = getattr(_request_state, 'timer', None)
+    if timer is not None and request.url_rule is not None:
+        # A regra, nao o caminho: /done/<int:note_id> e uma serie so
+        timer.route = request.url_rule.rule
+
+def _plain_response(start_response, status, text):
+    data = text.encode('utf-8')
+    start_response(status, [('Content-Type', 'text/plain; charset=utf-8'), ('Content-Length', str(len(data))),
+                            ('Cache-Control', 'no-store')])
+    return [data]
+
+def _profile_request(wsgi_app, environ, start_response):
+    """Executa o request sem o prefixo /debug/profile sob o cProfile; o corpo original e descartado.
+    profile_sort=<chave do pstats> escolhe a ordem e profile_format=pstats devolve o dump binario."""
+    query = urllib.parse.parse_qsl(environ.get('QUERY_STRING', ''), keep_blank_values=True)
+    options = dict(item for item in query if item[0].startswith('profile_'))
+    query = urllib.parse.urlencode([item for item in query if not item[0].startswith('profile_')])
+    path = environ['PATH_INFO'][len(PROFILE_PREFIX) - 1:]
+    environ = dict(environ, PATH_INFO=path, QUERY_STRING=query)
+    sort = options.get('profile_sort', 'cumulative')
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        return _plain_response(start_response, '400 Bad Request', f"unknown profile_sort '{sort}'\n")
+    # O cProfile e global no interpretador: um request por vez
+    if not _profile_lock.acquire(blocking=False):
+        return _plain_response(start_response, '409 Conflict', "another request is being profiled\n")
+    
+    status = []
+    size = 0
+    profiler = cProfile.Profile()
+    try:
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            body = wsgi_app(environ, lambda line, headers, exc_info=None: status.append(line) or (lambda data: None))
+            try:
+                for chunk in body:
+                    size += len(chunk)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        finally:
+            profiler.disable()
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        _profile_lock.release()
+    
+    stats = pstats.Stats(profiler)
+    if options.get('profile_format') == 'pstats':
+        data = marshal.dumps(stats.stats)
+        start_response('200 OK', [('Content-Type', 'application/octet-stream'), ('Content-Length', str(len(data))),
+                                  ('Content-Disposition', 'attachment; filename="clilog.prof"'), ('Cache-Control', 'no-store')])
+        return [data]
+    out = io.StringIO()
+    out.write(f"{environ.get('REQUEST_METHOD', 'GET')} {path}{'?' + query if query else ''} -> "
+              f"{status[-1] if status else '-'}, {size} bytes in {elapsed:.1f} ms\n")
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(PROFILE_TOP)
+    return _plain_response(start_response, '200 OK', out.getvalue())
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# --- FEED DE MUDANCAS (SSE) ---
+# Uma unica thread observa o diretorio do notes.log (inotify, ou stat periodico fora do Linux),
+# compara o snapshot anterior com o cache atual e publica um evento por nota alterada.
+# Os eventos ficam num buffer circular compartilhado: cada cliente de /api/events so le
+# dele, entao o arquivo e parseado uma vez por mudanca, nao uma vez por cliente.
+# No `clilog web` todos os streams sao escritos por uma thread so (_EventHub), fora do pool.
+# Em outro servidor WSGI cada stream prende uma thread ate o cliente sair (so notado no
+# proximo heartbeat). Acima do limite /api/events responde 503, para as outras rotas
+# nunca ficarem sem thread; `clilog web` usa SERVE_MAX_STREAMS (ver --max-streams).
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_DEBOUNCE = 0.05
+EVENTS_HEARTBEAT = 15
+EVENTS_BACKLOG = 1000
+EVENTS_MAX_STREAMS = 16
+EVENTS_RETRY_AFTER = 30
+# Cliente que nao le: passou disso sem esvaziar, a conexao cai e ele volta com Last-Event-ID
+EVENTS_MAX_BUFFER = 1 << 20
+
+_event_streams = {'open': 0, 'max': EVENTS_MAX_STREAMS}
+_event_streams_lock = threading.Lock()
+
+_IN_MODIFY, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE, _IN_DELETE = 0x2, 0x8, 0x80, 0x100, 0x200
+
+def _inotify_watch(path):
+    """fd do inotify observando o diretorio de `path`, ou None se nao houver inotify."""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    # O diretorio, nao o arquivo: as reescritas trocam o inode com os.replace/mv
+    mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(os.path.dirname(path)), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+class ChangeFeed:
+    def __init__(self, book):
+        self.book = book
+        self.cond = threading.Condition()
+        self.boot = None
+        self.version = 0
+        self.events = deque(maxlen=EVENTS_BACKLOG)
+        self.key = None
+        self.snapshot = {}
+        self.thread = None
+    
+    def start(self):
+        with self.cond:
+            if self.thread is None or not self.thread.is_alive():
+                # Por processo: com --workers cada worker tem o seu feed e as suas versoes
+                self.boot = f"{os.getpid():x}{time.time_ns():x}"
+                self.key = self.book.storage.key()
+                self.snapshot = self._index(get_notes())
+                self.thread = threading.Thread(target=self._run, name="clilog-events", daemon=True)
+                self.thread.start()
+        return self
+    
+    @staticmethod
+    def _index(notes):
+        # Mesma regra do resto do app: com ids repetidos vale a primeira ocorrencia
+        snapshot = {}
+        for note in notes:
+            snapshot.setdefault(note.id, note)
+        return snapshot
+    
+    def _run(self):
+        _current.book = self.book
+        fd = _inotify_watch(self.book.storage.path)
+        while True:
+            if fd is None:
+                time.sleep(EVENTS_POLL_INTERVAL)
+            elif select.select([fd], [], [], EVENTS_POLL_INTERVAL)[0]:
+                # Agrupa a rajada de eventos de uma mesma escrita (tmp + mv, dd, ...)
+                time.sleep(EVENTS_DEBOUNCE)
+                try:
+                    while os.read(fd, 65536):
+                        pass
+                except BlockingIOError:
+                    pass
+            try:
+                self.check()
+            except Exception as e:
+                print(f"clilog-events: {e}", file=sys.stderr)
+    
+    def check(self):
+        """Publica o que mudou desde o ultimo snapshot; barato (um stat) se o arquivo nao mudou."""
+        book = self.book
+        if book.storage.key() == self.key:
+            return
+        c = _snapshot()
+        key = c['key']
+        current = self._index(c['notes'])
+        
+        previous = self.snapshot
+        changed = []
+        for note_id, note in current.items():
+            old = previous.get(note_id)
+            if old is None:
+                changed.append(('add', note_id, note))
+            elif old is not note and old.raw != note.raw:
+                changed.append(('update', note_id, note))
+        changed.extend(('delete', note_id, None) for note_id in previous if note_id not in current)
+        self.key = key
+        self.snapshot = current
+        if not changed:
+            return
+        
+        stats = get_stats()
+        dumps = app.json.dumps
+        with self.cond:
+            for kind, note_id, note in changed:
+                self.version += 1
+                data = {"version": self.version, "id": note_id, "stats": stats}
+                if note is not None:
+                    data["note"] = note.to_dict()
+                    data["note"]["html"] = _render_card(note)
+                self.events.append((self.version, f"id: {self.boot}-{self.version}\nevent: {kind}\ndata: {dumps(data)}\n\n"))
+            self.cond.notify_all()
+        _event_hub.wake()
+    
+    def resume_point(self, last_event_id):
+        """Versao a partir da qual o cliente continua, ou None se ele precisa recarregar tudo."""
+        if not last_event_id:
+            return self.version
+        boot, _, version = last_event_id.rpartition('-')
+        if boot != self.boot or not version.isdigit():
+            return None
+        version = int(version)
+        oldest = self.events[0][0] if self.events else self.version + 1
+        if version > self.version or version < oldest - 1:
+            return None
+        return version
+    
+    def since(self, version):
+        """Eventos ja formatados com versao > `version` (chamar com self.cond)."""
+        if not self.events or self.events[-1][0] <= version:
+            return []
+        start = max(0, version - self.events[0][0] + 1)
+        return [event for _, event in list(self.events)[start:]]
+
+def _event_start(last_event_id):
+    """(feed, versao de onde o cliente continua, primeiro evento: sync ou reset)."""
+    feed = _book().feed.start()
+    with feed.cond:
+        version = feed.resume_point(last_event_id)
+        # Fora do buffer (ou de outro processo): o cliente recarrega via /api/notes
+        kind = 'sync' if version is not None else 'reset'
+        if version is None:
+            version = feed.version
+    return feed, version, f"retry: 2000\nid: {feed.boot}-{version}\nevent: {kind}\ndata: {{\"version\": {version}}}\n\n"
+
+def _event_stream(last_event_id):
+    feed, version, first = _event_start(last_event_id)
+    yield first
+    
+    while True:
+        with feed.cond:
+            if feed.version == version:
+                feed.cond.wait(EVENTS_HEARTBEAT)
+            events = feed.since(version)
+            version = feed.version
+        if events:
+            yield ''.join(events)
+        else:
+            yield ": ping\n\n"
+
+class _EventClient:
+    __slots__ = ('sock', 'feed', 'version', 'out', 'written', 'writing')
+
+    def __init__(self, sock, feed, version):
+        self.sock, self.feed, self.version = sock, feed, version
+        self.out = bytearray()
+        self.written = time.monotonic()
+        self.writing = False
+
+class _EventHub:
+    """Escreve os streams de /api/events que o servidor do `clilog web` entrega depois do
+    primeiro evento (ver _KeepAliveRequestHandler): uma thread com um selector para todos,
+    entao um stream aberto nao prende thread do pool. Um cliente que fecha a conexao sai na
+    hora, porque o socket fica legivel com EOF."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.incoming = []
+        self.thread = None
+        self.wake_fds = None
+
+    def add(self, sock, feed, version):
+        with self.lock:
+            self.incoming.append(_EventClient(sock, feed, version))
+            if self.thread is None:
+                # Criados no primeiro stream, ou seja, ja dentro de cada worker
+                self.wake_fds = os.pipe()
+                for fd in self.wake_fds:
+                    os.set_blocking(fd, False)
+                self.thread = threading.Thread(target=self._run, name="clilog-events-hub", daemon=True)
+                self.thread.start()
+        self.wake()
+
+    def wake(self):
+        if self.wake_fds is not None:
+            try:
+                os.write(self.wake_fds[1], b'.')
+            except BlockingIOError:
+                pass  # ja tem um aviso pendente
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.wake_fds[0], selectors.EVENT_READ)
+        clients = set()
+        while True:
+            try:
+                self._step(selector, clients)
+            except Exception as e:
+                print(f"clilog-events-hub: {e}", file=sys.stderr)
+
+    def _step(self, selector, clients):
+        now = time.monotonic()
+        timeout = min((client.written + EVENTS_HEARTBEAT - now for client in clients), default=None)
+        for key, mask in selector.select(None if timeout is None else max(0, timeout)):
+            client = key.data
+            if client is None:
+                try:
+                    while os.read(self.wake_fds[0], 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+            elif client.sock is None:
+                continue
+            elif mask & selectors.EVENT_READ and not self._alive(client):
+                self._drop(selector, clients, client)
+            elif mask & selectors.EVENT_WRITE:
+                self._flush(selector, clients, client)
+        
+        with self.lock:
+            incoming, self.incoming = self.incoming, []
+        for client in incoming:
+            client.sock.setblocking(False)
+            selector.register(client.sock, selectors.EVENT_READ, client)
+            clients.add(client)
+        
+        now = time.monotonic()
+        for client in list(clients):
+            feed = client.feed
+            with feed.cond:
+                events = feed.since(client.version)
+                client.version = feed.version
+            if events:
+                self._send(selector, clients, client, ''.join(events))
+            elif now - client.written >= EVENTS_HEARTBEAT:
+                self._send(selector, clients, client, ": ping\n\n")
+
+    @staticmethod
+    def _alive(client):
+        try:
+            # O cliente de um stream nao manda nada: b'' e a conexao fechada
+            return client.sock.recv(4096) != b''
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            return False
+
+    def _send(self, selector, clients, client, text):
+        client.out += text.encode('utf-8')
+        client.written = time.monotonic()
+        if len(client.out) > EVENTS_MAX_BUFFER:
+            self._drop(selector, clients, client)
+        else:
+            self._flush(selector, clients, client)
+
+    def _flush(self, selector, clients, client):
+        try:
+            del client.out[:client.sock.send(client.out)]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._drop(selector, clients, client)
+            return
+        # So pede aviso de escrita enquanto sobrar algo no buffer
+        writing = bool(client.out)
+        if writing != client.writing:
+            client.writing = writing
+            selector.modify(client.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0), client)
+
+    @staticmethod
+    def _drop(selector, clients, client):
+        selector.unregister(client.sock)
+        client.sock.close()
+        client.sock = None
+        clients.discard(client)
+        _close_event_stream()
+
+_event_hub = _EventHub()
+
 @app.route("/")
+# O card de atrasados muda na virada do dia
+@_versioned(lambda: f"{TEMPLATE_VERSION}-{datetime.now().strftime('%Y%m%d')}")
 def index():
-    notes = get_notes()
-    stats = {
-        'total': len(notes),
-        'completed': len([n for n in notes if n['status'] == 'completed']),
-        'pending': len([n for n in notes if n['status'] == 'pending'])
+    # So a primeira janela vai no HTML; o resto vem de /api/cards conforme a rolagem
+    notes, next_cursor = _card_window(0, PAGE_WINDOW)
+    stats = get_stats()
+    with _timed('render'):
+        return render_template(_PAGE_TEMPLATE, notes=notes, next_cursor=next_cursor, stats=stats,
+                               page_window=PAGE_WINDOW, batch_max_ops=BATCH_MAX_OPS, base=request.script_root)
+
+PAGE_WINDOW = 100
+
+def _card_window(cursor, limit, matches=None):
+    """Ate `limit` notes a partir da posicao `cursor` que passam no filtro, e a posicao seguinte (ou None)."""
+    notes = _snapshot()['notes']
+    window = []
+    position = cursor
+    while position < len(notes) and len(window) < limit:
+        note = notes[position]
+        position += 1
+        if matches is None or matches(note):
+            window.append(note)
+    return window, position if position < len(notes) else None
+
+@app.route("/api/cards")
+@_versioned(lambda: TEMPLATE_VERSION)
+def api_cards():
+    """HTML dos cards da proxima janela da lista, com os mesmos filtros da pagina (status e busca)."""
+    cursor = max(0, request.args.get('cursor', 0, type=int))
+    limit = max(1, min(request.args.get('limit', PAGE_WINDOW, type=int), API_MAX_PAGE_SIZE))
+    status = request.args.get('status')
+    query = request.args.get('search', '').strip()
+    ids = set(search_notes(query, 0)['ids']) if query else None
+    
+    def matches(note):
+        return (not status or note.status == status) and (ids is None or note.id in ids)
+    
+    notes, next_cursor = _card_window(cursor, limit, matches if status or ids is not None else None)
+    with _timed('render'):
+        html = ''.join(_render_card(note) for note in notes)
+    return jsonify({
+        "html": html,
+        "count": len(notes),
+        "next_cursor": next_cursor
+    })
+
+BATCH_MAX_OPS = 1000
+# Cada op vira uma linha do notes.log: uma quebra (ou outro controle) partiria a linha
+_BATCH_CONTROL_RE = re.compile(r'[\x00-\x1f\x7f-\x9f\u2028\u2029]')
+# A mesma regra do _TAG_RE (indices de tags) e do shell
+_BATCH_TAG_RE = re.compile(r'\w+')
+
+def _batch_selector(item):
+    if item.get('with_tag'):
+        return ('tag', _batch_tag(item['with_tag']))
+    note_id = item.get('id')
+    if isinstance(note_id, bool) or not isinstance(note_id, int):
+        raise ValueError("op precisa de 'id' (inteiro) ou 'with_tag'")
+    return note_id
+
+def _batch_tag(tag):
+    if not isinstance(tag, str) or not _BATCH_TAG_RE.fullmatch(tag.lstrip('#')):
+        raise ValueError(f"tag invalida: {tag!r} (use letras, digitos e _)")
+    return tag.lstrip('#')
+
+def _batch_tags(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split()
+    elif not isinstance(value, list):
+        raise ValueError("tags devem ser uma lista ou uma string")
+    return [_batch_tag(tag) for tag in value]
+
+def _batch_content(item):
+    content = item.get('content')
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError(f"{item['op']} precisa de 'content'")
+    if _BATCH_CONTROL_RE.search(content):
+        raise ValueError("'content' nao pode ter quebras de linha nem caracteres de controle")
+    return content.strip()
+
+def _batch_op(item):
+    """Converte uma op JSON de /api/batch na tupla usada por _apply_ops."""
+    if not isinstance(item, dict):
+        raise ValueError("op invalida")
+    kind = item.get('op')
+    if kind == 'add':
+        content = _batch_content(item)
+        due_date = item.get('due') or None
+        if due_date:
+            if not isinstance(due_date, str):
+                raise ValueError("'due' deve ser YYYY-MM-DD")
+            datetime.strptime(due_date, "%Y-%m-%d")
+        return ('add', content, _batch_tags(item.get('tags')), due_date)
+    if kind in ('done', 'undo'):
+        return ('status', _batch_selector(item), 'completed' if kind == 'done' else 'pending')
+    if kind == 'edit':
+        return ('update', _batch_selector(item), _batch_content(item), None)
+    if kind == 'delete':
+        return ('delete', _batch_selector(item))
+    if kind == 'tag':
+        return ('tag', _batch_selector(item), _batch_tags(item.get('add')), _batch_tags(item.get('remove')))
+    raise ValueError(f"op desconhecida: {kind}")
+
+_note_card_macro = {}
+
+def _render_card(note):
+    macro = _note_card_macro.get('card')
+    if macro is None:
+        macro = _note_card_macro['card'] = _NOTE_CARD_TEMPLATE.module.note_card
+    return str(macro(note))
+
+def _run_batch(items):
+    """Aplica as ops num unico commit e devolve so o que mudou (com o HTML dos cards) e as novas estatisticas."""
+    results, renumbered = apply_batch([_batch_op(item) for item in items])
+    
+    changed = {}
+    deleted = set()
+    for old, new in (change for op_changes in results for change in op_changes):
+        if new is not None:
+            changed[new.id] = new
+            deleted.discard(new.id)
+        elif old.id in changed:
+            del changed[old.id]
+            deleted.add(old.id)
+        else:
+            deleted.add(old.id)
+    
+    delta = []
+    with _timed('render'):
+        for note in changed.values():
+            data = note.to_dict()
+            data['html'] = _render_card(note)
+            delta.append(data)
+    return {
+        "results": [[(new or old).id for old, new in op_changes] for op_changes in results],
+        "changed": delta,
+        "deleted": sorted(deleted),
+        "stats": get_stats(),
+        "reload": renumbered
     }
-    return render_template_string(HTML_TEMPLATE, notes=notes, stats=stats)
+
+def _open_event_stream():
+    with _event_streams_lock:
+        if _event_streams['open'] >= _event_streams['max']:
+            return False
+        _event_streams['open'] += 1
+        return True
+
+def _close_event_stream():
+    with _event_streams_lock:
+        _event_streams['open'] -= 1
+
+@app.route("/api/events")
+def api_events():
+    if not _open_event_stream():
+        _event_streams_rejected.inc()
+        response = jsonify({"error": "too many open event streams"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(EVENTS_RETRY_AFTER)
+        return response
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    detach = request.environ.get('clilog.detach_events')
+    if detach is not None:
+        # Servidor do `clilog web`: so o primeiro evento sai daqui, o resto vem do _event_hub,
+        # que tambem libera a vaga. Um iterador (nao uma lista) para nao ganhar Content-Length
+        feed, version, first = _event_start(last_event_id)
+        detach(feed, version)
+        response = Response(iter([first]), mimetype='text/event-stream')
+    else:
+        response = Response(_event_stream(last_event_id), mimetype='text/event-stream')
+        # O servidor fecha o corpo quando o cliente sai (ou quando a escrita do heartbeat falha)
+        response.call_on_close(_close_event_stream)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route("/api/batch", methods=["POST"])
+def api_batch():
+    payload = request.get_json(silent=True)
+    items = payload.get('ops') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items or len(items) > BATCH_MAX_OPS:
+        return jsonify({"error": f"'ops' deve ser uma lista com 1 a {BATCH_MAX_OPS} ops"}), 400
+    try:
+        return jsonify(_run_batch(items))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route("/add", methods=["POST"])
 def add_note():
@@ -524,22 +3253,22 @@ def add_note():
     if text:
         add_note_to_file(text)
         flash("Tarefa adicionada!", "success")
-    return redirect("/")
+    return redirect(request.script_root + "/")
 
 @app.route("/done/<int:note_id>")
 def mark_done(note_id):
-    update_note_in_file(note_id, get_note_content(note_id), "completed")
-    return redirect("/")
+    set_note_status(note_id, "completed")
+    return redirect(request.script_root + "/")
 
 @app.route("/undo/<int:note_id>")
 def mark_undo(note_id):
-    update_note_in_file(note_id, get_note_content(note_id), "pending")
-    return redirect("/")
+    set_note_status(note_id, "pending")
+    return redirect(request.script_root + "/")
 
 @app.route("/delete/<int:note_id>")
 def delete_note(note_id):
     delete_note_from_file(note_id)
-    return redirect("/")
+    return redirect(request.script_root + "/")
 
 @app.route("/edit/<int:note_id>", methods=["POST"])
 def edit_note(note_id):
@@ -549,29 +3278,859 @@ def edit_note(note_id):
         return jsonify({"success": True})
     return jsonify({"success": False})
 
+API_MAX_PAGE_SIZE = 1000
+
+def _include_archive(args):
+    """?include=archive: os notes dos segmentos do arquivo entram junto com os do notes.log."""
+    return 'archive' in args.get('include', '').split(',')
+
+def _listed_notes(args):
+    """Notes de /api/notes e /export: pelos indices quando da, senao a lista inteira."""
+    if _include_archive(args):
+        # Os indices so cobrem o notes.log; com o arquivo, o _note_filter faz todo o filtro
+        return get_notes(include_archive=True)
+    notes = _indexed_notes(args)
+    # Sem copia: a lista publicada nunca muda e quem chama so a percorre
+    return _snapshot()['notes'] if notes is None else notes
+
+def _note_filter(args):
+    """Monta o filtro de /api/notes e /export a partir da query string (status, tag, due_before, due_after, q)."""
+    status = args.get('status')
+    tag = args.get('tag', '').lstrip('#')
+    due_before = args.get('due_before')
+    due_after = args.get('due_after')
+    text = args.get('q', '').casefold()
+    
+    if not (status or tag or due_before or due_after or text):
+        return None
+    
+    def matches(note):
+        if status and note.status != status:
+            return False
+        if tag and tag not in note.tags:
+            return False
+        if due_before or due_after:
+            if note.due_date == '-':
+                return False
+            if due_before and note.due_date >= due_before:
+                return False
+            if due_after and note.due_date <= due_after:
+                return False
+        if text and text not in note.content.casefold():
+            return False
+        return True
+    
+    return matches
+
+def _stream_json_array(notes, head=None, tail=None):
+    dumps = app.json.dumps
+    yield head or '['
+    for i, note in enumerate(notes):
+        yield (',' if i else '') + dumps(note.to_dict())
+    yield tail or ']'
+
+def _stream_ndjson(notes):
+    dumps = app.json.dumps
+    for note in notes:
+        yield dumps(note.to_dict()) + '\n'
+
 @app.route("/export")
+@_versioned()
 def export_notes():
-    notes = get_notes()
-    return jsonify({
-        "export_date": datetime.now().isoformat(),
-        "total_notes": len(notes),
-        "notes": notes
-    })
+    try:
+        fmt = export_format(request.args.get('format', 'json'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    notes = _listed_notes(request.args)
+    matches = _note_filter(request.args)
+    if matches:
+        notes = (note for note in notes if matches(note))
+    
+    response = Response(export_stream(notes, fmt), mimetype=EXPORT_FORMATS[fmt])
+    if request.args.get('download'):
+        response.headers['Content-Disposition'] = f'attachment; filename="clilog_export.{fmt}"'
+    return response
 
 @app.route("/api/notes")
+@_versioned()
 def api_notes():
-    return jsonify(get_notes())
+    notes = _listed_notes(request.args)
+    matches = _note_filter(request.args)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
+    
+    # Sem limit/cursor: lista completa (filtrada), como antes
+    if limit is None and cursor is None:
+        if matches:
+            notes = (note for note in notes if matches(note))
+        if request.args.get('format') == 'ndjson':
+            return Response(_stream_ndjson(notes), mimetype='application/x-ndjson')
+        if request.args.get('stream'):
+            return Response(_stream_json_array(notes), mimetype='application/json')
+        return jsonify([note.to_dict() for note in notes])
+    
+    # Paginado: o cursor e a posicao na lista (notes.log ou resultado do indice) onde a proxima pagina comeca
+    limit = max(1, min(limit or API_MAX_PAGE_SIZE, API_MAX_PAGE_SIZE))
+    position = max(cursor or 0, 0)
+    page = []
+    while position < len(notes) and len(page) < limit:
+        note = notes[position]
+        position += 1
+        if matches is None or matches(note):
+            page.append(note.to_dict())
+    
+    return jsonify({
+        "notes": page,
+        "next_cursor": position if position < len(notes) else None
+    })
+
+@app.route("/api/search")
+@_versioned()
+def api_search():
+    query = request.args.get('q', '').strip()
+    limit = max(0, min(request.args.get('limit', 100, type=int), API_MAX_PAGE_SIZE))
+    return jsonify(search_notes(query, limit, _include_archive(request.args)))
+
+@app.route("/api/archive")
+def api_archive():
+    """Segmentos do arquivo com o resumo do cabecalho; os notes so sao lidos com include=archive."""
+    segments = []
+    for path in _segment_paths():
+        try:
+            header = read_segment_header(path)
+        except (OSError, ValueError):
+            continue
+        segments.append({'file': os.path.basename(path), 'bytes': os.path.getsize(path), **header})
+    return jsonify(segments)
+
+@app.route("/api/books")
+def api_books():
+    """Cadernos com os totais de cada um; os que ainda nao estavam em memoria sao lidos em paralelo."""
+    return jsonify(books_summary())
+
+@app.route("/api/books/search")
+def api_books_search():
+    query = request.args.get('q', '').strip()
+    limit = max(0, min(request.args.get('limit', 100, type=int), API_MAX_PAGE_SIZE))
+    return jsonify(search_books(query, limit))
+
+@app.route("/api/tags")
+@_versioned()
+def api_tags():
+    with _book().cache_lock:
+        counts = _get_view('tags').counts()
+    return jsonify([{"tag": tag, "count": count} for tag, count in counts])
+
+@app.route("/api/due")
+@_versioned(lambda: datetime.now().strftime("%Y%m%d"))
+def api_due():
+    today = datetime.now().strftime("%Y-%m-%d")
+    include_completed = request.args.get('status') == 'all'
+    
+    with _book().cache_lock:
+        due = _get_view('due')
+        notes = due.between(request.args.get('after'), request.args.get('before'))
+        overdue = due.between(before=today)
+        due_today = due.on(today)
+    
+    if not include_completed:
+        notes = [note for note in notes if note.status == 'pending']
+    return jsonify({
+        "today": today,
+        "notes": [note.to_dict() for note in notes],
+        "overdue": [note.id for note in overdue if note.status == 'pending'],
+        "due_today": [note.id for note in due_today if note.status == 'pending']
+    })
+
+STATS_HISTORY_DAYS = 30
+STATS_MAX_HISTORY_DAYS = 366
+
+def _rate(completed, total):
+    return round(completed / total, 4) if total else 0.0
+
+@app.route("/api/stats")
+@_versioned(lambda: datetime.now().strftime("%Y%m%d"))
+def api_stats():
+    today = datetime.now().date()
+    days = request.args.get('days', STATS_HISTORY_DAYS, type=int)
+    days = max(1, min(days, STATS_MAX_HISTORY_DAYS))
+    dates = [(today - timedelta(days=n)).isoformat() for n in range(days - 1, -1, -1)]
+    
+    # Tudo sai dos contadores da view: nada aqui depende do numero de notes
+    with _book().cache_lock:
+        result = get_stats()
+        stats = _get_view('stats')
+        result['due_today'] = stats.pending_due.get(today.isoformat(), 0)
+        result['tags'] = dict(stats.tags)
+        history = [(day, *stats.days.get(day, (0, 0))) for day in dates]
+    
+    result['completion_rate'] = _rate(result['completed'], result['total'])
+    # Por dia de criacao: quantos foram criados e quantos desses ja estao concluidos
+    result['history'] = [{"date": day, "created": created, "completed": completed,
+                          "completion_rate": _rate(completed, created)}
+                         for day, created, completed in history]
+    return jsonify(result)
+
+# --- DAEMON DO TERMINAL ---
+# `clilog daemon` deixa os notes em memoria e atende list/search/stats/done/undo/add do
+# bin/clilog por um socket Unix, sem subir awk/grep/sort a cada comando. A saida e byte
+# a byte a do functions.sh. Quando nao da para garantir isso (notes.log fora do formato
+# canonico, outro locale, regex na busca, ...) a resposta e DAEMON_FALLBACK e o
+# bin/clilog segue pelo caminho de sempre.
+# Pedido: campos separados por NUL (protocolo, notes.log, locale, hoje, agora, comando,
+# argumentos...), terminado fechando a escrita. Resposta: "status\n" + saida.
+DAEMON_PROTOCOL = "clilog1"
+DAEMON_FALLBACK = "-"
+DAEMON_TIMEOUT = 10
+DAEMON_REPLY_CACHE_SIZE = 8
+_DAEMON_LOCALE_VARS = ("LC_ALL", "LC_COLLATE", "LC_CTYPE", "LANG")
+# Metacaracteres do grep (BRE) e do gsub do awk (ERE)
+_SHELL_REGEX_CHARS = frozenset('\\.[]()*+?{}|^$\n')
+_SHELL_DONE_RE = re.compile(r'([0-9]+\. )?\[X\]')
+_SHELL_DUE_RE = re.compile(r'([0-9]+\. )?\[ \].* \| Due: ')
+_SHELL_TAG_RE = re.compile(r'#[a-zA-Z0-9_]*')
+_SHELL_DATE_RE = re.compile(r'[1-9][0-9]{3}-[0-9]{2}-[0-9]{2}')
+_AWK_FIELD2_RE = re.compile(r'[ \t]*[^ \t]+[ \t]+([^ \t]+)')
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_daemon = {'locale': None, 'fold': None}
+_exact = {'key': None, 'value': False}
+_daemon_replies = OrderedDict()
+
+class _Fallback(Exception):
+    """O comando deve ser executado pelo functions.sh."""
+
+def daemon_socket_path():
+    path = os.environ.get("CLILOG_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    return os.path.join(runtime_dir, "clilog.sock") if runtime_dir else None
+
+def _locale_env():
+    return ":".join(os.environ.get(name, "") for name in _DAEMON_LOCALE_VARS)
 
-def get_note_content(note_id):
-    notes = get_notes()
+def _shell_notes():
+    """Copia dos notes, desde que o notes.log tenha exatamente uma linha por note ou tombstone,
+    sem nada que o parse descarte (linhas em branco, espacos nas pontas, \\r). None se nao existe."""
+    c = _snapshot()
+    with _book().cache_lock:
+        if c['key'] is None:
+            return None
+        if _exact['key'] != c['key']:
+            _exact['value'] = (c['newline'] and c['lines'] == len(c['notes']) + len(c['dead'])
+                               and sum(len(n.raw.encode('utf-8')) + 1 for n in c['notes'])
+                               + sum(size + 1 for _, size in c['dead']) == c['offset'])
+            _exact['key'] = c['key']
+        if not _exact['value']:
+            raise _Fallback()
+        return list(c['notes'])
+
+def _shell_commit(notes, changes, appended, flips):
+    """Grava como o _commit_batch, mas so com append/patch no lugar: a reescrita do save_notes
+    tambem compacta o arquivo, o que o functions.sh nao faria. Sem isso, o shell faz o comando."""
+    book = _book()
+    if not (appended or flips) or not _write_in_place(notes, changes, appended, flips, [], book.snapshot['key']):
+        raise _Fallback()
+    _commits.inc('in_place')
+    _exact.update(key=book.snapshot['key'], value=True)
+
+def _shell_colored(line):
+    # awk: verde se o segundo campo e "[X]", amarelo no resto
+    m = _AWK_FIELD2_RE.match(line)
+    color = "32" if m and m.group(1) == "[X]" else "33"
+    return f"\033[{color}m{line}\033[0m\n"
+
+@_register_view('shell_stats')
+class ShellStats:
+    """Contadores do `clilog stats`, com as mesmas regex do awk do functions.sh."""
+    
+    def __init__(self, notes):
+        self.completed = 0
+        self.tags = {}
+        for note in notes:
+            self.update(None, note)
+    
+    def update(self, old, new):
+        for note, delta in ((old, -1), (new, 1)):
+            if note is None:
+                continue
+            if _SHELL_DONE_RE.match(note.raw):
+                self.completed += delta
+            if '#' in note.raw:
+                for tag in _SHELL_TAG_RE.findall(note.raw):
+                    count = self.tags.get(tag, 0) + delta
+                    if count:
+                        self.tags[tag] = count
+                    else:
+                        del self.tags[tag]
+
+@_register_view('shell_due')
+class ShellDueIndex:
+    """Linhas do `clilog list due` ja na ordem do sort -t'|' -k2 (do segundo campo ate o
+    fim da linha, empate pela linha inteira), com a collation do locale."""
+    
+    def __init__(self, notes):
+        self.rows = sorted(self._row(note.raw) for note in notes if _SHELL_DUE_RE.match(note.raw))
+    
+    @staticmethod
+    def _row(line):
+        return (locale.strxfrm(line.split('|', 1)[1]), locale.strxfrm(line), line)
+    
+    def update(self, old, new):
+        if old is not None and _SHELL_DUE_RE.match(old.raw):
+            row = self._row(old.raw)
+            i = bisect.bisect_left(self.rows, row)
+            if i < len(self.rows) and self.rows[i] == row:
+                del self.rows[i]
+        if new is not None and _SHELL_DUE_RE.match(new.raw):
+            bisect.insort(self.rows, self._row(new.raw))
+
+def _daemon_list(args, env):
+    if args:
+        return (_daemon_list_due(env) if args[0] == "due" else (0, ""))
+    notes = _shell_notes()
+    if not notes:
+        return 0, "No notes found!\n"
+    return 0, "".join(_shell_colored(note.raw) for note in notes)
+
+def _daemon_list_due(env):
+    _snapshot()
+    with _book().cache_lock:
+        if _shell_notes() is None:
+            raise _Fallback()
+        lines = [row[-1] for row in _get_view('shell_due').rows]
+    today = env['today']
+    out = ["\n-----------------------------------------------------\n",
+           "ID | Status | Due Date   | Note\n",
+           "---|--------|------------|----------------------------\n"]
+    for count, line in enumerate(lines, 1):
+        fields = line.split('|')
+        status = re.sub(r'^[0-9]+\. ', '', fields[0], count=1).strip(' \t')
+        due_date = fields[1].strip(' \t')
+        if due_date.startswith("Due: "):
+            due_date = due_date[5:]
+        content = fields[2].strip(' \t') if len(fields) > 2 else ""
+        color = "\033[0m"
+        if due_date < today and due_date != "-":
+            color = "\033[1;31m"
+        elif due_date == today:
+            color = "\033[1;33m"
+        out.append(f"{count:2d} {status} {color} {due_date} \033[0m | {content}\n")
+    # grep sem resultado faz o pipeline (e o clilog) sair com 1
+    return (0 if lines else 1), "".join(out)
+
+def _daemon_search(args, env):
+    keyword = args[0]
+    if (not keyword or keyword[0] == '-' or not keyword.isascii()
+            or not _SHELL_REGEX_CHARS.isdisjoint(keyword)):
+        raise _Fallback()
+    notes = _shell_notes()
+    if notes is None:
+        return 0, "No notes found.\n"
+    fold = _daemon['fold']
+    needle = keyword.lower()
+    highlight = f"\033[36m{keyword}\033[0m"
+    out = [f"Resultados da busca por '{keyword}':\n"]
+    matched = False
     for note in notes:
-        if note['id'] == note_id:
-            return note['content']
-    return ""
+        line = note.raw
+        if needle in fold(line):
+            matched = True
+            m = _AWK_FIELD2_RE.match(line)
+            color = "32" if m and m.group(1) == "[X]" else "33"
+            out.append(f"\033[{color}m{line.replace(keyword, highlight)}\033[0m\n")
+    return (0 if matched else 1), "".join(out)
 
-if __name__ == "__main__":
-    os.makedirs(os.path.dirname(NOTES_FILE), exist_ok=True)
+def _daemon_stats(args, env):
+    _snapshot()
+    with _book().cache_lock:
+        notes = _shell_notes()
+        total = completed = 0
+        tags = {}
+        if notes is not None:
+            stats = _get_view('shell_stats')
+            total, completed, tags = len(notes), stats.completed, dict(stats.tags)
+    percent = completed * 100 // total if total else 0
+    # sort -nr | head -3 sobre as linhas "%7d tag": contagem desc, empate pela linha inteira (desc)
+    top = sorted(tags.items(), reverse=True,
+                 key=lambda item: (item[1], locale.strxfrm(f"{item[1]:7d} {item[0]}")))[:3]
+    out = ["📊 Clilog stats:\n",
+           f"   Total: {total} notes\n",
+           f"   Completed: {completed} ({percent}%)\n",
+           f"   Pending: {total - completed}\n",
+           "   Most used tags:\n"]
+    out.extend(f"     {tag}: {count}\n" for tag, count in top)
+    return 0, "".join(out)
+
+def _daemon_flip(args, old, new, message):
+    note_arg = args[0]
+    if not re.fullmatch(r'0|[1-9][0-9]{0,17}', note_arg):
+        raise _Fallback()
+    with _notes_file_lock(), _book().cache_lock:
+        notes = _shell_notes()
+        if notes is None:
+            raise _Fallback()
+        # Como o _clilog_flip_marker: primeiro note com esse ID, primeira ocorrencia de `old` na linha
+        found = _select(notes, int(note_arg))
+        if not found:
+            return 1, f"Error: Note {note_arg} not found, exiting...\n"
+        i = found[0]
+        note = notes[i]
+        pos = note.raw.find(old)
+        if pos >= 0:
+            notes[i] = _parse_line(note.raw[:pos] + new + note.raw[pos + 3:], note.id)
+            _shell_commit(notes, [(note, notes[i])], [], {i: note} if pos == _marker_pos(note) else {})
+    return 0, message.format(note_arg)
+
+def _daemon_add(args, env):
+    words = []
+    due_date = "-"
+    i = 0
+    while i < len(args):
+        if args[i] == "--due":
+            # So a forma YYYY-MM-DD; o resto o `date -d` do functions.sh interpreta
+            value = args[i + 1] if i + 1 < len(args) else ""
+            if not _SHELL_DATE_RE.fullmatch(value):
+                raise _Fallback()
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise _Fallback()
+            due_date = value
+            i += 2
+        else:
+            words.append(args[i])
+            i += 1
+    # echo | xargs: junta as palavras com um espaco; aspas, barras e opcoes do echo ficam com o shell
+    text = " ".join(words)
+    if (len(text) > 4096 or any(ch in '\'"\\' or (ch.isspace() and ch not in ' \t\n') for ch in text)):
+        raise _Fallback()
+    words = text.split()
+    if not words or words[0].startswith('-'):
+        raise _Fallback()
+    content = " ".join(words)
+    
+    with _notes_file_lock(), _book().cache_lock:
+        notes = _shell_notes()
+        if notes is None:
+            raise _Fallback()
+        next_id = max([note.id for note in notes] + [_book().snapshot['max_dead']]) + 1
+        new_line = f"{next_id}. [ ] | Due: {due_date} | ({env['now']}) {content}"
+        notes.append(_parse_line(new_line, next_id))
+        _shell_commit(notes, [(None, notes[-1])], [new_line], {})
+    return 0, f"Note {next_id} added. Due: {due_date}\n"
+
+_DAEMON_READERS = ('list', 'search', 'stats')
+_DAEMON_COMMANDS = {
+    'list': _daemon_list,
+    'search': _daemon_search,
+    'stats': _daemon_stats,
+    'done': lambda args, env: _daemon_flip(args, "[ ]", "[X]", "Note {} marked as completed!\n"),
+    'undo': lambda args, env: _daemon_flip(args, "[X]", "[ ]", "↩️ Note {} returned to pending!\n"),
+    'add': _daemon_add,
+}
+
+def _daemon_request(data):
+    try:
+        fields = data.decode('utf-8').split('\0')
+    except UnicodeDecodeError:
+        raise _Fallback()
+    if len(fields) < 7 or fields[0] != DAEMON_PROTOCOL or fields[-1] != "":
+        raise _Fallback()
+    _, notes_file, locale_env, today, now, command, *args = fields[:-1]
+    if notes_file != NOTES_FILE or locale_env != _daemon['locale'] or command not in _DAEMON_COMMANDS:
+        raise _Fallback()
+    if command not in ('list', 'stats') and not args:
+        raise _Fallback()
+    env = {'today': today, 'now': now}
+    if command not in _DAEMON_READERS:
+        return _DAEMON_COMMANDS[command](args, env)
+    
+    # Leituras repetidas sem escrita no meio saem prontas
+    memo_key = (_book().storage.key(), today, command, tuple(args))
+    with _book().cache_lock:
+        reply = _daemon_replies.get(memo_key)
+        if reply is not None:
+            _daemon_replies.move_to_end(memo_key)
+            return reply
+    reply = _DAEMON_COMMANDS[command](args, env)
+    with _book().cache_lock:
+        _daemon_replies[memo_key] = reply
+        if len(_daemon_replies) > DAEMON_REPLY_CACHE_SIZE:
+            _daemon_replies.popitem(last=False)
+    return reply
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    timeout = DAEMON_TIMEOUT
+    
+    def handle(self):
+        try:
+            status, output = _daemon_request(self.rfile.read())
+            reply = f"{status}\n{output}"
+        except _Fallback:
+            reply = f"{DAEMON_FALLBACK}\n"
+        except Exception:
+            traceback.print_exc()
+            reply = f"{DAEMON_FALLBACK}\n"
+        self.wfile.write(reply.encode('utf-8'))
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def _daemon_main(argv):
+    parser = argparse.ArgumentParser(prog="clilog daemon",
+                                     description="Answer list/search/stats/done/undo/add for the clilog command from memory.")
+    parser.parse_args(argv)
+    path = daemon_socket_path()
+    if not path:
+        parser.error("XDG_RUNTIME_DIR is not set (or set CLILOG_SOCKET)")
+    
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(path)
+        except OSError:
+            # Sobra de um daemon que morreu
+            os.unlink(path)
+        else:
+            parser.error(f"already running on {path}")
+        finally:
+            probe.close()
+    
+    # O functions.sh so conhece o notes.log
+    if _book().storage.name != 'log':
+        set_storage('log')
+    # Mesma ordenacao (sort) e maiusculas/minusculas (grep -i) do shell que chama
+    for category in (locale.LC_COLLATE, locale.LC_CTYPE):
+        try:
+            locale.setlocale(category, "")
+        except locale.Error:
+            pass
+    _daemon['locale'] = _locale_env()
+    utf8 = locale.nl_langinfo(locale.CODESET) == "UTF-8"
+    _daemon['fold'] = str.lower if utf8 else (lambda s: s.translate(_ASCII_LOWER))
+    
+    _snapshot()
+    with _book().cache_lock:
+        try:
+            _shell_notes()
+        except _Fallback:
+            pass
+        _get_view('shell_stats')
+        _get_view('shell_due')
+    
+    old_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(path, _DaemonHandler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"🧠 Clilog daemon: {NOTES_FILE}")
+    print(f"🔌 Socket: {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+# --- SERVIDOR ---
+# Servidor WSGI proprio em vez do app.run (debug/reloader): pool fixo de threads por
+# processo, keep-alive HTTP/1.1 e, com --workers, pre-fork sobre o mesmo socket.
+# Os workers compartilham o notes.log pelo flock de notes.lock; cada um mantem o seu
+# cache, que se invalida sozinho porque a versao do arquivo muda a cada escrita.
+SERVE_DEFAULT_BIND = "0.0.0.0:5000"
+SERVE_DEFAULT_THREADS = 32
+SERVE_KEEPALIVE = 5
+# Os streams de /api/events ficam no _event_hub, fora do pool: o limite e so de sockets abertos
+SERVE_MAX_STREAMS = 512
+
+class _ServerHandler(simple_server.ServerHandler):
+    http_version = "1.1"
+    
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        # Sem Content-Length (streams, /api/events) a resposta termina fechando a conexao. Um 503
+        # tambem fecha: a conexao ociosa prenderia uma thread do pool ate o keep-alive expirar
+        if 'Content-Length' not in self.headers or self.status.startswith('503'):
+            self.headers['Connection'] = 'close'
+            self.request_handler.close_connection = True
+
+class _KeepAliveRequestHandler(simple_server.WSGIRequestHandler):
+    """HTTP/1.1 com keep-alive: o simple_server atende um unico request por conexao."""
+    protocol_version = "HTTP/1.1"
+    # Conexao ociosa fecha depois de SERVE_KEEPALIVE segundos
+    timeout = SERVE_KEEPALIVE
+    
+    def handle(self):
+        BaseHTTPRequestHandler.handle(self)
+    
+    def handle_one_request(self):
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (TimeoutError, ConnectionError):
+            # Conexao ociosa que expirou ou que o cliente derrubou (RST): nao e um erro do servidor
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > 65536:
+            self.send_error(414)
+            self.close_connection = True
+            return
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+        
+        environ = self.get_environ()
+        self.events = None
+        environ['clilog.detach_events'] = self._detach_events
+        length = environ.get('CONTENT_LENGTH', '')
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            body = self.rfile
+            self.close_connection = True
+        else:
+            body = LimitedStream(self.rfile, int(length) if length.isdigit() else 0)
+        handler = _ServerHandler(body, self.wfile, self.get_stderr(), environ,
+                                 multithread=True, multiprocess=self.server.multiprocess)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        if body is not self.rfile and not self.close_connection:
+            # O que o app nao leu do corpo nao pode virar o proximo request
+            body.exhaust()
+        self.wfile.flush()
+        if self.events is not None:
+            # O resto do stream e do _event_hub; a thread volta para o pool
+            self.server.detached.add(self.connection)
+            _event_hub.add(self.connection, *self.events)
+            self.close_connection = True
+    
+    def _detach_events(self, feed, version):
+        self.events = (feed, version)
+
+class PooledWSGIServer(simple_server.WSGIServer):
+    """Atende cada conexao num pool fixo de threads."""
+    multiprocess = False
+    
+    def __init__(self, host, port, wsgi_app, threads):
+        super().__init__((host, port), _KeepAliveRequestHandler)
+        self.set_app(wsgi_app)
+        # As threads so nascem no primeiro request, ou seja, ja dentro de cada worker
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="clilog-http")
+        # Conexoes entregues ao _event_hub: ele as fecha
+        self.detached = set()
+    
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request_thread, request, client_address)
+    
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if request in self.detached:
+                self.detached.discard(request)
+            else:
+                self.shutdown_request(request)
+
+def _parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    if not port.isdigit():
+        raise ValueError(f"invalid --bind '{bind}' (expected HOST:PORT)")
+    return host.strip('[]') or "0.0.0.0", int(port)
+
+def _warm_up():
+    """Parse e indices do caderno padrao antes do fork: os workers herdam tudo pronto (copy-on-write).
+    Os outros cadernos so sao lidos no primeiro acesso."""
+    os.makedirs(NOTES_DIR, exist_ok=True)
+    _snapshot()
+    with _book().cache_lock:
+        for name in _VIEW_TYPES:
+            _get_view(name)
+    # Tira os objetos ja carregados do gc, senao as coletas nos workers tocam todas as paginas
+    gc.freeze()
+
+def _serve_workers(server, workers):
+    children = set()
+    
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.add(pid)
+    
+    def stop(signum, frame):
+        raise SystemExit(0)
+    
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    try:
+        while True:
+            pid, _ = os.wait()
+            if pid in children:
+                # Worker morreu: sobe outro no lugar
+                children.discard(pid)
+                spawn()
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+def _db_main(argv):
+    parser = argparse.ArgumentParser(prog="clilog db", description="Copy notes between notes.log and the SQLite store.")
+    parser.add_argument("action", choices=("import", "export"), help="import: notes.log -> notes.db, export: notes.db -> notes.log")
+    parser.add_argument("--log", default=NOTES_FILE, help=f"plaintext log (default {NOTES_FILE})")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite database (default {DB_FILE})")
+    args = parser.parse_args(argv)
+    
+    storage = SqliteStorage(args.db)
+    # Mesmo lock das escritas do functions.sh e da web
+    with _notes_file_lock():
+        if args.action == "import":
+            count = storage.import_log(args.log)
+            print(f"Imported {count} notes from {args.log} into {args.db}")
+        else:
+            count = storage.export_log(args.log)
+            print(f"Exported {count} notes from {args.db} to {args.log}")
+
+def _export_main(argv):
+    parser = argparse.ArgumentParser(prog="clilog export", description="Export notes.log as json, ndjson, csv or markdown.")
+    parser.add_argument("output", help="file to write, or - for stdout")
+    parser.add_argument("format", nargs="?", default="md", choices=sorted(set(_EXPORTERS) | set(EXPORT_ALIASES)),
+                        help="output format (default md)")
+    parser.add_argument("--log", default=NOTES_FILE, help=f"plaintext log (default {NOTES_FILE})")
+    parser.add_argument("--archive", action="store_true", help=f"also export the archived notes in {ARCHIVE_DIR}")
+    args = parser.parse_args(argv)
+    
+    summary = ExportSummary()
+    notes = iter_log_notes(args.log)
+    if args.archive:
+        notes = itertools.chain(iter_archived_notes(), notes)
+    chunks = export_stream(notes, args.format, summary)
+    if args.output == "-":
+        report = sys.stderr
+        out = sys.stdout.buffer
+        for chunk in chunks:
+            out.write(chunk.encode('utf-8'))
+        out.flush()
+    else:
+        report = sys.stdout
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(chunks)
+    print(f"📁 Exported {summary.total} notes to {args.output} ({export_format(args.format)})", file=report)
+    print(f"📊 Stats: {summary.completed} completed, {summary.pending} pending", file=report)
+
+def _archive_main(argv):
+    parser = argparse.ArgumentParser(prog="clilog archive",
+                                     description="Move old completed notes out of notes.log into an archive segment.")
+    parser.add_argument("--days", type=int, default=int(os.environ.get("CLILOG_ARCHIVE_DAYS", ARCHIVE_DEFAULT_DAYS)),
+                        help=f"archive completed notes created more than DAYS ago (default $CLILOG_ARCHIVE_DAYS, else {ARCHIVE_DEFAULT_DAYS})")
+    parser.add_argument("--compress", action="store_true", help="gzip the new segment")
+    parser.add_argument("--list", action="store_true", help="only list the existing segments")
+    args = parser.parse_args(argv)
+    if args.days < 0:
+        parser.error("--days must not be negative")
+    
+    if args.list:
+        for path in _segment_paths():
+            header = read_segment_header(path)
+            print(f"{os.path.basename(path)}: {header['notes']} notes, ids {header['ids'][0]}-{header['ids'][1]}, "
+                  f"{header['from']} .. {header['to']}")
+        return
+    path, count = archive_notes(args.days, args.compress)
+    if path is None:
+        print(f"Nothing to archive: no completed notes older than {args.days} days.")
+    else:
+        print(f"📦 Archived {count} notes to {path}")
+
+def _books_main(argv):
+    parser = argparse.ArgumentParser(prog="clilog books", description=f"List the notebooks in {NOTES_DIR}, or search all of them.")
+    parser.add_argument("--search", metavar="QUERY", help="search every notebook (same syntax as the web search)")
+    parser.add_argument("--limit", type=int, default=100, help="maximum search results (default 100)")
+    args = parser.parse_args(argv)
+    
+    if args.search is not None:
+        result = search_books(args.search, max(0, args.limit))
+        for item in result['results']:
+            print(f"{item['book']}: {item['raw']}")
+        print(f"🔎 {result['total']} notes in {sum(1 for total in result['books'].values() if total)} notebooks")
+        return
+    books = books_summary()
+    if not books:
+        print(f"No notebooks in {NOTES_DIR}")
+    for book in books:
+        overdue = f", {book['overdue']} overdue" if book['overdue'] else ""
+        print(f"{'*' if book['default'] else ' '} {book['name']}: {book['total']} notes, {book['pending']} pending{overdue}")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["db"]:
+        return _db_main(argv[1:])
+    if argv[:1] == ["daemon"]:
+        return _daemon_main(argv[1:])
+    if argv[:1] == ["export"]:
+        return _export_main(argv[1:])
+    if argv[:1] == ["archive"]:
+        return _archive_main(argv[1:])
+    if argv[:1] == ["books"]:
+        return _books_main(argv[1:])
+    
+    parser = argparse.ArgumentParser(prog="clilog web", description="Clilog web interface.")
+    parser.add_argument("--storage", choices=sorted(STORAGE_BACKENDS), default=_books['storage'],
+                        help="where notes are stored: the plaintext notes.log or the indexed notes.db (default from $CLILOG_STORAGE, else log)")
+    parser.add_argument("--bind", default=SERVE_DEFAULT_BIND, help=f"HOST:PORT to listen on (default {SERVE_DEFAULT_BIND})")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes sharing the socket (default 1)")
+    parser.add_argument("--threads", type=int, default=SERVE_DEFAULT_THREADS,
+                        help=f"request threads per worker (default {SERVE_DEFAULT_THREADS})")
+    parser.add_argument("--max-streams", type=int, default=SERVE_MAX_STREAMS,
+                        help=f"open /api/events streams per worker before answering 503 (default {SERVE_MAX_STREAMS})")
+    parser.add_argument("--slow-ms", type=float, default=_instrumentation['slow_ms'],
+                        help="log requests slower than this to stderr, with their phases (default $CLILOG_SLOW_MS, off)")
+    parser.add_argument("--profile", action="store_true", default=_instrumentation['profile'],
+                        help=f"enable {PROFILE_PREFIX}<path> to run one request under cProfile (default $CLILOG_PROFILE=1)")
+    args = parser.parse_args(argv)
+    try:
+        host, port = _parse_bind(args.bind)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    if args.max_streams < 0:
+        parser.error("--max-streams must not be negative")
+    _event_streams['max'] = args.max_streams
+    _instrumentation.update(slow_ms=args.slow_ms, profile=args.profile)
+    
+    if args.storage != _books['storage']:
+        set_storage(args.storage)
+    _warm_up()
+    server = PooledWSGIServer(host, port, app, args.threads)
+    server.multiprocess = args.workers > 1
     print("🚀 Clilog Web v2.0 - Modern Interface")
-    print(f"📁 Notes: {NOTES_FILE}")
-    print("🌐 Access: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    print(f"📁 Notes: {_book().storage.path}")
+    print(f"🌐 Access: http://{'localhost' if host in ('0.0.0.0', '::') else host}:{server.server_port}")
+    print(f"⚙️  Workers: {args.workers} | Threads: {args.threads}", flush=True)
+    try:
+        if args.workers == 1:
+            server.serve_forever()
+        else:
+            _serve_workers(server, args.workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
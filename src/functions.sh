@@ -6,7 +6,15 @@ set -euo pipefail
 
 # --- CONFIGURATION VARIABLES (for better organization) ---
 CLILOG_DIR="$HOME/.config/clilog"
-CLILOG_LOG="$CLILOG_DIR/notes.log"
+# Caderno ativo (clilog --book <nome>); cada um tem o seu log e o seu lock
+CLILOG_BOOK="${CLILOG_BOOK:-notes}"
+CLILOG_LOG="$CLILOG_DIR/$CLILOG_BOOK.log"
+CLILOG_LOCK="$CLILOG_DIR/$CLILOG_BOOK.lock"
+CLILOG_WEB="${BASH_SOURCE[0]%/*}/clilog_web.py"
+# del so troca o marcador por "[D]" (tombstone); o arquivo e compactado em segundo plano quando
+# os tombstones passam de CLILOG_COMPACT_MIN e de 1/CLILOG_COMPACT_RATIO das linhas (mesmos limites da web)
+CLILOG_COMPACT_MIN=64
+CLILOG_COMPACT_RATIO=4
 
 # --- SETUP FUNCTIONS ---
 
@@ -14,6 +22,19 @@ _clilog_setup() {
     mkdir -p "$CLILOG_DIR"
 }
 
+# Mesmo lock usado pelo clilog web (fcntl.flock em notes.lock), para as escritas nao se atropelarem.
+_clilog_lock() {
+    command -v flock &> /dev/null || return 0
+    exec 9>>"$CLILOG_LOCK"
+    flock 9
+}
+
+_clilog_unlock() {
+    command -v flock &> /dev/null || return 0
+    flock -u 9
+    exec 9>&-
+}
+
 _clilog_cleanup() {
     printf "\n=== \033[34mCTRL ^C pressed! Exiting...\033[0m\n"
     exit 0
@@ -54,16 +75,23 @@ _clilog_add_note() {
     
     local new_line="[ ] | Due: $due_date | ($timestamp) $note_content"
     
-    local next_id=$(wc -l < "$CLILOG_LOG" | awk '{print $1 + 1}')
+    _clilog_lock
+    # Maior ID ja usado + 1, tombstones incluidos: um ID apagado nunca volta
+    local next_id=1
+    if [[ -f "$CLILOG_LOG" ]]; then
+        next_id=$(awk '/[^ \t\r]/ { n = /^[ \t]*[0-9]+\.[ \t]/ ? $1 + 0 : NR; if (n > max) max = n } END { print max + 1 }' "$CLILOG_LOG")
+    fi
     
     echo "$next_id. $new_line" >> "$CLILOG_LOG"
+    _clilog_unlock
     echo "Note $next_id added. Due: $due_date"
 }
 
 _clilog_show_help() {
     printf "\n\033[1;36mClilog - CLI Task Manager \033[0m\n"
     printf "\033[90mVersion:\033[0m 0.3\n\n"
-    printf "\033[1mUSAGE:\033[0m clilog <command> [arguments]\n\n"
+    printf "\033[1mUSAGE:\033[0m clilog [--book NAME] <command> [arguments]\n"
+    printf "       --book NAME uses the notebook ~/.config/clilog/NAME.log instead of notes.log.\n\n"
 
     printf "\033[1mCOMMANDS:\033[0m\n"
     printf "  \033[32madd [text]\033[0m       - Adds a new note/task.\n"
@@ -80,14 +108,19 @@ _clilog_show_help() {
     printf "  \033[32mtag remove [id] [tag]\033[0m       - Remove a tag from a note.\n"
     printf "  \033[32mtag move [id] [old_tag] [new_tag]\033[0m    - Rename/Move a tag on a note.\n"
     printf "  \033[32minteractive \033[0m      - Enter the TUI mode of clilog.\n"
-    printf "  \033[32mexport [file] [format]\033[0m - Export notes to file (markdown, json, csv).\n"
-    printf "  \033[32mweb\033[0m -  Starts the new clilog web mode (made with python).\n"
+    printf "  \033[32mexport [file] [format] [--archive]\033[0m - Export notes to file, or - for stdout (markdown, json, csv, ndjson).\n"
+    printf "  \033[32mweb [--bind host:port] [--workers N] [--threads M] [--storage log|sqlite]\033[0m -  Starts the new clilog web mode (made with python).\n"
+    printf "  \033[32mdb import|export\033[0m - Copy notes from notes.log into notes.db (SQLite) or back.\n"
+    printf "  \033[32marchive [--days N] [--compress] [--list]\033[0m - Move completed notes older than N days (default 90) out of notes.log.\n"
+    printf "  \033[32mbooks [--search QUERY]\033[0m - List the notebooks with their totals, or search all of them.\n"
     printf "  \033[32mstats\033[0m - Show Clilog Stats.\n"
+    printf "  \033[32mdaemon\033[0m - Keeps notes in memory so list/search/stats/done/undo/add answer faster.\n"
     printf "  \033[32mhelp\033[0m            - Shows this help message.\n\n"
 
     printf "\033[1mEXAMPLES:\033[0m\n"
     printf "  clilog add \"Learn C\" \n"
     printf "  clilog done 2\n"
+    printf "  clilog --book work add \"Review PR\"\n"
     printf "  clilog search \"Jujutsu\"\n\n"
 }
 
@@ -95,7 +128,10 @@ _clilog_list_notes() {
 
     [[ ! -f "$CLILOG_LOG" ]] && { echo "No notes found!"; return; }
     [[ ! -s "$CLILOG_LOG" ]] && { echo "No notes found!"; return; }
-    awk '{
+    awk '
+    /^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ { next }
+    {
+        shown++
         if ($2 == "[X]") {
             # Green Color (Completed tasks)
             printf "\033[32m%s\033[0m\n", $0
@@ -103,45 +139,91 @@ _clilog_list_notes() {
             # Yellow Color (Pending tasks)
             printf "\033[33m%s\033[0m\n", $0
         }
-    }' "$CLILOG_LOG"
+    }
+    END { if (!shown) print "No notes found!" }' "$CLILOG_LOG"
+}
+
+# Linha do note com esse ID: o "N." do inicio da linha, ou o numero da linha nas linhas antigas
+# sem ID. Como o del deixa um tombstone no lugar, os IDs nao mudam; tombstones nao contam.
+_clilog_line_of() {
+    awk -v id="$1" '
+        /^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ || !/[^ \t\r]/ { next }
+        (/^[ \t]*[0-9]+\.[ \t]/ ? $1 + 0 : NR) == id { print NR; exit }
+    ' "$CLILOG_LOG"
+}
+
+# mtime do notes.log em ns (sem o ponto), para _clilog_bump_mtime
+_clilog_mtime_ns() {
+    local mtime
+    mtime=$(stat -c '%.9Y' "$CLILOG_LOG" 2>/dev/null) || return 1
+    echo "${mtime/./}"
+}
+
+# Um patch no lugar nao muda o tamanho e, no mesmo tick do relogio, nem o mtime: a web, que
+# reconhece a versao do arquivo por inode, tamanho e mtime, nao veria a escrita. Se o mtime nao
+# andou desde $1 (de _clilog_mtime_ns), avanca 1 ns, como o clilog_web.py faz nos patches dele.
+_clilog_bump_mtime() {
+    local before="$1" now
+    [[ -z "$before" ]] && return 0
+    now=$(_clilog_mtime_ns) || return 0
+    (( now > before )) && return 0
+    before=$(( before + 1 ))
+    touch -m -d "@${before:0:-9}.${before: -9}" "$CLILOG_LOG"
+}
+
+# "[ ]" e "[X]" tem o mesmo tamanho: troca os 3 bytes no lugar em vez de reescrever o arquivo.
+# Sai com 1 se nao existe note com esse ID.
+_clilog_flip_marker() {
+    local id="$1"
+    local from="$2"
+    local to="$3"
+    local offset mtime
+
+    # Offset em bytes da primeira ocorrencia de $from na linha do note $id (mesma logica do antigo sub())
+    offset=$(LC_ALL=C awk -v id="$id" -v m="$from" '
+        !/^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ && /[^ \t\r]/ && (/^[ \t]*[0-9]+\.[ \t]/ ? $1 + 0 : NR) == id {
+            i = index($0, m); print (i ? off + i - 1 : -1); exit
+        }
+        { off += length($0) + 1 }
+    ' "$CLILOG_LOG")
+
+    [[ -z "$offset" ]] && return 1
+    (( offset < 0 )) && return 0
+    mtime=$(_clilog_mtime_ns)
+    printf '%s' "$to" | dd of="$CLILOG_LOG" bs=1 seek="$offset" conv=notrunc,fsync status=none
+    _clilog_bump_mtime "$mtime"
 }
 
 _clilog_mark_done() {
     local id="$1"
-    local file
-    file="$CLILOG_LOG"
-    local line
-    line=$(wc -l < "$file")
     [[ ! -f "$CLILOG_LOG" ]] && { echo "No notes found!"; return 1; }
     [[ -z "$id" ]] && { echo "ID not specified, exiting..."; return 1; }
-    if (( id > line )); then
-	    echo "Error: The id you specified is greater than the number of notes you have, exiting..."
+    [[ ! "$id" =~ ^[0-9]+$ ]] && { echo "Note ID must be a number, exiting..."; return 1; }
+
+    _clilog_lock
+    if ! _clilog_flip_marker "$id" "[ ]" "[X]"; then
+	    _clilog_unlock
+	    echo "Error: Note $id not found, exiting..."
 	    return 1
     fi
-
-    awk -v id="$id" 'NR == id { sub(/\[ \]/, "[X]") } { print }' "$CLILOG_LOG" > "$CLILOG_LOG.tmp"
-
-    mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+    _clilog_unlock
 
     echo "Note $id marked as completed!"
 }
 
 _clilog_undo() {
     local id="$1" 
-    local file
-    file="$CLILOG_LOG"
-    local line
-    line=$(wc -l < "$file")
     [[ ! -f "$CLILOG_LOG" ]] && { echo "No notes found!"; return 1; }
     [[ -z "$id" ]] && { echo "ID not specified, exiting..."; return 1; }
-    if (( id > line )); then
-	    echo "Error: The id you specified is greater than the number of notes you have, exiting..."
+    [[ ! "$id" =~ ^[0-9]+$ ]] && { echo "Note ID must be a number, exiting..."; return 1; }
+
+    _clilog_lock
+    if ! _clilog_flip_marker "$id" "[X]" "[ ]"; then
+	    _clilog_unlock
+	    echo "Error: Note $id not found, exiting..."
 	    return 1
     fi
-
-    awk -v id="$id" 'NR == id { sub(/\[X\]/, "[ ]") } { print }' "$CLILOG_LOG" > "$CLILOG_LOG.tmp"
-
-    mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+    _clilog_unlock
 
     echo "↩️ Note $id returned to pending!"
 }
@@ -156,7 +238,9 @@ _clilog_clear_notes() {
     case $choice in
         y|Y)
             printf "Ok! clearing...\n"
+            _clilog_lock
             > "$CLILOG_LOG" 
+            _clilog_unlock
             ;;
         n|N)
             printf "Ok! Exiting...\n"
@@ -172,7 +256,7 @@ _clilog_search_notes() {
     [[ ! -f "$file" ]] && { echo "No notes found."; return; }
 
     printf "Resultados da busca por '%s':\n" "$keyword"
-    grep -i "$keyword" "$file" | awk -v keyword="$keyword" '{
+    grep -vE '^[[:blank:]]*([0-9]+\.[[:blank:]]+)?\[D\]' "$file" | grep -i "$keyword" | awk -v keyword="$keyword" '{
         
         line_content = $0
         
@@ -185,7 +269,7 @@ _clilog_search_notes() {
         }
     }'
     
-    if [ ${PIPESTATUS[0]} -ne 0 ] && [ ${PIPESTATUS[1]} -ne 0 ]; then
+    if [ ${PIPESTATUS[1]} -ne 0 ] && [ ${PIPESTATUS[2]} -ne 0 ]; then
         echo "No notes found for the search."
     fi
 }
@@ -201,30 +285,47 @@ _clilog_tag_notes() {
     [[ ! "$note_id" =~ ^[0-9]+$ ]] && { echo "Note ID must be a number, exiting..."; return 1; }
 
     local tmpfile
+    local line
     tmpfile=$(mktemp)
 
+    case "$action" in
+        add|remove|move)
+            [[ "$action" == "move" && -z "$new_tag" ]] && { echo "New tag not specified for move, exiting..."; rm -f "$tmpfile"; return 1; }
+            _clilog_lock
+            line=$(_clilog_line_of "$note_id")
+            if [[ -z "$line" ]]; then
+                _clilog_unlock
+                rm -f "$tmpfile"
+                echo "Error: Note $note_id not found, exiting..."
+                return 1
+            fi
+            ;;
+    esac
+
     case "$action" in
         add)
-            awk -v id="$note_id" -v tag="$tag" 'NR==id {
+            awk -v id="$line" -v tag="$tag" 'NR==id {
                 if($0 !~ "#"tag) $0=$0" #"tag
             }1' "$CLILOG_LOG" > "$tmpfile"
             mv "$tmpfile" "$CLILOG_LOG"
+            _clilog_unlock
             echo "Tag #$tag added to note $note_id."
             ;;
         remove)
-            awk -v id="$note_id" -v tag="$tag" 'NR==id {
+            awk -v id="$line" -v tag="$tag" 'NR==id {
                 gsub("#"tag,"")
             }1' "$CLILOG_LOG" > "$tmpfile"
             mv "$tmpfile" "$CLILOG_LOG"
+            _clilog_unlock
             echo "Tag #$tag removed from note $note_id."
             ;;
         move)
-            [[ -z "$new_tag" ]] && { echo "New tag not specified for move, exiting..."; return 1; }
-            awk -v id="$note_id" -v old="$tag" -v new="$new_tag" 'NR==id {
+            awk -v id="$line" -v old="$tag" -v new="$new_tag" 'NR==id {
                 gsub("#"old,"");
                 if($0 !~ "#"new) $0=$0" #"new
             }1' "$CLILOG_LOG" > "$tmpfile"
             mv "$tmpfile" "$CLILOG_LOG"
+            _clilog_unlock
             echo "Tag #$tag moved to #$new_tag in note $note_id."
             ;;
         *)
@@ -239,12 +340,14 @@ _clilog_tag_notes() {
 _clilog_edit_notes() {
 	local file="$CLILOG_LOG"
 	local line
-	line=$(wc -l < "$file")
 	local id="$1"
 	[[ ! -f "$CLILOG_LOG" ]] && { echo "No notes found!"; return 1; }
 	[[ -z "$id" ]] && { echo "Id not specified, exiting..."; return 1; }
-	if (( id > line )); then
-		echo "Error: The id you specified is greater than the number of notes you have, exiting..."
+	[[ ! "$id" =~ ^[0-9]+$ ]] && { echo "Note ID must be a number, exiting..."; return 1; }
+	# O editor abre na linha do note, que pode nao ser o ID (tombstones e IDs antigos ficam no arquivo)
+	line=$(_clilog_line_of "$id")
+	if [[ -z "$line" ]]; then
+		echo "Error: Note $id not found, exiting..."
 		return 1
 	fi
 	echo "Which editor would you like to use?"
@@ -265,7 +368,7 @@ EOF
 	case $choice in
 		1) 
 			if command -v vim &> /dev/null; then
-				vim +"$id" "$file"
+				vim +"$line" "$file"
 			else
 				printf "\033[31mError: VIM is not installed, exiting...\033[0m\n"
 				exit 1
@@ -273,7 +376,7 @@ EOF
 			;;
 		2) 
 			if command -v nano &> /dev/null; then
-				nano +"$id" "$file"
+				nano +"$line" "$file"
 			else
 				printf "\033[31mError: Nano is not installed, exiting...\033[0m\n"
 				exit 1
@@ -281,7 +384,7 @@ EOF
 			;;
 		3) 
 			if command -v nvim &> /dev/null; then
-				nvim +"$id" "$file"
+				nvim +"$line" "$file"
 			else
 				printf "\033[31mError: nvim is not installed, exiting...\033[0m\n"
 				exit 1
@@ -289,7 +392,7 @@ EOF
 			;;
 		4) 
 			if command -v emacs &> /dev/null; then
-				emacs +"$id" "$file"
+				emacs +"$line" "$file"
 			else
 				printf "\033[31mError: Emacs is not installed, exiting...\033[0m\n"
 				exit 1
@@ -297,7 +400,7 @@ EOF
 			;;
 		5) 
 			if command -v code &> /dev/null; then	
-				code --goto "$file:$id"
+				code --goto "$file:$line"
 			else
 				printf "\033[31mError: Vscode is not installed, exiting...\033[0m\n"
 				exit 1
@@ -305,7 +408,7 @@ EOF
 			;;
         6)
             if command -v &> /dev/null; then
-                micro +"$id" "$file"
+                micro +"$line" "$file"
             else
                 printf "\033[31mError: Micro is not installed, exiting.\033[0m\n"
                 exit 1
@@ -322,15 +425,15 @@ EOF
                 exit 1
             else
                 case "$min_ed" in
-                    "ed") echo "${$id}p" | ed -s "$file" ;;
-                    "gedit") gedir +"${id}" "$file" ;;
-                    "kate") kate -l "$id" "$file" ;;
-                    "geany") geany "+${id}" "$file" ;;
-                    "mousepad") --line "$id" "$file" ;;
-                    "pluma") pluma "+${id}" "$file" ;;
-                    "kwrite") kwrite -l "$id" "$file" ;;
-                    "codium") codium -g "${file}:${id}" ;;
-                    "atom") atom "${file}:${id}" ;;
+                    "ed") echo "${line}p" | ed -s "$file" ;;
+                    "gedit") gedir +"${line}" "$file" ;;
+                    "kate") kate -l "$line" "$file" ;;
+                    "geany") geany "+${line}" "$file" ;;
+                    "mousepad") --line "$line" "$file" ;;
+                    "pluma") pluma "+${line}" "$file" ;;
+                    "kwrite") kwrite -l "$line" "$file" ;;
+                    "codium") codium -g "${file}:${line}" ;;
+                    "atom") atom "${file}:${line}" ;;
                     *)
                         "${min_ed}" "${file}" ;;
                 esac
@@ -340,22 +443,65 @@ EOF
 
 _clilog_del_line() {
     local id="$1"
-    local file
-    file="$CLILOG_LOG"
-    local total
-    total=$(wc -l < "$file")
-    if [[ "$id" -gt "$total" ]]; then
-	    printf "\033[31mError: The id that you specified is greater than the number of notes that you have!\033[0m\n"
-	    exit 1
-    fi
+    local offset dead total mtime
     [[ ! -f "$CLILOG_LOG" ]] && { echo "No notes found!"; return 1; }
     [[ -z "$id" ]] && { echo "ID not specified, exiting..."; return 1; }
+    [[ ! "$id" =~ ^[0-9]+$ ]] && { echo "Note ID must be a number, exiting..."; return 1; }
+
+    _clilog_lock
+    # Uma passada: offset do marcador do note (ou "L<linha>" se ele nao tem marcador, "-" se nao
+    # existe), quantos tombstones e quantas linhas o arquivo tem
+    read -r offset dead total < <(LC_ALL=C awk -v id="$id" '
+        /^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ { dead++; off += length($0) + 1; next }
+        !found && /[^ \t\r]/ && (/^[ \t]*[0-9]+\.[ \t]/ ? $1 + 0 : NR) == id {
+            found = 1
+            pos = match($0, /^[ \t]*([0-9]+\.[ \t]+)?\[[ X]\]/) ? off + RLENGTH - 3 : "L" NR
+        }
+        { off += length($0) + 1 }
+        END { print (found ? pos : "-"), dead + 0, NR }
+    ' "$CLILOG_LOG")
 
-    awk -v id="$id" 'NR != id { print }' "$CLILOG_LOG" > "$CLILOG_LOG.tmp" && \
-    mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+    if [[ "$offset" == "-" ]]; then
+        _clilog_unlock
+        printf "\033[31mError: Note %s not found!\033[0m\n" "$id"
+        return 1
+    fi
+    # Tombstone: "[ ]"/"[X]" vira "[D]" no lugar, sem reescrever o arquivo nem mudar outros IDs
+    if [[ "$offset" == L* ]]; then
+        awk -v n="${offset#L}" -v id="$id" 'NR == n { $0 = id ". [D]" } 1' "$CLILOG_LOG" > "$CLILOG_LOG.tmp" && \
+            mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+    else
+        mtime=$(_clilog_mtime_ns)
+        printf '[D]' | dd of="$CLILOG_LOG" bs=1 seek="$offset" conv=notrunc,fsync status=none
+        _clilog_bump_mtime "$mtime"
+    fi
+    _clilog_unlock
     echo "Note $id deleted!"
-    awk '{ sub(/^[0-9]+\./, ++i "."); print }' "$CLILOG_LOG" > "$CLILOG_LOG.tmp" && \
-	    mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+
+    dead=$(( dead + 1 ))
+    if (( dead >= CLILOG_COMPACT_MIN && dead * CLILOG_COMPACT_RATIO >= total )); then
+        # Em segundo plano: quem chamou o del nao espera a reescrita
+        _clilog_compact < /dev/null &> /dev/null &
+    fi
+}
+
+# Reescreve o notes.log sem os tombstones, com o mesmo lock e o mesmo "tmp && mv" das outras
+# escritas. Os IDs nao mudam: linhas antigas sem "N. " ganham o numero da linha como ID, e fica
+# um tombstone "N. [D]" com o maior ID apagado, para o proximo add nao reaproveitar esse numero.
+_clilog_compact() {
+    _clilog_lock
+    awk '
+        NR == FNR {
+            n = /^[ \t]*[0-9]+\.[ \t]/ ? $1 + 0 : FNR
+            if (/^[ \t]*([0-9]+\.[ \t]+)?\[D\]/) { if (n > dead) dead = n }
+            else if (/[^ \t\r]/ && n > live) live = n
+            next
+        }
+        /^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ || !/[^ \t\r]/ { next }
+        { if (!/^[ \t]*[0-9]+\.[ \t]/) $0 = FNR ". " $0; print }
+        END { if (dead > live) print dead ". [D]" }
+    ' "$CLILOG_LOG" "$CLILOG_LOG" > "$CLILOG_LOG.tmp" && mv "$CLILOG_LOG.tmp" "$CLILOG_LOG"
+    _clilog_unlock
 }
 
 
@@ -381,184 +527,17 @@ _clilog_export() {
     [[ ! -s "$notes_file" ]] && { echo "No notes to export!"; return 1; }
 
     case "${format:-markdown}" in
-        markdown|md)
-            _clilog_export_md "$output_file"
-            ;;
-        json)
-            _clilog_export_json "$output_file"
-            ;;
-        csv)
-            _clilog_export_csv "$output_file"
+        markdown|md|json|csv|ndjson)
+            # Motor de exportacao do clilog_web.py: uma passada, memoria constante
+            python3 "$CLILOG_WEB" export "$output_file" "${format:-markdown}" "${@:3}"
             ;;
         *)
-            echo "Error: Format '$format' not supported. Use: markdown, json, csv"
+            echo "Error: Format '$format' not supported. Use: markdown, json, csv, ndjson"
             return 1
             ;;
     esac
 }
 
-_clilog_export_json() {
-    local output_file="$1"
-    local notes_file="$CLILOG_LOG"
-    
-    echo "[" > "$output_file"
-    
-    awk '
-    function escape_string(str) {
-        gsub(/"/, "\\\"", str)
-        gsub(/\//, "\\/", str)
-        gsub(/\t/, "\\t", str)
-        gsub(/\n/, "\\n", str)
-        gsub(/\r/, "\\r", str)
-        return str
-    }
-    
-    {
-        status = ($1 == "[X]") ? "completed" : "pending"
-        
-        gsub(/^\[X\] |^\[ \] /, "")
-        
-        # Extrai timestamp (formato: (YYYY-MM-DD HH:MM))
-        timestamp = ""
-        if (match($0, /\([0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}\)/)) {
-            timestamp = substr($0, RSTART+1, RLENGTH-2)
-            # Remove o timestamp do conteúdo principal
-            $0 = substr($0, 1, RSTART-1) substr($0, RSTART+RLENGTH)
-        }
-        
-        tag_count = 0
-        delete tags
-        original_line = $0
-        while (match(original_line, /#([a-zA-Z0-9_]+)/)) {
-            tag = substr(original_line, RSTART+1, RLENGTH-1)
-            tags[++tag_count] = tag
-            # Remove esta tag da string para a próxima iteração
-            original_line = substr(original_line, 1, RSTART-1) substr(original_line, RSTART+RLENGTH)
-        }
-        
-        content = $0
-        gsub(/\s+$/, "", content)          
-        printf "  {\n"
-        printf "    \"id\": %d,\n", NR
-        printf "    \"status\": \"%s\",\n", status
-        printf "    \"timestamp\": \"%s\",\n", timestamp
-        printf "    \"content\": \"%s\",\n", escape_string(content)
-        printf "    \"tags\": ["
-        for (i = 1; i <= tag_count; i++) {
-            if (i > 1) printf ", "
-            printf "\"%s\"", tags[i]
-        }
-        printf "]\n"
-        printf "  }%s\n", (NR == total) ? "" : ","
-    }
-    ' total=$(wc -l < "$notes_file") "$notes_file" >> "$output_file"
-    
-    echo "]" >> "$output_file"
-    
-    echo "📁 Exported to JSON: $output_file"
-    echo "📊 Total notes: $(wc -l < "$notes_file")"
-}
-
-_clilog_export_md() {
-    local output_file="${1:-clilog_export.md}"
-    local notes_file="$CLILOG_LOG"
-
-    [[ ! -f "$notes_file" ]] && { echo "No notes found!"; return 1; }
-    [[ ! -s "$notes_file" ]] && { echo "No notes to export!"; return 1; }
-
-    local total_notes completed pending
-    total_notes=$(wc -l < "$notes_file")
-    completed=$(grep -c "^\[X\]" "$notes_file" || true)
-    pending=$((total_notes - completed))
-
-    {
-        echo "# 🧠 Clilog Tasks Export"
-        echo ""
-        echo "**Export Date:** $(date '+%Y-%m-%d %H:%M')"
-        echo "**Total Tasks:** $total_notes"
-        echo "**Completed:** $completed • **Pending:** $pending"
-        echo "**Completion:** $((total_notes > 0 ? (completed * 100) / total_notes : 0))%"
-        echo ""
-        
-        if (( completed > 0 )); then
-            echo "## ✅ Completed Tasks ($completed)"
-            grep "^\[X\]" "$notes_file" | while read -r line; do
-                local processed_line=$(echo "$line" | sed '
-                    s/^\[X\]/(✅)/;
-                    s/#\([a-zA-Z0-9_]*\)/`#\1`/g;
-                    s/(\([0-9]\{4\}-[0-9]\{2\}-[0-9]\{2\} [0-9]\{2\}:[0-9]\{2\}\))/**\1**/
-                ')
-                echo "- $processed_line"
-            done
-            echo ""
-        fi
-
-        if (( pending > 0 )); then
-            echo "## 🕐 Pending Tasks ($pending)"
-            grep "^\[ \]" "$notes_file" | while read -r line; do
-                local processed_line=$(echo "$line" | sed '
-                    s/^\[ \]/(⏳)/;
-                    s/#\([a-zA-Z0-9_]*\)/`#\1`/g;
-                    s/(\([0-9]\{4\}-[0-9]\{2\}-[0-9]\{2\} [0-9]\{2\}:[0-9]\{2\}\))/**\1**/
-                ')
-                echo "- $processed_line"
-            done
-            echo ""
-        fi
-
-        echo "## 🏷️ Tags Summary"
-        local tags
-        tags=$(grep -o '#[a-zA-Z0-9_]*' "$notes_file" | sort | uniq -c | sort -nr | head -10)
-        if [[ -n "$tags" ]]; then
-            echo "$tags" | while read -r count tag; do
-                echo "- **$tag**: $count tasks"
-            done
-        else
-            echo "No tags found."
-        fi
-        
-        echo ""
-        echo "---"
-        echo "*Generated by [clilog](https://github.com/simeulinuxkaliaiwr/clilog)*"
-
-    } > "$output_file"
-
-    echo "Exported $total_notes tasks to $output_file"
-    echo "Stats: $completed completed, $pending pending"
-}
-
-_clilog_export_csv() {
-    local output_file="$1"
-    local notes_file="$CLILOG_LOG"
-    
-    echo "id,status,timestamp,content,tags" > "$output_file"
-    awk '
-    {
-        status = ($1 == "[X]") ? "completed" : "pending"
-        gsub(/^\[X\] |^\[ \] /, "")
-        
-        # Extrai timestamp
-        if (match($0, /\([0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}\)/)) {
-            timestamp = substr($0, RSTART+1, RLENGTH-2)
-            $0 = substr($0, 1, RSTART-1) substr($0, RSTART+RLENGTH)
-        }
-        
-        # Extrai tags
-        tags = ""
-        while (match($0, /#([a-zA-Z0-9_]+)/)) {
-            if (tags != "") tags = tags ";"
-            tags = tags substr($0, RSTART+1, RLENGTH-1)
-            $0 = substr($0, 1, RSTART-1) substr($0, RSTART+RLENGTH)
-        }
-        
-        gsub(/"/, "\"\"", $0)
-        printf "%d,%s,\"%s\",\"%s\",\"%s\"\n", NR, status, timestamp, $0, tags
-    }
-    ' "$notes_file" >> "$output_file"
-    
-    echo "📊 Exported to CSV: $output_file"
-}
-
 _clilog_show_version() {
     local version="0.3"
     printf "\033[34mClilog | Version: $version\033[0m\n"
@@ -613,23 +592,35 @@ _clilog_list_due_notes() {
 }
 
 function _clilog_stats {
-    local total
-    local completed
+    local total=0
+    local completed=0
+    local tags=""
     local pending
     local percent
 
     if [[ -r "$CLILOG_LOG" ]]; then
-        total=$(grep -c '^.*' "$CLILOG_LOG" 2>/dev/null || echo 0)
-        completed=$(grep -c "^\[X\]" "$CLILOG_LOG" 2>/dev/null || echo 0)
-    else
-        total=0
-        completed=0
+        # Uma passada so: "total concluidos" na primeira linha, depois uma linha por tag
+        # no formato do `uniq -c`, para o sort -nr desempatar igual ao pipeline antigo
+        {
+            read -r total completed
+            tags=$(sort -nr | head -3)
+        } < <(awk '
+            /^[ \t]*([0-9]+\.[ \t]+)?\[D\]/ { dead++; next }
+            /^([0-9]+\. )?\[X\]/ { done++ }
+            {
+                line = $0
+                while (match(line, /#[a-zA-Z0-9_]*/)) {
+                    count[substr(line, RSTART, RLENGTH)]++
+                    line = substr(line, RSTART + RLENGTH)
+                }
+            }
+            END {
+                print NR - dead, done + 0
+                for (tag in count) printf "%7d %s\n", count[tag], tag
+            }
+        ' "$CLILOG_LOG")
     fi
 
-    total=$(echo "$total" | tr -d '[:space:]')
-    completed=$(echo "$completed" | tr -d '[:space:]')
-
-
     pending=$(( total - completed ))
 
     percent=0
@@ -643,7 +634,9 @@ function _clilog_stats {
     echo "   Pending: $pending"
 
     echo "   Most used tags:"
-    grep -o '#[a-zA-Z0-9_]*' "$CLILOG_LOG" 2>/dev/null | sort | uniq -c | sort -nr | head -3 | while read count tag; do
-        echo "     $tag: $count"
-    done
+    if [[ -n "$tags" ]]; then
+        while read -r count tag; do
+            echo "     $tag: $count"
+        done <<< "$tags"
+    fi
 }
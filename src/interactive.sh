@@ -100,12 +100,11 @@ _clilog_tui_del_note() {
         return 1
     fi
 
-    local line
-    line=$(wc -l <"$file")
-    if ((id > line)); then
-        dialog --msgbox "Error: The ID you specified is greater then the number of notes you have" 15 60 2>&1 >/dev/tty
+    local result
+    if ! result=$(_clilog_del_line "$id" 2>&1); then
+        dialog --msgbox "$(sed 's/\x1B\[[0-9;]*[JKmsu]//g' <<<"$result")" 15 60 2>&1 >/dev/tty
+        return 1
     fi
-    _clilog_del_line "$id"
     dialog --msgbox "Note deleted successfully!" 8 50 2>&1 >/dev/tty
 }
 
@@ -152,7 +151,6 @@ _clilog_tui_clear_note() {
 _clilog_tui_edit_note() {
     local file="$CLILOG_LOG"
     local line
-    line=$(wc -l <"$file")
     exec 3>&1
     local id=$(dialog --inputbox "Enter the ID of the note to edit:" 10 60 2>&1 1>&3)
     exitcode=$?
@@ -162,8 +160,11 @@ _clilog_tui_edit_note() {
         dialog --msgbox "Canceled or empty input." 8 50 2>&1 >/dev/tty
         return 1
     }
-    if ((id > line)); then
-        dialog --msgbox "Error: The ID you specified is greater than the number of notes you have"
+    # O ID nao e o numero da linha: o editor abre na linha do note
+    line=$(_clilog_line_of "$id" 2>/dev/null || true)
+    if [[ -z "$line" ]]; then
+        dialog --msgbox "Error: Note $id not found" 8 50 2>&1 >/dev/tty
+        return 1
     fi
     local editor=$(dialog --clear --menu "Which editor would you like to use?" 15 60 9 \
         1 "Vim" \
@@ -175,35 +176,35 @@ _clilog_tui_edit_note() {
     case $editor in
     1)
         if command -v vim &>/dev/null; then
-            vim +"$id" "$file"
+            vim +"$line" "$file"
         else
             dialog --msgbox "Error: vim is not installed." 8 50 2>&1 >/dev/tty
         fi
         ;;
     2)
         if command -v nano &>/dev/null; then
-            nano +"$id" "$file"
+            nano +"$line" "$file"
         else
             dialog --msgbox "Error: nano is not installed." 8 50 2>&1 >/dev/tty
         fi
         ;;
     3)
         if command -v nvim &>/dev/null; then
-            nvim +"$id" "$file"
+            nvim +"$line" "$file"
         else
             dialog --msgbox "Error: nvim is not installed." 8 50 2>&1 >/dev/tty
         fi
         ;;
     4)
         if command -v emacs &>/dev/null; then
-            emacs +"$id" "$file"
+            emacs +"$line" "$file"
         else
             dialog --msgbox "Error: Emacs is not installed." 8 50 2>&1 >/dev/tty
         fi
         ;;
     5)
         if command -v code &>/dev/null; then
-            code --goto "$file:$id"
+            code --goto "$file:$line"
         else
             dialog --msgbox "Error: Vscode is not installed." 8 50 2>&1 >/dev/tty
         fi
@@ -238,23 +239,28 @@ _clilog_tui_export_notes() {
         return
     }
 
-    format=$(dialog --backtitle "CLilog Interactive TUI Mode" --menu "Choose a format:" 15 60 3 \
+    format=$(dialog --backtitle "CLilog Interactive TUI Mode" --menu "Choose a format:" 15 60 4 \
         1 "Markdown (.md)" \
         2 "Json (.json)" \
         3 "Csv (.csv)" \
+        4 "Ndjson (.ndjson)" \
         2>&1 >/dev/tty)
 
     case $format in
     1)
-        _clilog_export_md "$file"
+        _clilog_export "$file" markdown
         result="$?"
         ;;
     2)
-        _clilog_export_json "$file"
+        _clilog_export "$file" json
         result="$?"
         ;;
     3)
-        _clilog_export_csv "$file"
+        _clilog_export "$file" csv
+        result="$?"
+        ;;
+    4)
+        _clilog_export "$file" ndjson
         result="$?"
         ;;
     esac
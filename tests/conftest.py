@@ -0,0 +1,120 @@
+"""
+CONFTEST.PY
+"""
+
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+from flask.testing import FlaskClient
+
+# O clilog_web.py calcula NOTES_DIR a partir do $HOME ao ser importado: os testes rodam
+# num $HOME descartavel, e cada teste usa um caderno proprio dentro dele
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOME = tempfile.mkdtemp(prefix="clilog-tests-")
+os.environ["HOME"] = HOME
+for name in ("CLILOG_BOOK", "CLILOG_STORAGE", "CLILOG_SOCKET", "CLILOG_SLOW_MS", "CLILOG_PROFILE",
+             "XDG_RUNTIME_DIR"):
+    os.environ.pop(name, None)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import clilog_web  # noqa: E402
+
+_book_names = itertools.count(1)
+
+def note_line(note_id, content, done=False, due="-", timestamp="2024-01-01 10:00"):
+    """Uma linha no formato que o functions.sh grava."""
+    return f"{note_id}. {'[X]' if done else '[ ]'} | Due: {due} | ({timestamp}) {content}"
+
+class NotesLog:
+    """O <caderno>.log de um teste, com as URLs /b/<caderno>/... dele."""
+
+    def __init__(self, book):
+        self.book = book
+        self.name = book.name
+        self.path = book.path
+
+    def write(self, *lines):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+
+    def append(self, *lines):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def lines(self):
+        return self.read().splitlines()
+
+    def url(self, path):
+        return f"/b/{self.name}{path}"
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(HOME, ignore_errors=True)
+
+@pytest.fixture
+def cw():
+    return clilog_web
+
+@pytest.fixture
+def notes(cw):
+    """Caderno novo e vazio, ativo na thread do teste."""
+    os.makedirs(cw.NOTES_DIR, exist_ok=True)
+    book = cw.get_book(f"t{next(_book_names)}")
+    log = NotesLog(book)
+    log.write()
+    with cw.using_book(book):
+        yield log
+
+class ClosingClient(FlaskClient):
+    """Le e fecha o corpo de toda resposta, como um servidor WSGI: e no fechamento que a
+    request entra nas metricas e solta a versao fixa dela (ver _NotebookApp). Streams
+    infinitos pedem buffered=False."""
+
+    def open(self, *args, buffered=True, **kwargs):
+        return super().open(*args, buffered=buffered, **kwargs)
+
+@pytest.fixture
+def client(cw):
+    return ClosingClient(cw.app, cw.app.response_class)
+
+@pytest.fixture(scope="session")
+def shell_router(tmp_path_factory):
+    """bin/clilog instalado num diretorio temporario, como no benchmark."""
+    if shutil.which("bash") is None or shutil.which("awk") is None:
+        pytest.skip("bin/clilog needs bash and awk")
+    from clilog_bench import install_tree
+    return install_tree(str(tmp_path_factory.mktemp("install")))
+
+@pytest.fixture
+def shell(notes, shell_router):
+    """Roda `clilog args` no caderno do teste (mesmo $HOME) e devolve o CompletedProcess."""
+    def run(*args, **env):
+        return subprocess.run(["bash", shell_router, *args], env=dict(os.environ, CLILOG_BOOK=notes.name, **env),
+                              capture_output=True, text=True, timeout=60)
+    return run
+
+@pytest.fixture
+def coarse_clock(tmp_path):
+    """Env com um `dd` que preserva o mtime do arquivo escrito: dois patches no mesmo tick do
+    relogio do kernel, em que nem o tamanho nem o mtime mudam."""
+    dd = shutil.which("dd")
+    bin_dir = tmp_path / "coarse-bin"
+    bin_dir.mkdir()
+    script = bin_dir / "dd"
+    script.write_text(f"""#!/bin/sh
+for arg; do case "$arg" in of=*) out="${{arg#of=}}" ;; esac; done
+mtime=$(stat -c %.9Y "$out")
+{dd} "$@" || exit
+touch -m -d "@$mtime" "$out"
+""")
+    script.chmod(0o755)
+    return {'PATH': f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}
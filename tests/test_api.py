@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes):
+    notes.write(
+        note_line(1, "write report #work", due="2024-03-01"),
+        note_line(2, "buy milk #home", done=True),
+        note_line(3, "review PR #work #code", due="2024-03-10"),
+        note_line(4, "call mom #home", due="2024-02-20", done=True),
+        note_line(5, "Report taxes", due="2024-04-01"),
+    )
+    return notes
+
+def _ids(notes):
+    return [note['id'] for note in notes]
+
+def test_full_list_is_unchanged_without_paging(client, sample):
+    response = client.get(sample.url("/api/notes"))
+    assert _ids(response.get_json()) == [1, 2, 3, 4, 5]
+
+def test_cursor_pages_through_every_note_once(client, sample):
+    seen, cursor = [], 0
+    while cursor is not None:
+        page = client.get(sample.url(f"/api/notes?limit=2&cursor={cursor}")).get_json()
+        assert len(page['notes']) <= 2
+        seen += _ids(page['notes'])
+        cursor = page['next_cursor']
+    assert seen == [1, 2, 3, 4, 5]
+
+def test_paging_with_a_filter(client, sample):
+    page = client.get(sample.url("/api/notes?limit=1&status=pending")).get_json()
+    assert _ids(page['notes']) == [1]
+    page = client.get(sample.url(f"/api/notes?limit=5&status=pending&cursor={page['next_cursor']}")).get_json()
+    assert _ids(page['notes']) == [3, 5]
+    assert page['next_cursor'] is None
+
+@pytest.mark.parametrize("query, expected", [
+    ("status=completed", [2, 4]),
+    ("tag=work", [1, 3]),
+    ("tag=%23home", [2, 4]),
+    ("due_before=2024-03-05", [1, 4]),
+    ("due_after=2024-03-01", [3, 5]),
+    ("q=report", [1, 5]),
+    ("status=pending&tag=work&due_after=2024-03-05", [3]),
+])
+def test_filters(client, sample, query, expected):
+    assert _ids(client.get(sample.url(f"/api/notes?{query}")).get_json()) == expected
+
+def test_streamed_formats_match_the_plain_list(client, sample):
+    plain = client.get(sample.url("/api/notes?tag=work")).get_json()
+    streamed = client.get(sample.url("/api/notes?tag=work&stream=1"), buffered=False)
+    assert streamed.is_streamed
+    with streamed:
+        assert json.loads(streamed.get_data()) == plain
+    ndjson = client.get(sample.url("/api/notes?tag=work&format=ndjson"))
+    assert ndjson.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()] == plain
+
+def test_export_applies_the_same_filters(client, sample):
+    response = client.get(sample.url("/export?format=ndjson&status=completed&download=1"))
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename="clilog_export.ndjson"'
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == [2, 4]
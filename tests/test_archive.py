@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import note_line
+
+def _ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M")
+
+LINES = [
+    note_line(1, "old done #work", done=True, timestamp="2020-01-01 10:00"),
+    note_line(2, "old pending", timestamp="2020-01-02 10:00"),
+    note_line(3, "recent done", done=True, timestamp=_ago(1)),
+    "[X] (2020-03-03 10:00) legacy done #work",
+    note_line(5, "open task"),
+]
+
+@pytest.fixture
+def sample(notes):
+    notes.write(*LINES)
+    return notes
+
+def test_archive_moves_old_completed_notes(cw, sample):
+    path, count = cw.archive_notes(90)
+    assert count == 2
+    assert os.path.dirname(path) == sample.book.archive_dir and path.endswith(".log")
+    assert sample.lines() == LINES[1:3] + [LINES[4]]
+    with open(path, encoding="utf-8") as f:
+        header, *lines = f.read().splitlines()
+    # Fora do notes.log a linha antiga leva o id explicito
+    assert lines == [LINES[0], "4. " + LINES[3]]
+    summary = json.loads(header[len(cw.ARCHIVE_HEADER):])
+    assert summary == cw.read_segment_header(path)
+    assert (summary['notes'], summary['ids'], summary['older_than_days']) == (2, [1, 4], 90)
+    assert (summary['from'], summary['to'], summary['tags']) == ("2020-01-01 10:00", "2020-03-03 10:00", {"work": 2})
+
+    assert [note.id for note in cw.get_notes()] == [2, 3, 5]
+    assert [note.id for note in cw.get_notes(include_archive=True)] == [1, 4, 2, 3, 5]
+    assert cw.archive_notes(90) == (None, 0)
+
+def test_archived_ids_are_not_reused(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b", done=True, timestamp="2020-01-01 10:00"))
+    cw.archive_notes(30)
+    assert notes.lines() == [note_line(1, "a"), "2. [D]"]
+    assert cw.add_note_to_file("c") == 3
+
+def test_compressed_segment(cw, sample):
+    path, _ = cw.archive_notes(90, compress=True)
+    assert path.endswith(".log.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.readline().startswith(cw.ARCHIVE_HEADER)
+    assert cw.read_segment_header(path)['notes'] == 2
+    assert [note.content for note in cw.iter_archived_notes()] == ["old done", "legacy done"]
+
+def test_segments_are_parsed_once(cw, sample):
+    cw.archive_notes(90)
+    version, first = cw._archive_snapshot()
+    again, second = cw._archive_snapshot()
+    assert version == again
+    assert all(a is b for a, b in zip(first, second))
+
+def test_api_includes_the_archive_only_on_request(cw, client, sample):
+    assert client.get(sample.url("/api/archive")).get_json() == []
+    path, _ = cw.archive_notes(90)
+    segments = client.get(sample.url("/api/archive")).get_json()
+    assert [(s['file'], s['notes'], s['bytes']) for s in segments] == [
+        (os.path.basename(path), 2, os.path.getsize(path))]
+
+    ids = lambda query: [note['id'] for note in client.get(sample.url(f"/api/notes?{query}")).get_json()]
+    assert ids("") == [2, 3, 5]
+    assert ids("include=archive") == [1, 4, 2, 3, 5]
+    assert ids("include=archive&status=completed") == [1, 4, 3]
+
+    search = lambda query: [item['id'] for item in client.get(sample.url(f"/api/search?{query}")).get_json()['results']]
+    assert search("q=work") == []
+    assert search("q=work&include=archive") == [1, 4]
+
+    export = client.get(sample.url("/export?format=ndjson&include=archive")).get_data(as_text=True)
+    assert [json.loads(line)['id'] for line in export.splitlines()] == [1, 4, 2, 3, 5]
+
+def test_cli(cw, sample, tmp_path, capsys):
+    cw.main(["archive", "--days", "90", "--compress"])
+    assert "Archived 2 notes to" in capsys.readouterr().out
+    cw.main(["archive", "--list"])
+    assert ": 2 notes, ids 1-4, 2020-01-01 10:00 .. 2020-03-03 10:00" in capsys.readouterr().out
+    cw.main(["archive"])
+    assert "Nothing to archive" in capsys.readouterr().out
+
+    out = tmp_path / "all.ndjson"
+    cw.main(["export", str(out), "ndjson", "--log", sample.path, "--archive"])
+    assert [json.loads(line)['id'] for line in out.read_text().splitlines()] == [1, 4, 2, 3, 5]
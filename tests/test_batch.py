@@ -0,0 +1,81 @@
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes):
+    notes.write(note_line(1, "a #x"), note_line(2, "b #x"), note_line(3, "c"))
+    return notes
+
+def _batch(client, log, *ops):
+    return client.post(log.url("/api/batch"), json={"ops": list(ops)})
+
+def test_batch_returns_only_the_delta(client, cw, sample, monkeypatch):
+    commit_batch = cw._commit_batch
+    batches = []
+
+    def counted(ops):
+        batches.append(len(ops))
+        return commit_batch(ops)
+    monkeypatch.setattr(cw, "_commit_batch", counted)
+    response = _batch(client, sample,
+                      {"op": "done", "id": 1},
+                      {"op": "add", "content": "d", "tags": "#y z", "due": "2024-09-09"},
+                      {"op": "delete", "id": 3})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['results'] == [[1], [4], [3]]
+    assert [note['id'] for note in body['changed']] == [1, 4]
+    assert all(f'data-id="{note["id"]}"' in note['html'] for note in body['changed'])
+    assert body['changed'][1]['tags'] == ["y", "z"]
+    assert body['deleted'] == [3]
+    assert body['stats'] == {'total': 3, 'completed': 1, 'pending': 2, 'overdue': 1}
+    assert body['reload'] is False
+    # As tres ops num unico commit
+    assert batches == [3]
+    assert [note.id for note in cw.get_notes()] == [1, 2, 4]
+
+def test_with_tag_selects_every_tagged_note(client, cw, sample):
+    body = _batch(client, sample, {"op": "tag", "with_tag": "#x", "add": ["done"], "remove": ["x"]}).get_json()
+    assert body['results'] == [[1, 2]]
+    assert [note.tags for note in cw.get_notes()] == [("done",), ("done",), ()]
+
+def test_add_and_delete_in_the_same_batch(client, cw, sample):
+    body = _batch(client, sample, {"op": "add", "content": "temp"}, {"op": "delete", "id": 4}).get_json()
+    assert body['changed'] == []
+    assert body['deleted'] == [4]
+    assert len(sample.lines()) == 3
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"ops": []},
+    {"ops": [{"op": "done"}]},
+    {"ops": [{"op": "add", "content": " "}]},
+    {"ops": [{"op": "add", "content": "x", "due": "tomorrow"}]},
+    {"ops": [{"op": "done", "id": 1}, {"op": "explode", "id": 2}]},
+    [{"op": "done", "id": 1}],
+    {"ops": {"op": "done", "id": 1}},
+    {"ops": ["done"]},
+    {"ops": [{"op": "done", "id": "1"}]},
+    {"ops": [{"op": "done", "id": True}]},
+    {"ops": [{"op": "done", "with_tag": ["x"]}]},
+    {"ops": [{"op": "done", "with_tag": "x y"}]},
+    {"ops": [{"op": "add", "content": 5}]},
+    {"ops": [{"op": "add", "content": "x", "due": 20240101}]},
+    {"ops": [{"op": "add", "content": "x", "tags": {"y": 1}}]},
+    {"ops": [{"op": "add", "content": "x", "tags": [1]}]},
+    {"ops": [{"op": "add", "content": "x", "tags": ["two words"]}]},
+    {"ops": [{"op": "add", "content": "x", "tags": ["a-b"]}]},
+    {"ops": [{"op": "add", "content": "line\n4. [X] | Due: - | (2024-01-01 10:00) forged"}]},
+    {"ops": [{"op": "edit", "id": 1, "content": "a\rb"}]},
+    {"ops": [{"op": "edit", "id": 1, "content": "a\x00b"}]},
+    {"ops": [{"op": "edit", "id": 1, "content": ["a"]}]},
+    {"ops": [{"op": "tag", "id": 1, "add": "ok", "remove": 3}]},
+    {"ops": [{"op": "tag", "id": 1, "add": ["no space"]}]},
+])
+def test_invalid_batches_change_nothing(client, sample, payload):
+    before = sample.read()
+    response = client.post(sample.url("/api/batch"), json=payload)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert sample.read() == before
@@ -0,0 +1,56 @@
+import argparse
+import json
+
+import pytest
+
+import clilog_bench
+
+def test_generator_is_reproducible(tmp_path):
+    first, second, other = tmp_path / "a.log", tmp_path / "b.log", tmp_path / "c.log"
+    clilog_bench.generate(str(first), 500, seed=3)
+    clilog_bench.generate(str(second), 500, seed=3)
+    clilog_bench.generate(str(other), 500, seed=4)
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+def test_generated_lines_are_valid_notes(cw):
+    lines = list(clilog_bench.generate_lines(2000))
+    notes = cw._parse_lines("\n".join(lines))
+    assert [note.id for note in notes] == list(range(1, 2001))
+    legacy = [note for note in notes if not cw._ID_RE.match(note.raw)]
+    assert legacy and len(legacy) < len(notes) // 10
+    assert {note.status for note in notes} == {"pending", "completed"}
+    assert any(note.due_date != "-" for note in notes)
+    assert any(note.tags for note in notes)
+    for note in notes:
+        if note in legacy:
+            continue
+        assert cw._build_raw(note, note.content, note.status) == note.raw
+
+@pytest.mark.parametrize("text, size", [("10", 10), ("1k", 1000), ("2.5k", 2500), ("1M", 1000000)])
+def test_parse_size(text, size):
+    assert clilog_bench.parse_size(text) == size
+    assert clilog_bench.parse_size(clilog_bench.size_label(size)) == size
+
+@pytest.mark.parametrize("text", ["0", "k", "ten"])
+def test_parse_size_rejects(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        clilog_bench.parse_size(text)
+
+def _results(path, entries):
+    path.write_text(json.dumps({"meta": {"seed": 1}, "results": [
+        {"size": size, "name": name, "median_ms": median, "peak_kb": peak} for size, name, median, peak in entries]}))
+    return str(path)
+
+def test_compare_flags_regressions(tmp_path, capsys):
+    base = _results(tmp_path / "base.json", [(1000, "fast", 10.0, 100), (1000, "noise", 0.1, 100),
+                                             (1000, "memory", 10.0, 1000)])
+    same = _results(tmp_path / "same.json", [(1000, "fast", 10.5, 100), (1000, "noise", 0.5, 100),
+                                             (1000, "memory", 10.0, 1000)])
+    worse = _results(tmp_path / "worse.json", [(1000, "fast", 20.0, 100), (1000, "noise", 0.5, 100),
+                                               (1000, "memory", 10.0, 5000)])
+    assert clilog_bench.main(["compare", base, same]) == 0
+    assert clilog_bench.main(["compare", base, worse]) == 1
+    out = capsys.readouterr().out
+    assert "2 regression(s)" in out
+    assert "SLOWER" in out and "MORE MEMORY" in out
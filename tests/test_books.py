@@ -0,0 +1,94 @@
+import itertools
+import os
+import subprocess
+
+import pytest
+
+from conftest import NotesLog, note_line
+
+_names = itertools.count(1)
+
+@pytest.fixture
+def new_book(cw):
+    """Fabrica de cadernos com nomes unicos (em ordem de criacao), ja gravados com as linhas dadas."""
+    os.makedirs(cw.NOTES_DIR, exist_ok=True)
+
+    def make(*lines):
+        log = NotesLog(cw.get_book(f"bk{next(_names):03d}"))
+        log.write(*lines)
+        return log
+    return make
+
+def test_reading_a_missing_notebook_does_not_create_it(cw, client):
+    name = f"ghost{next(_names)}"
+    response = client.get(f"/b/{name}/api/notes")
+    assert response.status_code == 404
+    assert f"notebook '{name}' does not exist" in response.get_data(as_text=True)
+    assert name not in cw._books['loaded']
+    assert not os.path.exists(os.path.join(cw.NOTES_DIR, name + ".log"))
+
+    assert client.post(f"/b/{name}/add", data={"text": "first"}).status_code == 302
+    assert name in cw.list_books()
+    assert [note['content'] for note in client.get(f"/b/{name}/api/notes").get_json()] == ["first"]
+
+@pytest.mark.parametrize("name", ["bad.name", "a" * 65, "..%2Fnotes"])
+def test_invalid_names(cw, client, name):
+    assert client.get(f"/b/{name}/api/notes").status_code == 404
+    assert client.post(f"/b/{name}/add", data={"text": "x"}).status_code == 404
+    with pytest.raises(ValueError):
+        cw.get_book(name)
+
+def test_notebooks_are_independent(cw, client, new_book):
+    first, second = new_book(note_line(1, "one")), new_book(note_line(1, "other"), note_line(2, "two"))
+    client.get(first.url("/done/1"))
+    assert first.lines() == [note_line(1, "one", done=True)]
+    assert second.lines() == [note_line(1, "other"), note_line(2, "two")]
+    assert first.book.snapshot is not second.book.snapshot
+    assert [note['id'] for note in client.get(second.url("/api/notes")).get_json()] == [1, 2]
+    # Os links da pagina ficam dentro do caderno
+    assert f"fetch('{second.url('/api/batch')}'" in client.get(second.url("/")).get_data(as_text=True)
+
+def test_list_books_only_sees_notebook_files(cw, new_book):
+    book = new_book()
+    for name in (f"{book.name}.log.tmp", "bad name.log", f"{book.name}.lock"):
+        open(os.path.join(cw.NOTES_DIR, name), "w").close()
+    names = cw.list_books()
+    assert book.name in names
+    assert "bad name" not in names and not any(name.endswith((".tmp", ".lock")) for name in names)
+
+def test_map_books_runs_each_call_in_its_notebook(cw, new_book):
+    books = [new_book(*(note_line(n, "x") for n in range(1, k + 2))) for k in range(5)]
+    results = cw.map_books(lambda: (cw._book().name, len(cw.get_notes())), [book.name for book in books])
+    assert [(book.name, result) for book, result in results] == [(book.name, (book.name, k + 1))
+                                                                  for k, book in enumerate(books)]
+
+def test_cross_notebook_api(client, new_book):
+    first = new_book(note_line(1, "zebracorn one"), note_line(2, "done", done=True))
+    second = new_book(note_line(1, "zebracorn two #x"))
+    summary = {book['name']: book for book in client.get("/api/books").get_json()}
+    assert (summary[first.name]['total'], summary[first.name]['completed']) == (2, 1)
+    assert (summary[second.name]['total'], summary[second.name]['pending']) == (1, 1)
+    assert not summary[first.name]['default']
+
+    result = client.get("/api/books/search?q=zebracorn").get_json()
+    assert result['total'] == 2
+    assert [(item['book'], item['id']) for item in result['results']] == [(first.name, 1), (second.name, 1)]
+    assert client.get("/api/books/search?q=zebracorn&limit=1").get_json()['results'][0]['book'] == first.name
+
+def test_books_cli(cw, new_book, capsys):
+    book = new_book(note_line(1, "quokkaberry"), note_line(2, "b", due="2000-01-01"))
+    cw.main(["books"])
+    assert f"  {book.name}: 2 notes, 2 pending, 1 overdue" in capsys.readouterr().out
+    cw.main(["books", "--search", "quokkaberry"])
+    assert f"{book.name}: {note_line(1, 'quokkaberry')}" in capsys.readouterr().out
+
+def test_shell_book_option(cw, new_book, shell_router):
+    book = new_book(note_line(1, "a"))
+    env = {k: v for k, v in os.environ.items() if k != "CLILOG_BOOK"}
+    run = lambda *args: subprocess.run(["bash", shell_router, *args], env=env, capture_output=True, text=True,
+                                       timeout=60)
+    run("--book", book.name, "done", "1")
+    run(f"--book={book.name}", "add", "b")
+    assert book.lines()[0] == note_line(1, "a", done=True)
+    assert book.lines()[1].startswith("2. [ ]") and book.lines()[1].endswith(") b")
+    assert "Invalid notebook name" in run("--book", "bad.name", "list").stdout
@@ -0,0 +1,73 @@
+import os
+
+from conftest import note_line
+
+def test_unchanged_file_is_parsed_once(cw, notes):
+    notes.write(note_line(1, "first"), note_line(2, "second"))
+    first = cw.get_notes()
+    second = cw.get_notes()
+    assert [note.content for note in first] == ["first", "second"]
+    # Mesma versao: os mesmos objetos, sem novo parse
+    assert all(a is b for a, b in zip(first, second))
+    assert notes.book.snapshot['key'] == cw._file_key(notes.path)
+
+def test_external_rewrite_invalidates_the_cache(cw, notes):
+    notes.write(note_line(1, "before"))
+    assert [note.content for note in cw.get_notes()] == ["before"]
+    # Mesmo tamanho, conteudo diferente: a versao muda pelo mtime/inode
+    notes.write(note_line(1, "after!"))
+    st = os.stat(notes.path)
+    os.utime(notes.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    assert [note.content for note in cw.get_notes()] == ["after!"]
+
+def test_get_notes_returns_a_private_list(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    listed = cw.get_notes()
+    listed.reverse()
+    listed.pop()
+    assert [note.id for note in cw.get_notes()] == [1, 2]
+
+def test_missing_file_is_an_empty_notebook(cw, notes):
+    os.remove(notes.path)
+    assert cw.get_notes() == []
+
+def test_own_writes_update_the_cache(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    cw.get_notes()
+    cw.add_note_to_file("c", ["x"])
+    assert notes.book.snapshot['key'] == cw._file_key(notes.path)
+    cw.update_note_in_file(1, "A", "completed")
+    assert notes.book.snapshot['key'] == cw._file_key(notes.path)
+    assert [(note.id, note.content, note.status) for note in cw.get_notes()] == [
+        (1, "A", "completed"), (2, "b", "pending"), (3, "c", "pending")]
+    assert notes.lines()[0] == note_line(1, "A", done=True)
+
+def test_append_parses_only_the_tail(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    before = cw.get_notes()
+    notes.append(note_line(3, "c"), "[ ] (2024-01-01 10:00) legacy")
+    after = cw.get_notes()
+    # Os notes ja parseados sao os mesmos objetos: so o final novo foi lido
+    assert after[0] is before[0] and after[1] is before[1]
+    # A linha sem ID ganha o numero da linha, contado desde o inicio do arquivo
+    assert [(note.id, note.content) for note in after] == [(1, "a"), (2, "b"), (3, "c"), (4, "legacy")]
+
+def test_append_after_a_partial_last_line(cw, notes):
+    with open(notes.path, "w", encoding="utf-8") as f:
+        f.write(note_line(1, "a") + "\n" + note_line(2, "unfinis"))
+    assert [note.content for note in cw.get_notes()] == ["a", "unfinis"]
+    with open(notes.path, "a", encoding="utf-8") as f:
+        f.write("hed\n" + note_line(3, "c") + "\n")
+    assert [note.content for note in cw.get_notes()] == ["a", "unfinished", "c"]
+
+def test_prefix_change_with_growth_forces_a_full_parse(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    before = cw.get_notes()
+    # Mesmo inode, arquivo maior, mas o comeco mudou: o crc do prefixo nao bate
+    with open(notes.path, "r+", encoding="utf-8") as f:
+        f.write(note_line(1, "A"))
+        f.seek(0, os.SEEK_END)
+        f.write(note_line(3, "c") + "\n")
+    after = cw.get_notes()
+    assert [note.content for note in after] == ["A", "b", "c"]
+    assert after[1] is not before[1]
@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes, cw, monkeypatch):
+    monkeypatch.setattr(cw, "PAGE_WINDOW", 5)
+    notes.write(*(note_line(n, f"card {n}" + (" #even" if n % 2 == 0 else ""), done=n % 3 == 0)
+                  for n in range(1, 13)))
+    return notes
+
+def _card_ids(html):
+    return [int(note_id) for note_id in re.findall(r'data-id="(\d+)"', html)]
+
+def test_page_renders_only_the_first_window(client, sample):
+    html = client.get(sample.url("/")).get_data(as_text=True)
+    assert _card_ids(html) == [1, 2, 3, 4, 5]
+    assert "let nextCursor = 5;" in html
+    # Os totais cobrem o caderno inteiro, nao so a janela
+    assert re.search(r'id="stat-total"[^>]*>12<', html)
+    assert re.search(r'id="stat-completed"[^>]*>4<', html)
+
+def test_cards_follow_the_cursor(client, sample):
+    seen, cursor = [], 0
+    while cursor is not None:
+        data = client.get(sample.url(f"/api/cards?cursor={cursor}&limit=4")).get_json()
+        assert data['count'] == len(_card_ids(data['html']))
+        seen += _card_ids(data['html'])
+        cursor = data['next_cursor']
+    assert seen == list(range(1, 13))
+
+def test_cards_with_filters(client, sample):
+    data = client.get(sample.url("/api/cards?status=completed")).get_json()
+    assert _card_ids(data['html']) == [3, 6, 9, 12]
+    data = client.get(sample.url("/api/cards?status=pending&search=even")).get_json()
+    assert _card_ids(data['html']) == [2, 4, 8, 10]
+
+def test_card_etag_changes_with_the_template(client, cw, sample, monkeypatch):
+    url = sample.url("/api/cards")
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    monkeypatch.setattr(cw, "TEMPLATE_VERSION", "other")
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+def test_cards_are_escaped(client, notes):
+    notes.write(note_line(1, "<script>alert(1)</script>"))
+    html = client.get(notes.url("/api/cards")).get_json()['html']
+    assert "<script>alert" not in html
+    assert "&lt;script&gt;" in html
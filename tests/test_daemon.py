@@ -0,0 +1,102 @@
+import os
+import re
+import subprocess
+import time
+from datetime import date, datetime
+
+import pytest
+
+from conftest import NotesLog, note_line
+
+LINES = [
+    note_line(1, "write the report #work #q1", due="2020-01-01"),
+    note_line(2, "Buy milk #home", done=True),
+    note_line(3, "review the PR #work", due=date.today().isoformat()),
+    note_line(4, "plan the trip #home #fun", due="2999-12-31"),
+    note_line(5, "call the bank #work", done=True, due="2021-06-06"),
+    "6. [D] | Due: - | (2024-01-01 10:00) deleted",
+    note_line(7, "read a book #fun"),
+]
+
+@pytest.fixture
+def default_notes(cw, monkeypatch):
+    """O caderno padrao (o unico que o daemon atende), no locale C dos dois lados."""
+    monkeypatch.setenv("LC_ALL", "C")
+    monkeypatch.setitem(cw._daemon, 'locale', cw._locale_env())
+    monkeypatch.setitem(cw._daemon, 'fold', lambda s: s.translate(cw._ASCII_LOWER))
+    os.makedirs(cw.NOTES_DIR, exist_ok=True)
+    log = NotesLog(cw.get_book(cw.DEFAULT_BOOK))
+    log.write(*LINES)
+    with cw.using_book(log.book):
+        yield log
+
+def _shell(router, *args, **env):
+    result = subprocess.run(["bash", router, *args], env=dict(os.environ, **env),
+                            capture_output=True, text=True, timeout=60)
+    return result.returncode, result.stdout
+
+def _daemon(cw, *args):
+    fields = [cw.DAEMON_PROTOCOL, cw.NOTES_FILE, cw._locale_env(), date.today().isoformat(),
+              datetime.now().strftime("%Y-%m-%d %H:%M"), *args]
+    return cw._daemon_request("".join(field + "\0" for field in fields).encode())
+
+def _rewind(log, text):
+    log.write(*text.splitlines())
+    st = os.stat(log.path)
+    os.utime(log.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+
+@pytest.mark.parametrize("args", [
+    ("list",),
+    ("list", "due"),
+    ("search", "work"),
+    ("search", "MILK"),
+    ("search", "nothing"),
+    ("stats",),
+])
+def test_readers_match_the_shell(cw, default_notes, shell_router, args):
+    assert _daemon(cw, *args) == _shell(shell_router, *args)
+
+@pytest.mark.parametrize("args", [
+    ("done", "4"),
+    ("undo", "2"),
+    ("done", "2"),
+    ("done", "42"),
+    ("add", "new note #work"),
+])
+def test_writers_match_the_shell(cw, default_notes, shell_router, args):
+    original = default_notes.read()
+    shell_result = _shell(shell_router, *args)
+    shell_file = default_notes.read()
+    _rewind(default_notes, original)
+    assert _daemon(cw, *args) == shell_result
+    stamp = re.compile(r"\(\d{4}-\d{2}-\d{2} \d{2}:\d{2}\)")
+    assert stamp.sub("(now)", default_notes.read()) == stamp.sub("(now)", shell_file)
+
+@pytest.mark.parametrize("args", [
+    ("search", "wo.k"),         # regex: so o grep sabe
+    ("add", "x", "--due", "tomorrow"),
+])
+def test_unsupported_requests_fall_back(cw, default_notes, args):
+    with pytest.raises(cw._Fallback):
+        _daemon(cw, *args)
+
+def test_hand_edited_log_falls_back(cw, default_notes):
+    default_notes.append("", "  " + note_line(8, "indented"))
+    with pytest.raises(cw._Fallback):
+        _daemon(cw, "list")
+
+def test_daemon_process_over_the_socket(cw, default_notes, shell_router, tmp_path):
+    socket_path = str(tmp_path / "clilog.sock")
+    daemon = subprocess.Popen(["bash", shell_router, "daemon"], env=dict(os.environ, CLILOG_SOCKET=socket_path),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(socket_path):
+            assert daemon.poll() is None and time.monotonic() < deadline
+            time.sleep(0.02)
+        for args in (("stats",), ("list",), ("done", "7")):
+            assert _shell(shell_router, *args, CLILOG_SOCKET=socket_path) == _daemon(cw, *args)
+        assert default_notes.lines()[-1] == note_line(7, "read a book #fun", done=True)
+    finally:
+        daemon.terminate()
+        daemon.wait()
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def feed(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    # O feed e do processo: alcanca o arquivo deste teste antes de medir
+    feed = notes.book.feed.start()
+    feed.check()
+    return feed
+
+def _events(text):
+    """(evento, id, dados) de cada mensagem de um trecho do stream."""
+    parsed = []
+    for message in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if 'event' in fields:
+            parsed.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return parsed
+
+def test_feed_publishes_adds_updates_and_deletes(cw, notes, feed):
+    version = feed.version
+    cw.apply_batch([('add', "c", None, None), ('status', 1, 'completed'), ('delete', 2)])
+    feed.check()
+    with feed.cond:
+        events = _events(''.join(feed.since(version)))
+    assert sorted((kind, data['id']) for kind, _, data in events) == [('add', 3), ('delete', 2), ('update', 1)]
+    assert [event_id for _, event_id, _ in events] == [f"{feed.boot}-{v}" for v in range(version + 1, version + 4)]
+    update = next(data for kind, _, data in events if kind == 'update')
+    assert update['note']['status'] == "completed"
+    assert 'data-id="1"' in update['note']['html']
+    assert update['stats']['total'] == 2
+
+def test_external_writes_reach_the_feed(cw, notes, feed):
+    version = feed.version
+    notes.append(note_line(3, "from the shell"))
+    feed.check()
+    with feed.cond:
+        assert [kind for kind, _, _ in _events(''.join(feed.since(version)))] == ['add']
+
+def test_resume_point(cw, feed, monkeypatch):
+    assert feed.resume_point(None) == feed.version
+    assert feed.resume_point(f"{feed.boot}-{feed.version}") == feed.version
+    assert feed.resume_point(f"other-{feed.version}") is None
+    assert feed.resume_point(f"{feed.boot}-{feed.version + 5}") is None
+    assert feed.resume_point(f"{feed.boot}-x") is None
+
+def test_event_stream_over_http(client, cw, notes, feed, monkeypatch):
+    monkeypatch.setattr(cw, "EVENTS_HEARTBEAT", 0.2)
+    response = client.get(notes.url("/api/events"), buffered=False)
+    assert response.mimetype == "text/event-stream"
+    assert response.headers['Cache-Control'] == "no-cache"
+    stream = iter(response.response)
+    with response:
+        (kind, event_id, data), = _events(next(stream).decode())
+        assert kind == 'sync'
+        assert event_id == f"{feed.boot}-{data['version']}"
+        assert next(stream) == b": ping\n\n"
+        cw.set_note_status(2, "completed")
+        feed.check()
+        assert [(kind, data['id']) for kind, _, data in _events(next(stream).decode())] == [('update', 2)]
+
+    # Retomando com o Last-Event-ID: o cliente recebe o que perdeu
+    cw.add_note_to_file("missed")
+    feed.check()
+    response = client.get(notes.url("/api/events"), headers={'Last-Event-ID': event_id}, buffered=False)
+    with response:
+        stream = iter(response.response)
+        assert _events(next(stream).decode())[0][0] == 'sync'
+        assert [kind for kind, _, _ in _events(next(stream).decode())] == ['update', 'add']
+
+def test_unknown_last_event_id_asks_for_a_reset(client, notes, feed):
+    response = client.get(notes.url("/api/events"), headers={'Last-Event-ID': "gone-1"}, buffered=False)
+    with response:
+        assert _events(next(iter(response.response)).decode())[0][0] == 'reset'
+
+def test_stream_limit(client, cw, notes, feed, monkeypatch):
+    monkeypatch.setitem(cw._event_streams, 'max', cw._event_streams['open'] + 1)
+    rejected = cw._event_streams_rejected.values.get((), 0)
+    first = client.get(notes.url("/api/events"), buffered=False)
+    assert first.status_code == 200
+    second = client.get(notes.url("/api/events"))
+    assert second.status_code == 503
+    assert second.headers['Retry-After'] == str(cw.EVENTS_RETRY_AFTER)
+    assert cw._event_streams_rejected.values[()] == rejected + 1
+    # Fechar o stream libera a vaga
+    first.close()
+    third = client.get(notes.url("/api/events"), buffered=False)
+    assert third.status_code == 200
+    third.close()
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import re
+
+import pytest
+
+from conftest import note_line
+
+LINES = [
+    note_line(1, 'quotes "and", commas #work', due="2024-02-02"),
+    "[X] (2023-05-05 08:00) legacy ação #work #old",
+    "3. [D] | Due: - | (2024-01-01 10:00) deleted",
+    note_line(4, "plain", done=True),
+]
+
+@pytest.fixture
+def sample(notes):
+    notes.write(*LINES)
+    return notes
+
+def _export(cw, fmt, summary=None):
+    return "".join(cw.export_stream(cw.iter_log_notes(cw._book().path), fmt, summary))
+
+def test_iter_log_notes_matches_the_cache(cw, sample):
+    with open(sample.path, "ab") as f:
+        f.write(b"5. [ ] | Due: - | (2024-01-01 10:00) crlf\r\n")
+    assert [note.raw for note in cw.iter_log_notes(sample.path)] == [note.raw for note in cw.get_notes()]
+
+def test_json(cw, sample):
+    summary = cw.ExportSummary()
+    data = json.loads(_export(cw, "json", summary))
+    assert data['notes'] == [note.to_dict() for note in cw.get_notes()]
+    assert (data['total_notes'], data['completed'], data['pending']) == (3, 2, 1)
+    assert data['tags'] == [{"tag": "work", "count": 2}, {"tag": "old", "count": 1}]
+    assert (summary.total, summary.completed) == (3, 2)
+
+def test_ndjson(cw, sample):
+    lines = _export(cw, "ndjson").splitlines()
+    assert [json.loads(line) for line in lines] == [note.to_dict() for note in cw.get_notes()]
+
+def test_csv(cw, sample):
+    rows = list(csv.reader(io.StringIO(_export(cw, "csv"))))
+    assert rows[0] == ['id', 'status', 'timestamp', 'content', 'tags', 'due_date']
+    assert rows[1] == ['1', 'pending', '2024-01-01 10:00', 'quotes "and", commas', 'work', '2024-02-02']
+    assert rows[2] == ['2', 'completed', '2023-05-05 08:00', 'legacy ação', 'work;old', '-']
+    assert len(rows) == 4
+
+def test_markdown(cw, sample):
+    text = _export(cw, "markdown")
+    assert '- [ ] **2024-01-01 10:00** quotes "and", commas `#work` (due 2024-02-02)\n' in text
+    assert "- [x] **2023-05-05 08:00** legacy ação `#work` `#old`\n" in text
+    assert "**Total Tasks:** 3\n" in text
+    assert "**Completion:** 66%\n" in text
+    assert "- **#work**: 2 tasks\n" in text
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv", "md"])
+def test_chunking_does_not_change_the_output(cw, sample, monkeypatch, fmt):
+    whole = _export(cw, fmt)
+    monkeypatch.setattr(cw, "EXPORT_CHUNK", 1)
+    chunks = list(cw.export_stream(cw.iter_log_notes(sample.path), fmt))
+    assert len(chunks) > 1
+    # O md e o json tem a data da exportacao, que pode mudar entre as duas chamadas
+    export_date = re.compile(r'"export_date":"[^"]*"|\*\*Export Date:\*\* .*')
+    assert export_date.sub("", "".join(chunks)) == export_date.sub("", whole)
+
+def test_unknown_format(cw, client, sample):
+    with pytest.raises(ValueError):
+        cw.export_format("xml")
+    assert client.get(sample.url("/export?format=xml")).status_code == 400
+
+def test_cli_export(cw, sample, tmp_path, capsys):
+    out = tmp_path / "notes.csv"
+    cw.main(["export", str(out), "csv", "--log", sample.path])
+    assert out.read_text(encoding="utf-8") == _export(cw, "csv")
+    assert "Exported 3 notes" in capsys.readouterr().out
@@ -0,0 +1,77 @@
+import gzip
+import os
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes):
+    notes.write(*(note_line(n, f"note number {n} #tag{n % 3}") for n in range(1, 41)))
+    # mtime num segundo que ja passou: o Last-Modified so sai depois disso
+    os.utime(notes.path, (1700000000, 1700000000))
+    return notes
+
+def test_etag_and_if_none_match(client, cw, sample):
+    url = sample.url("/api/notes")
+    first = client.get(url)
+    etag = first.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    cw.set_note_status(1, "completed")
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()[0]['status'] == "completed"
+
+def test_if_modified_since(client, sample):
+    url = sample.url("/api/notes")
+    last_modified = client.get(url).headers['Last-Modified']
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get(url, headers={'If-Modified-Since': "Sat, 01 Jan 2000 00:00:00 GMT"}).status_code == 200
+
+def test_no_last_modified_within_the_current_second(client, sample):
+    # Outra escrita no mesmo segundo teria a mesma data: so a ETag identifica a versao
+    # (um mtime no futuro fica "no segundo atual" durante todo o teste)
+    future = time.time() + 3600
+    os.utime(sample.path, (future, future))
+    url = sample.url("/api/notes")
+    response = client.get(url)
+    assert 'ETag' in response.headers
+    assert 'Last-Modified' not in response.headers
+    assert client.get(url, headers={'If-Modified-Since': formatdate(usegmt=True)}).status_code == 200
+
+def test_if_modified_since_is_ignored_when_the_etag_has_extra_parts(client, sample):
+    url = sample.url("/api/due")
+    last_modified = client.get(url).headers['Last-Modified']
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 200
+
+def test_gzip_responses(client, sample):
+    url = sample.url("/api/notes")
+    plain = client.get(url)
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == "gzip"
+    assert "Accept-Encoding" in zipped.headers['Vary']
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    etag = zipped.headers['ETag']
+    assert etag == plain.headers['ETag'][:-1] + '-gzip"'
+    again = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+
+def test_small_bodies_are_not_compressed(client, notes):
+    notes.write(note_line(1, "tiny"))
+    response = client.get(notes.url("/api/notes"), headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_compressed_bodies_are_an_lru(cw, monkeypatch):
+    monkeypatch.setattr(cw, "_compressed_bodies", OrderedDict())
+    monkeypatch.setattr(cw, "COMPRESSED_CACHE_SIZE", 2)
+    cw._store_body("a", ("application/json", b"1"))
+    cw._store_body("b", ("application/json", b"2"))
+    assert cw._cached_body("a") is not None  # "a" passa a ser o mais recente
+    cw._store_body("c", ("application/json", b"3"))
+    assert cw._cached_body("b") is None
+    assert list(cw._compressed_bodies) == ["a", "c"]
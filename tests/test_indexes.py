@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import note_line
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+@pytest.fixture
+def sample(notes):
+    notes.write(
+        note_line(1, "late #work", due=_day(-2)),
+        note_line(2, "today #work #urgent", due=_day(0)),
+        note_line(3, "soon #home", due=_day(3)),
+        note_line(4, "done late #work", due=_day(-1), done=True),
+        note_line(5, "someday #home"),
+        note_line(6, "also today", due=_day(0)),
+    )
+    return notes
+
+def test_tag_counts(client, sample):
+    assert client.get(sample.url("/api/tags")).get_json() == [
+        {"tag": "work", "count": 3}, {"tag": "home", "count": 2}, {"tag": "urgent", "count": 1}]
+
+def test_due_buckets(client, sample):
+    due = client.get(sample.url("/api/due")).get_json()
+    assert due['today'] == _day(0)
+    assert [note['id'] for note in due['notes']] == [1, 2, 6, 3]
+    assert due['overdue'] == [1]
+    assert due['due_today'] == [2, 6]
+
+def test_due_range_is_exclusive(client, sample):
+    due = client.get(sample.url(f"/api/due?after={_day(-2)}&before={_day(3)}&status=all")).get_json()
+    assert [note['id'] for note in due['notes']] == [4, 2, 6]
+
+def test_indexes_follow_writes(client, cw, sample):
+    cw.update_note_in_file(5, "someday #work")
+    cw.delete_note_from_file(1)
+    cw.set_note_status(2, "completed")
+    cw.add_note_to_file("new", ["home"])
+    tags = {item['tag']: item['count'] for item in client.get(sample.url("/api/tags")).get_json()}
+    assert tags == {"work": 3, "home": 3, "urgent": 1}
+    due = client.get(sample.url("/api/due")).get_json()
+    assert due['overdue'] == []
+    assert due['due_today'] == [6]
+
+def test_notes_by_tag_and_due_use_the_indexes(cw, sample):
+    args = {'tag': 'work', 'due_before': _day(0)}
+    assert [note.id for note in cw._indexed_notes(args)] == [1, 4]
+    assert cw._indexed_notes({}) is None
+
+@pytest.mark.parametrize("lines, total, completed", [
+    ([note_line(1, "a", done=True), note_line(2, "b"), "[X] (2024-01-01 10:00) legacy"], 3, 2),
+    ([note_line(1, "a")], 1, 0),
+])
+def test_shell_stats(notes, shell, lines, total, completed):
+    notes.write(*lines)
+    out = shell("stats").stdout
+    assert f"   Total: {total} notes\n" in out
+    assert f"   Completed: {completed} ({completed * 100 // total}%)\n" in out
+    assert f"   Pending: {total - completed}\n" in out
@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    return notes
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+def _metrics(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    return response.get_data(as_text=True)
+
+def test_requests_are_counted_by_route_rule(client, sample):
+    key = 'clilog_http_requests_total{method="GET",route="/done/<int:note_id>",status="302"}'
+    before = float(_samples(_metrics(client)).get(key, 0))
+    client.get(sample.url("/done/1"))
+    client.get(sample.url("/done/2"))
+    assert float(_samples(_metrics(client))[key]) == before + 2
+
+def test_every_metric_has_help_and_type(client, sample):
+    text = _metrics(client)
+    names = set(re.findall(r"^# TYPE (\S+) (?:counter|gauge|histogram)$", text, re.M))
+    assert names == set(re.findall(r"^# HELP (\S+) ", text, re.M))
+    assert {"clilog_http_requests_total", "clilog_cache_lookups_total", "clilog_notes",
+            "clilog_write_queue_depth", "clilog_event_streams"} <= names
+    for name in _samples(text):
+        assert re.sub(r"(_bucket|_sum|_count)?(\{.*)?$", "", name) in names or name in names
+
+def test_histogram_buckets_are_cumulative(client, sample):
+    client.get(sample.url("/api/stats"))
+    samples = _samples(_metrics(client))
+    buckets = [(name, float(value)) for name, value in samples.items()
+               if name.startswith('clilog_http_request_seconds_bucket{route="/api/stats"')]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1][0].endswith('le="+Inf"}')
+    assert counts[-1] == float(samples['clilog_http_request_seconds_count{route="/api/stats"}'])
+
+def test_server_timing_header(client, sample):
+    timing = client.get(sample.url("/api/notes")).headers['Server-Timing']
+    assert re.search(r"\bapp;dur=\d+\.\d\d", timing)
+    assert "json;dur=" in timing
+
+def test_slow_requests_are_logged(client, cw, sample, monkeypatch, capsys):
+    monkeypatch.setitem(cw._instrumentation, 'slow_ms', 0.000001)
+    client.get(sample.url("/api/stats?days=3"))
+    assert f"clilog-slow: GET /b/{sample.name}/api/stats?days=3 200 " in capsys.readouterr().err
+
+def test_profile_endpoint(client, cw, sample, monkeypatch):
+    assert client.get(f"/debug/profile/b/{sample.name}/api/stats").status_code == 404
+    monkeypatch.setitem(cw._instrumentation, 'profile', True)
+    response = client.get(f"/debug/profile/b/{sample.name}/api/stats?profile_sort=tottime")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert text.startswith(f"GET /b/{sample.name}/api/stats -> 200 OK")
+    assert "function calls" in text
+    assert client.get(f"/debug/profile/b/{sample.name}/api/stats?profile_sort=nope").status_code == 400
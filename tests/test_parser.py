@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import note_line
+
+@pytest.mark.parametrize("line", [
+    note_line(1, "buy milk"),
+    note_line(7, "ship release #work #urgent", done=True, due="2024-03-01"),
+    note_line(12, "ação com acentos #café", timestamp="2023-12-31 23:59"),
+    note_line(3, "pipes | inside (and parens) #x_1"),
+])
+def test_parse_and_rebuild_round_trip(cw, line):
+    note = cw._parse_line(line, 99)
+    assert note.raw == line
+    assert cw._build_raw(note, note.content, note.status) == line
+
+def test_fields(cw):
+    note = cw._parse_line(note_line(7, "ship release #work #urgent", done=True, due="2024-03-01"), 1)
+    assert (note.id, note.status, note.due_date, note.timestamp) == (7, "completed", "2024-03-01", "2024-01-01 10:00")
+    assert note.tags == ("work", "urgent")
+    assert note.content == "ship release"
+    assert note.to_dict()['tags'] == ["work", "urgent"]
+
+def test_tags_before_the_timestamp_are_not_tags(cw):
+    note = cw._parse_line("4. [ ] | Due: #soon | (2024-01-01 10:00) text #real", 1)
+    assert note.tags == ("real",)
+
+def test_legacy_lines_without_id_or_due(cw):
+    note = cw._parse_line("[X] (2022-05-05 08:00) old note #legacy", 5)
+    assert (note.id, note.status, note.due_date, note.timestamp) == (5, "completed", "-", "2022-05-05 08:00")
+    assert note.content == "old note"
+    assert note.tags == ("legacy",)
+
+def test_loose_spacing_takes_the_fallback_path(cw):
+    note = cw._parse_line("8.  [ ]  |Due: 2024-02-02|  (2024-01-01 10:00)   spaced out", 1)
+    assert (note.id, note.due_date, note.timestamp, note.content) == (8, "2024-02-02", "2024-01-01 10:00", "spaced out")
+
+def test_parse_lines_numbers_lines_and_skips_blanks(cw):
+    text = "\n".join([note_line(1, "a"), "", "[ ] (2024-01-01 10:00) legacy", "  ", note_line(9, "b")])
+    notes = cw._parse_lines(text)
+    assert [(note.id, note.content) for note in notes] == [(1, "a"), (3, "legacy"), (9, "b")]
+
+def test_decode_normalizes_newlines(cw):
+    data = (note_line(1, "a") + "\r\n" + note_line(2, "b") + "\r" + note_line(3, "c") + "\n").encode()
+    assert [note.id for note in cw._parse_lines(cw._decode(data))] == [1, 2, 3]
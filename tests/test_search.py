@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import note_line
+
+@pytest.fixture
+def sample(notes):
+    notes.write(
+        note_line(1, "Deploy the staging server #ops"),
+        note_line(2, "write deployment notes"),
+        note_line(3, "server room keys #office"),
+        note_line(4, "Straße cleanup"),
+    )
+    return notes
+
+@pytest.mark.parametrize("query, expected", [
+    ("server", [1, 3]),
+    ("deploy", [1, 2]),            # prefixo
+    ("DEPLOY server", [1]),        # todos os termos, sem caixa
+    ('"staging server"', [1]),     # frase
+    ('"server staging"', []),
+    ("ops", [1]),                  # tags entram no indice
+    ("strasse", [4]),              # casefold
+    ("", []),
+    ("nothing", []),
+])
+def test_search_matches(cw, sample, query, expected):
+    assert cw.search_notes(query)['ids'] == expected
+
+def test_results_carry_highlights(cw, sample):
+    result = cw.search_notes("serv")
+    first = result['results'][0]
+    assert first['id'] == 1
+    start, end = first['highlights'][0]
+    assert first['content'][start:end] == "serv"
+
+def test_index_follows_writes(cw, sample):
+    assert cw.search_notes("server")['ids'] == [1, 3]
+    cw.update_note_in_file(3, "meeting room keys")
+    new_id = cw.add_note_to_file("restart server")
+    cw.delete_note_from_file(1)
+    assert cw.search_notes("server")['ids'] == [new_id]
+    assert cw.search_notes("meeting")['ids'] == [3]
+
+def test_index_follows_external_edits(cw, sample):
+    assert cw.search_notes("keys")['ids'] == [3]
+    sample.append(note_line(5, "spare keys"))
+    assert cw.search_notes("keys")['ids'] == [3, 5]
+
+def test_api_search_limit(client, sample):
+    result = client.get(sample.url("/api/search?q=server&limit=1")).get_json()
+    assert result['total'] == 2
+    assert [item['id'] for item in result['results']] == [1]
@@ -0,0 +1,139 @@
+import http.client
+import json
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from conftest import note_line
+
+THREADS = 2
+
+@pytest.fixture
+def server(cw, notes, monkeypatch):
+    notes.write(note_line(1, "a"))
+    # Heartbeat curto: um stream que ainda esteja numa thread do pool nota o cliente fechado logo
+    monkeypatch.setattr(cw, "EVENTS_HEARTBEAT", 0.5)
+    # Sem o log de acesso no stderr do pytest
+    monkeypatch.setattr(cw._KeepAliveRequestHandler, "log_message", lambda self, *args: None)
+    server = cw.PooledWSGIServer("127.0.0.1", 0, cw.app, THREADS)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    # As threads do pool terminam antes do socket fechar: nada delas sai depois do teste
+    server.pool.shutdown(wait=True)
+    server.server_close()
+
+def _connect(server, timeout=5):
+    return http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=timeout)
+
+@pytest.fixture
+def open_stream(server, notes):
+    """Abre um GET /api/events cru e devolve (socket, bytes ate o primeiro evento)."""
+    socks = []
+
+    def open_stream():
+        sock = socket.create_connection(("127.0.0.1", server.server_address[1]), timeout=5)
+        socks.append(sock)
+        return sock, _first_event(sock, notes)
+    yield open_stream
+    for sock in socks:
+        sock.close()
+
+def _first_event(sock, notes):
+    sock.sendall(f"GET {notes.url('/api/events')} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    data = b""
+    while b"event: " not in data:
+        chunk = sock.recv(65536)
+        assert chunk, "stream closed before the first event"
+        data += chunk
+    return data
+
+def _read_until(sock, marker, timeout=5):
+    data = b""
+    deadline = time.monotonic() + timeout
+    while marker not in data and time.monotonic() < deadline:
+        sock.settimeout(max(0.01, deadline - time.monotonic()))
+        try:
+            chunk = sock.recv(65536)
+        except socket.timeout:
+            break
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+def test_keep_alive(server, notes):
+    conn = _connect(server)
+    for _ in range(3):
+        conn.request("GET", notes.url("/api/stats"))
+        response = conn.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read())['total'] == 1
+    conn.close()
+
+def test_client_reset_is_not_a_server_error(server, notes, monkeypatch):
+    errors, finished = [], []
+    monkeypatch.setattr(server, "handle_error", lambda request, address: errors.append(address))
+    shutdown_request = server.shutdown_request
+    monkeypatch.setattr(server, "shutdown_request", lambda request: finished.append(shutdown_request(request)))
+    sock = socket.create_connection(("127.0.0.1", server.server_address[1]), timeout=5)
+    sock.sendall(f"GET {notes.url('/api/stats')} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    assert _read_until(sock, b"}").startswith(b"HTTP/1.1 200")
+    # SO_LINGER 0: o close manda RST e a thread que espera o proximo request le ECONNRESET
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    sock.close()
+    assert _wait_for(lambda: finished)
+    assert errors == []
+
+def test_event_streams_do_not_hold_pool_threads(cw, server, notes, open_stream):
+    opened = cw._event_streams['open']
+    streams = [open_stream() for _ in range(THREADS * 3)]
+    assert all(head.startswith(b"HTTP/1.1 200") and b"event: sync" in head for _, head in streams)
+
+    # Com mais streams abertos do que threads no pool, as requests comuns continuam sendo atendidas
+    start = time.monotonic()
+    conn = _connect(server, timeout=2)
+    conn.request("POST", notes.url("/api/batch"), json.dumps({"ops": [{"op": "add", "content": "live"}]}),
+                 {"Content-Type": "application/json"})
+    assert conn.getresponse().status == 200
+    conn.close()
+    assert time.monotonic() - start < 2
+
+    # E a escrita chega a todos os streams
+    for sock, _ in streams:
+        assert b"event: add" in _read_until(sock, b"event: add")
+    assert cw._event_streams['open'] == opened + len(streams)
+
+    for sock, _ in streams:
+        sock.close()
+    # O hub ve o EOF e libera as vagas
+    assert _wait_for(lambda: cw._event_streams['open'] == opened)
+
+def test_rejected_stream_closes_the_connection(cw, server, notes, monkeypatch):
+    monkeypatch.setitem(cw._event_streams, 'max', cw._event_streams['open'])
+    conn = _connect(server)
+    conn.request("GET", notes.url("/api/events"))
+    response = conn.getresponse()
+    assert response.status == 503
+    assert response.getheader("Connection") == "close"
+    assert response.getheader("Retry-After") == str(cw.EVENTS_RETRY_AFTER)
+    response.read()
+
+    # Mesmo com o cliente deixando a conexao recusada aberta, ela nao prende uma thread:
+    # THREADS conexoes keep-alive ao mesmo tempo ainda sao atendidas
+    conns = [_connect(server, timeout=2) for _ in range(THREADS)]
+    for other in conns:
+        other.request("GET", notes.url("/api/stats"))
+        assert other.getresponse().status == 200
+    for other in conns + [conn]:
+        other.close()
@@ -0,0 +1,125 @@
+import json
+import threading
+from collections import defaultdict
+
+import pytest
+
+from conftest import ClosingClient, note_line
+
+INITIAL = 50
+
+@pytest.fixture
+def sample(notes):
+    notes.write(*(note_line(n, f"note {n} #t{n % 3}") for n in range(1, INITIAL + 1)))
+    return notes
+
+def _version(response):
+    version = response.headers['X-Clilog-Version']
+    assert response.get_etag()[0].startswith(version)
+    return version
+
+def _add(cw, sample, content):
+    with cw.using_book(sample.book):
+        cw.add_note_to_file(content)
+
+def test_responses_match_the_version_they_report(cw, sample):
+    writes = 60
+    seen = defaultdict(set)  # versao -> totais vistos nela
+    errors = []
+    start = threading.Barrier(5)
+
+    def writer():
+        start.wait()
+        with cw.using_book(sample.book):
+            for n in range(writes):
+                if n % 4 == 3:
+                    cw.set_note_status(n, "completed")
+                else:
+                    cw.add_note_to_file(f"added {n}", [f"t{n % 3}"])
+
+    def reader(path, total):
+        client = ClosingClient(cw.app, cw.app.response_class)
+        start.wait()
+        try:
+            for _ in range(40):
+                response = client.get(sample.url(path))
+                assert response.status_code == 200
+                seen[_version(response)].add(total(response))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader, args=args) for args in (
+            ("/api/notes", lambda r: len(r.get_json())),
+            ("/api/stats", lambda r: r.get_json()['total']),
+            ("/api/stats?days=7", lambda r: r.get_json()['total']),
+            ("/api/tags", lambda r: sum(tag['count'] for tag in r.get_json())),
+        )]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert not errors
+    # Cada versao tem um total so, seja qual for a rota que a leu
+    assert all(len(totals) == 1 for totals in seen.values()), seen
+    assert {total for totals in seen.values() for total in totals} <= set(range(INITIAL, INITIAL + writes + 1))
+    assert len(cw.get_notes()) == INITIAL + writes - writes // 4
+
+def test_published_versions_never_change(cw, sample):
+    before = cw._snapshot()
+    notes = before['notes']
+    ids = [note.id for note in notes]
+    cw.add_note_to_file("new")
+    cw.set_note_status(1, "completed")
+    after = cw._snapshot()
+    assert after is not before and after['key'] != before['key']
+    assert before['notes'] is notes and [note.id for note in notes] == ids
+    assert notes[0].status == "pending" and after['notes'][0].status == "completed"
+
+def test_a_streamed_body_keeps_its_version(cw, client, sample, monkeypatch):
+    monkeypatch.setattr(cw, "EXPORT_CHUNK", 1)
+    response = client.get(sample.url("/api/notes?format=ndjson"), buffered=False)
+    with response:
+        body = iter(response.response)
+        first = next(body)
+        # Uma escrita no meio do corpo (de outra thread) nao aparece nele nem espera por ele
+        writer = threading.Thread(target=_add, args=(cw, sample, "late"))
+        writer.start()
+        writer.join(10)
+        assert not writer.is_alive()
+        lines = (first + b"".join(body)).decode().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == list(range(1, INITIAL + 1))
+    assert len(sample.lines()) == INITIAL + 1
+
+def test_the_request_releases_its_version(cw, client, sample):
+    client.get(sample.url("/api/notes"))
+    assert getattr(cw._current, 'pin', False) is False
+    assert getattr(cw._current, 'snapshot', None) is None
+    assert cw._current.book is sample.book
+
+def _stats_view(cw, sample, calls):
+    def view():
+        calls.append(cw._snapshot()['key'])
+        if len(calls) == 1:
+            # Outra thread publica uma versao nova depois que esta request fixou a dela
+            writer = threading.Thread(target=_add, args=(cw, sample, "concurrent"))
+            writer.start()
+            writer.join(10)
+        with sample.book.cache_lock:
+            return {'total': cw._get_view('stats').total}
+    return cw._versioned()(view)
+
+@pytest.mark.parametrize("retries, total", [(3, INITIAL + 1), (1, INITIAL)])
+def test_a_view_on_a_replaced_version(cw, sample, monkeypatch, retries, total):
+    monkeypatch.setattr(cw, "SNAPSHOT_RETRIES", retries)
+    monkeypatch.setattr(cw._current, "pin", True, raising=False)
+    cw.get_stats()  # a view publicada existe antes da escrita
+    calls = []
+    retried = cw._snapshot_retries.values.get((), 0)
+    with cw.app.test_request_context(sample.url("/api/stats")):
+        response = _stats_view(cw, sample, calls)()
+    # Com tentativas sobrando a request recomeca na versao nova; na ultima monta a view da sua
+    assert response.get_json()['total'] == total
+    assert response.get_etag()[0] == cw._version_tag(calls[-1])
+    assert len(calls) == (2 if retries > 1 else 1)
+    assert cw._snapshot_retries.values.get((), 0) == retried + len(calls) - 1
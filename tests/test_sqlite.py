@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+from conftest import note_line
+
+LINES = [
+    note_line(1, "a #x", due="2024-02-02"),
+    "[X] (2023-05-05 08:00) legacy line #old",
+    note_line(3, "c #x #y", done=True),
+    note_line(5, "after a gap"),
+]
+LOG_TEXT = "".join(line + "\n" for line in LINES)
+
+@pytest.fixture
+def db_notes(notes):
+    """O caderno do teste no backend sqlite, importado de LINES."""
+    notes.write(*LINES)
+    notes.book.open_storage('sqlite')
+    assert notes.book.storage.import_log(notes.path) == len(LINES)
+    return notes
+
+def test_import_and_export_round_trip(cw, db_notes, tmp_path):
+    assert [note.raw for note in cw.get_notes()] == LINES
+    out = tmp_path / "exported.log"
+    assert db_notes.book.storage.export_log(str(out)) == len(LINES)
+    assert out.read_text() == LOG_TEXT
+
+def test_writes_go_to_the_database_only(cw, db_notes):
+    key = db_notes.book.storage.key()
+    new_id = cw.add_note_to_file("from sqlite", ["z"])
+    cw.set_note_status(1, "completed")
+    assert new_id == 6
+    assert db_notes.read() == LOG_TEXT
+    assert db_notes.book.storage.key() != key
+
+    # Outra conexao (outro processo) ve as mesmas linhas e o indice de tags
+    db = sqlite3.connect(db_notes.book.storage.path)
+    rows = db.execute("SELECT id, status FROM notes ORDER BY pos").fetchall()
+    assert rows == [(1, "completed"), (2, "completed"), (3, "completed"), (5, "pending"), (6, "pending")]
+    tagged = db.execute("SELECT n.id FROM note_tags t JOIN notes n ON n.pos = t.pos WHERE t.tag = 'x' ORDER BY n.id")
+    assert [note_id for note_id, in tagged] == [1, 3]
+    db.close()
+
+def test_delete_pins_ids_of_legacy_lines(cw, db_notes):
+    cw.delete_note_from_file(1)
+    assert [(note.id, note.raw.split(" ", 1)[0]) for note in cw.get_notes()] == [(2, "2."), (3, "3."), (5, "5.")]
+    # O maior id apagado continua reservado
+    cw.delete_note_from_file(5)
+    assert cw.add_note_to_file("next") == 6
+
+def test_commits_from_another_connection_are_picked_up(cw, db_notes):
+    assert len(cw.get_notes()) == 4
+    # Outra conexao reimporta o notes.log com uma linha a mais
+    with open(db_notes.path, "a", encoding="utf-8") as f:
+        f.write(note_line(9, "only in the log") + "\n")
+    cw.SqliteStorage(db_notes.book.storage.path).import_log(db_notes.path)
+    assert [note.id for note in cw.get_notes()][-1] == 9
+
+def test_search_and_filters_on_sqlite(client, db_notes):
+    ids = [note['id'] for note in client.get(db_notes.url("/api/notes?tag=x")).get_json()]
+    assert ids == [1, 3]
+    assert client.get(db_notes.url("/api/search?q=legacy")).get_json()['ids'] == [2]
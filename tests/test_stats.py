@@ -0,0 +1,61 @@
+import random
+from datetime import date, timedelta
+
+from conftest import note_line
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+def _counters(stats):
+    return (stats.total, stats.completed, dict(stats.pending_due), dict(stats.tags),
+            {day: list(bucket) for day, bucket in stats.days.items()})
+
+def test_api_stats(client, notes):
+    notes.write(
+        note_line(1, "a #work", due=_day(-3), timestamp=f"{_day(0)} 09:00"),
+        note_line(2, "b #work #home", done=True, timestamp=f"{_day(0)} 10:00"),
+        note_line(3, "c", due=_day(0), timestamp=f"{_day(-1)} 10:00"),
+        note_line(4, "d #home", due=_day(-1), done=True, timestamp=f"{_day(-1)} 11:00"),
+        "[ ] legacy without timestamp",
+    )
+    stats = client.get(notes.url("/api/stats?days=2")).get_json()
+    assert (stats['total'], stats['completed'], stats['pending']) == (5, 2, 3)
+    assert stats['overdue'] == 1
+    assert stats['due_today'] == 1
+    assert stats['completion_rate'] == 0.4
+    assert stats['tags'] == {"work": 2, "home": 2}
+    assert stats['history'] == [
+        {"date": _day(-1), "created": 2, "completed": 1, "completion_rate": 0.5},
+        {"date": _day(0), "created": 2, "completed": 1, "completion_rate": 0.5},
+    ]
+    assert len(client.get(notes.url("/api/stats")).get_json()['history']) == 30
+
+def test_counters_follow_mutations(cw, notes):
+    notes.write(*(note_line(n, f"note {n} #t{n % 4}", due=_day(n % 7 - 3) if n % 2 else "-", done=n % 3 == 0,
+                            timestamp=f"{_day(-(n % 5))} 10:00")
+                  for n in range(1, 41)))
+    rng = random.Random(17)
+    live = list(range(1, 41))
+    for _ in range(60):
+        note_id = rng.choice(live)
+        kind = rng.choice(("done", "undo", "tag", "edit", "add", "delete"))
+        if kind in ("done", "undo"):
+            cw.set_note_status(note_id, "completed" if kind == "done" else "pending")
+        elif kind == "tag":
+            cw.apply_batch([('tag', note_id, [f"t{rng.randrange(6)}"], [f"t{rng.randrange(6)}"])])
+        elif kind == "edit":
+            cw.update_note_in_file(note_id, f"edited #t{rng.randrange(6)}")
+        elif kind == "add":
+            live.append(cw.add_note_to_file("added", [f"t{rng.randrange(6)}"], _day(rng.randrange(-3, 3))))
+        elif len(live) > 1:
+            cw.delete_note_from_file(note_id)
+            live.remove(note_id)
+        cw.get_stats()
+
+    # Os contadores mantidos a cada escrita batem com uma recontagem do zero
+    with notes.book.cache_lock:
+        kept = _counters(cw._get_view('stats'))
+    assert kept == _counters(cw.StatsCounter(cw.get_notes()))
+    today = _day(0)
+    assert cw.get_stats()['overdue'] == sum(
+        1 for note in cw.get_notes() if note.status == "pending" and note.due_date != "-" and note.due_date < today)
@@ -0,0 +1,73 @@
+import os
+import time
+
+from conftest import note_line
+
+LINES = [note_line(1, "a"), note_line(2, "b #x"), note_line(3, "c", done=True), note_line(4, "d")]
+
+def test_delete_marks_a_tombstone_in_place(cw, notes):
+    notes.write(*LINES)
+    inode, size = os.stat(notes.path).st_ino, os.path.getsize(notes.path)
+    cw.delete_note_from_file(2)
+    assert notes.lines() == [LINES[0], LINES[1].replace("[ ]", "[D]"), *LINES[2:]]
+    assert (os.stat(notes.path).st_ino, os.path.getsize(notes.path)) == (inode, size)
+    assert [note.id for note in cw.get_notes()] == [1, 3, 4]
+    cw.delete_note_from_file(3)
+    assert notes.lines()[2] == LINES[2].replace("[X]", "[D]")
+
+def test_ids_are_not_reused(cw, notes):
+    notes.write(*LINES)
+    cw.delete_note_from_file(4)
+    assert cw.add_note_to_file("e") == 5
+    cw.delete_note_from_file(5)
+    cw.compact_notes(force=True)
+    assert cw.add_note_to_file("f") == 6
+
+def test_readers_skip_tombstones(cw, client, notes):
+    notes.write(LINES[0], "2. [D] | Due: - | (2024-01-01 10:00) b #x", "[D] legacy", LINES[3])
+    assert [note.id for note in cw.get_notes()] == [1, 4]
+    assert [note['id'] for note in client.get(notes.url("/api/notes")).get_json()] == [1, 4]
+    assert client.get(notes.url("/api/stats")).get_json()['tags'] == {}
+
+def test_compaction_keeps_the_ids(cw, notes):
+    notes.write(LINES[0], "[ ] (2024-01-01 10:00) legacy", *LINES[2:])
+    cw.delete_note_from_file(1)
+    cw.delete_note_from_file(4)
+    assert cw.compact_notes() == 0  # abaixo do limite
+    # A linha sem ID fica com o numero que tinha; o tombstone do maior id continua no fim
+    assert cw.compact_notes(force=True) == 1
+    assert notes.lines() == ["2. [ ] (2024-01-01 10:00) legacy", LINES[2], "4. [D]"]
+    assert [note.id for note in cw.get_notes()] == [2, 3]
+    assert cw.compact_notes(force=True) == 0
+
+def test_deletes_past_the_threshold_compact_in_the_background(cw, notes, monkeypatch):
+    monkeypatch.setattr(cw, "COMPACT_MIN_TOMBSTONES", 3)
+    monkeypatch.setattr(cw, "COMPACT_RATIO", 0.5)
+    notes.write(*(note_line(n, f"note {n}") for n in range(1, 7)))
+    compactions = cw._compactions.values.get((), 0)
+    for note_id in (1, 2):
+        cw.delete_note_from_file(note_id)
+    assert sum("[D]" in line for line in notes.lines()) == 2
+    cw.delete_note_from_file(6)
+    deadline = time.monotonic() + 5
+    while cw._compactions.values.get((), 0) == compactions:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert notes.lines() == [note_line(n, f"note {n}") for n in range(3, 6)] + ["6. [D]"]
+
+def test_shell_delete_is_a_tombstone(cw, notes, shell):
+    notes.write(*LINES)
+    inode = os.stat(notes.path).st_ino
+    assert "Note 2 deleted!" in shell("del", "2").stdout
+    assert notes.lines() == [LINES[0], LINES[1].replace("[ ]", "[D]"), *LINES[2:]]
+    assert os.stat(notes.path).st_ino == inode
+    assert [note.id for note in cw.get_notes()] == [1, 3, 4]
+    assert "Error: Note 2 not found!" in shell("del", "2").stdout
+
+def test_shell_deletes_in_the_same_clock_tick_are_seen(cw, notes, shell, coarse_clock):
+    notes.write(*LINES)
+    assert [note.id for note in cw.get_notes()] == [1, 2, 3, 4]
+    shell("del", "2", **coarse_clock)
+    assert [note.id for note in cw.get_notes()] == [1, 3, 4]
+    shell("del", "4", **coarse_clock)
+    assert [note.id for note in cw.get_notes()] == [1, 3]
@@ -0,0 +1,123 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from conftest import note_line
+
+def test_done_and_undo_patch_the_marker_in_place(cw, notes):
+    lines = [note_line(1, "a"), note_line(2, "b #tag", due="2024-05-05"), note_line(3, "c")]
+    notes.write(*lines)
+    inode = os.stat(notes.path).st_ino
+
+    cw.set_note_status(2, "completed")
+    assert notes.lines() == [lines[0], lines[1].replace("[ ]", "[X]"), lines[2]]
+    assert os.stat(notes.path).st_ino == inode
+    assert os.path.exists(notes.book.index_file)
+    assert [note.status for note in cw.get_notes()] == ["pending", "completed", "pending"]
+
+    cw.set_note_status(2, "pending")
+    assert notes.lines() == lines
+    assert os.stat(notes.path).st_ino == inode
+
+def test_stale_offset_index_is_detected(cw, notes):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    cw.set_note_status(1, "completed")
+    # Outro programa troca as linhas de lugar sem mudar inode nem tamanho: o indice salvo
+    # ainda "vale", mas o patch confere os bytes e cai na reescrita
+    swapped = [note_line(2, "b"), note_line(1, "a", done=True)]
+    with open(notes.path, "r+", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in swapped))
+    st = os.stat(notes.path)
+    os.utime(notes.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    cw.set_note_status(2, "completed")
+    assert notes.lines() == [note_line(2, "b", done=True), note_line(1, "a", done=True)]
+
+def test_line_without_a_leading_marker_is_rewritten(cw, notes):
+    notes.write(note_line(1, "a"), "[ ] (2024-01-01 10:00) legacy")
+    inode = os.stat(notes.path).st_ino
+    cw.set_note_status(2, "completed")
+    assert notes.lines() == [note_line(1, "a"), note_line(2, "legacy", done=True)]
+    # Reescrita atomica: tmp + rename
+    assert os.stat(notes.path).st_ino != inode
+
+def test_shell_done_and_undo_patch_in_place(notes, shell):
+    lines = [note_line(1, "a"), note_line(2, "b"), note_line(3, "c")]
+    notes.write(*lines)
+    inode = os.stat(notes.path).st_ino
+    assert "Note 2 marked as completed!" in shell("done", "2").stdout
+    assert notes.lines() == [lines[0], note_line(2, "b", done=True), lines[2]]
+    assert os.stat(notes.path).st_ino == inode
+    shell("undo", "2")
+    assert notes.lines() == lines
+    assert os.stat(notes.path).st_ino == inode
+
+def test_shell_flips_in_the_same_clock_tick_are_seen(cw, notes, shell, coarse_clock):
+    notes.write(note_line(1, "a"), note_line(2, "b"))
+    assert [note.status for note in cw.get_notes()] == ["pending", "pending"]
+    shell("done", "1", **coarse_clock)
+    assert [note.status for note in cw.get_notes()] == ["completed", "pending"]
+    shell("done", "2", **coarse_clock)
+    assert [note.status for note in cw.get_notes()] == ["completed", "completed"]
+
+def test_concurrent_writes_share_commits_and_all_land(cw, notes, monkeypatch):
+    monkeypatch.setattr(cw, "WRITE_BATCH_WINDOW", 0.05)
+    commit_batch = cw._commit_batch
+    batches = []
+
+    def counted(ops):
+        batches.append(len(ops))
+        return commit_batch(ops)
+    monkeypatch.setattr(cw, "_commit_batch", counted)
+    notes.write(note_line(1, "a"))
+    barrier = threading.Barrier(20)
+    ids = []
+
+    def writer(n):
+        with cw.using_book(notes.book):
+            barrier.wait()
+            ids.append(cw.add_note_to_file(f"note {n}"))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ids) == list(range(2, 22))
+    assert [note.id for note in cw._parse_lines(notes.read())] == list(range(1, 22))
+    # Os 20 adds chegaram dentro da mesma janela: bem menos commits do que adds
+    assert sum(batches) == 20 and len(batches) < 20
+
+def test_shell_and_web_writers_do_not_lose_notes(cw, notes, shell):
+    notes.write(note_line(1, "a"))
+    shell_adds = []
+
+    def from_shell():
+        for n in range(5):
+            shell_adds.append(shell("add", f"shell {n}").returncode)
+
+    thread = threading.Thread(target=from_shell)
+    thread.start()
+    for n in range(20):
+        cw.add_note_to_file(f"web {n}")
+    thread.join()
+    assert shell_adds == [0] * 5
+    parsed = cw._parse_lines(notes.read())
+    assert len(parsed) == 26
+    assert len({note.id for note in parsed}) == 26
+    assert len(cw.get_notes()) == 26
+
+@pytest.mark.skipif(shutil.which("flock") is None, reason="needs flock(1)")
+def test_writer_waits_for_the_notebook_lock(cw, notes):
+    notes.write(note_line(1, "a"))
+    # O shell segura o flock do caderno por um tempo; a escrita da web espera por ele
+    holder = subprocess.Popen(["flock", notes.book.lock_file, "sleep", "0.3"])
+    time.sleep(0.1)
+    start = time.monotonic()
+    cw.add_note_to_file("after the lock")
+    assert time.monotonic() - start > 0.1
+    holder.wait()
+    assert notes.lines()[-1].endswith(") after the lock")